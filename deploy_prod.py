@@ -143,6 +143,10 @@ DB_PASSWORD=Itam.Prod.2025!
 DB_HOST=localhost
 DB_PORT=3306
 
+# Caché compartida por todos los workers (con varios servidores use Redis o Memcached)
+CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+CACHE_LOCATION=/var/tmp/itam_cache
+
 # CORS settings
 CORS_ALLOWED_ORIGINS=http://localhost,http://127.0.0.1,https://your-domain.com
 """
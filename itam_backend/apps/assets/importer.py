@@ -0,0 +1,275 @@
+"""
+Importación masiva de activos desde CSV o JSON.
+
+Recibe filas (diccionarios columna -> valor) y las valida en bloque:
+
+- Los catálogos (tipo, proveedor, marca, modelo, región, finca, departamento,
+  área) se resuelven por ID o por nombre sin distinguir mayúsculas, con un
+  índice armado una sola vez por catálogo desde la caché de catálogos. El
+  nombre de un área solo es único dentro de su departamento.
+- Los demás campos se validan con el campo del modelo (tipo, longitud,
+  opciones, correo).
+- La unicidad de serie y hostname se verifica con una consulta por campo para
+  todo el archivo (por bloques de IMPORT_BATCH_SIZE), además de los duplicados
+  dentro del mismo archivo.
+
+Si alguna fila tiene errores no se importa nada y se devuelve el reporte de
+errores por fila. Las filas válidas se insertan con bulk_create por bloques en
+una sola transacción, con su entrada de auditoría CREATE y sus conteos de
+ActivoCount. Con dry_run solo se valida.
+
+Los encabezados se normalizan (sin acentos, minúsculas, espacios como '_'),
+así que se aceptan tanto los nombres de campo ('tipo_activo') como los títulos
+del reporte CSV de activos ('Tipo Activo'). Las columnas desconocidas se ignoran.
+"""
+
+import csv
+import io
+import json
+import re
+import unicodedata
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection, transaction
+
+from apps.masterdata import audit
+from apps.masterdata import cache as catalog_cache
+from apps.masterdata.models import TipoActivo, Marca, ModeloActivo, Proveedor, Region, Finca, Departamento, Area
+from .models import Activo
+
+# Filas por inserción y por consulta de unicidad
+IMPORT_BATCH_SIZE = 500
+
+# Columna -> (catálogo, campo con el nombre)
+CATALOG_COLUMNS = {
+    'tipo_activo': (TipoActivo, 'name'),
+    'proveedor': (Proveedor, 'nombre_empresa'),
+    'marca': (Marca, 'name'),
+    'modelo': (ModeloActivo, 'name'),
+    'region': (Region, 'name'),
+    'finca': (Finca, 'name'),
+    'departamento': (Departamento, 'name'),
+    'area': (Area, 'name'),
+}
+
+REQUIRED_COLUMNS = (*CATALOG_COLUMNS, 'serie', 'hostname', 'fecha_registro', 'fecha_fin_garantia')
+
+VALUE_COLUMNS = (
+    'serie', 'hostname', 'fecha_registro', 'fecha_fin_garantia',
+    'solicitante', 'correo_electronico', 'orden_compra', 'cuenta_contable', 'tipo_costo', 'cuotas', 'moneda', 'costo',
+    'procesador', 'ram', 'almacenamiento', 'tarjeta_grafica', 'wifi', 'ethernet',
+    'puertos_ethernet', 'puertos_sfp', 'puerto_consola', 'puertos_poe', 'alimentacion', 'administrable',
+    'tamano', 'color', 'conectores', 'cables',
+)
+
+UNIQUE_COLUMNS = ('serie', 'hostname')
+
+# Valores booleanos en español además de los que acepta BooleanField
+BOOLEAN_VALUES = {'si': True, 'sí': True, 'no': False}
+
+
+def read_rows(data, format=None):
+    """
+    Rows of a CSV or JSON import as a list of dicts with normalized column names.
+
+    `data` is text or bytes; JSON must be a list of objects (or {"rows": [...]}).
+    The CSV delimiter (',', ';' or tab) is detected from the header.
+    """
+    if isinstance(data, bytes):
+        data = data.decode('utf-8-sig')
+    if format is None:
+        format = 'json' if data.lstrip()[:1] in ('[', '{') else 'csv'
+
+    if format == 'json':
+        rows = json.loads(data)
+        if isinstance(rows, dict):
+            rows = rows.get('rows')
+    else:
+        try:
+            dialect = csv.Sniffer().sniff(data.split('\n', 1)[0], delimiters=',;\t')
+        except csv.Error:
+            dialect = csv.excel
+        rows = list(csv.DictReader(io.StringIO(data), dialect=dialect))
+    return normalize_rows(rows)
+
+
+def normalize_rows(rows):
+    """Check that `rows` is a list of objects and normalize their column names."""
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError('Se esperaba una lista de objetos.')
+    return [{normalize_column(key): value for key, value in row.items() if key} for row in rows]
+
+
+def normalize_column(name):
+    """'Fecha Fin Garantía' -> 'fecha_fin_garantia'."""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char)).strip().lower()
+    return re.sub(r'\W+', '_', name).strip('_')
+
+
+class CatalogIndex:
+    """Rows of one catalog by primary key and by lower-cased name."""
+
+    def __init__(self, model, name_field):
+        self.model = model
+        self.by_pk = catalog_cache.objects(model)
+        self.by_name = defaultdict(list)
+        for obj in self.by_pk.values():
+            self.by_name[str(getattr(obj, name_field)).strip().casefold()].append(obj)
+
+    def resolve(self, value, **parent):
+        """Catalog row for an ID or a name, optionally narrowed to rows with the given parent ids."""
+        if isinstance(value, int) or str(value).strip().isdigit():
+            obj = self.by_pk.get(int(value))
+            if obj is not None:
+                return obj
+
+        matches = [
+            obj for obj in self.by_name.get(str(value).strip().casefold(), [])
+            if all(getattr(obj, field) == pk for field, pk in parent.items())
+        ]
+        if not matches:
+            raise ValidationError(f"No existe {self.model._meta.verbose_name} '{value}'.")
+        if len(matches) > 1:
+            raise ValidationError(f"Hay varios registros de {self.model._meta.verbose_name} llamados '{value}'; use el ID.")
+        return matches[0]
+
+
+def import_activos(rows, user=None, dry_run=False):
+    """
+    Validate and insert `rows` (see read_rows). Returns
+    {'rows', 'created', 'dry_run', 'errors': [{'row': n, 'errors': {column: [messages]}}]}
+    where `row` is the 1-based position of the row in the data (None for errors
+    that cannot be tied to a row).
+    """
+    catalogs = {column: CatalogIndex(model, name_field) for column, (model, name_field) in CATALOG_COLUMNS.items()}
+    fields = {name: Activo._meta.get_field(name) for name in VALUE_COLUMNS}
+
+    activos, errors = [], {}
+    for number, row in enumerate(rows, start=1):
+        activo, row_errors = _build_activo(row, catalogs, fields)
+        if row_errors:
+            errors[number] = row_errors
+        activos.append(activo)
+
+    for number, row_errors in _uniqueness_errors(activos).items():
+        errors[number] = {**row_errors, **errors.get(number, {})}
+    errors = [
+        {'row': number, 'errors': errors[number]}
+        for number in sorted(errors, key=lambda number: (number is not None, number or 0))
+    ]
+
+    result = {'rows': len(rows), 'created': 0, 'dry_run': dry_run, 'errors': errors}
+    if errors or dry_run or not activos:
+        return result
+
+    try:
+        # Las entradas de auditoría se entregan al confirmar y se insertan juntas al salir de buffered()
+        with audit.buffered(), transaction.atomic():
+            for start in range(0, len(activos), IMPORT_BATCH_SIZE):
+                chunk = activos[start:start + IMPORT_BATCH_SIZE]
+                Activo.objects.bulk_create(chunk)
+                if not connection.features.can_return_rows_from_bulk_insert:
+                    # Sin RETURNING (MySQL): se recuperan los IDs por la serie, que es única
+                    pks = dict(Activo.objects.filter(serie__in=[activo.serie for activo in chunk]).values_list('serie', 'pk'))
+                    for activo in chunk:
+                        activo.pk = pks[activo.serie]
+                for activo in chunk:
+                    audit.record('CREATE', user=user, instance=activo, new_data=audit.snapshot(activo))
+    except IntegrityError:
+        # Otra petición creó un activo con la misma serie o hostname durante la importación
+        result['errors'] = [{'row': None, 'errors': {
+            'non_field_errors': ['Otro usuario registró activos con la misma serie o hostname; vuelva a validar el archivo.']
+        }}]
+        return result
+    result['created'] = len(activos)
+    return result
+
+
+def _build_activo(row, catalogs, fields):
+    """(unsaved Activo, {column: [messages]}) for one row."""
+    errors = {}
+    values = {}
+
+    for column in REQUIRED_COLUMNS:
+        if _is_blank(row.get(column)):
+            errors[column] = ['Este campo es requerido.']
+
+    for column, index in catalogs.items():
+        value = row.get(column)
+        if column in errors or _is_blank(value):
+            continue
+        # Nombre de área: se busca dentro del departamento de la fila
+        parent = {'departamento_id': values['departamento'].pk} if column == 'area' and 'departamento' in values else {}
+        try:
+            values[column] = index.resolve(value, **parent)
+        except ValidationError as error:
+            errors[column] = error.messages
+
+    for column, field in fields.items():
+        value = row.get(column)
+        if column in errors:
+            continue
+        if _is_blank(value):
+            value = None
+        elif isinstance(value, str):
+            value = value.strip()
+            if field.get_internal_type() == 'BooleanField':
+                value = BOOLEAN_VALUES.get(value.lower(), value)
+        try:
+            values[column] = field.clean(value, None)
+        except ValidationError as error:
+            errors[column] = error.messages
+
+    activo = Activo(**{
+        (f'{column}_id' if column in catalogs else column): (value.pk if column in catalogs else value)
+        for column, value in values.items()
+    })
+    return activo, errors
+
+
+def _uniqueness_errors(activos):
+    """{row: {column: [messages]}} for serie/hostname repeated in the file or already in the database."""
+    errors = defaultdict(dict)
+    for column in UNIQUE_COLUMNS:
+        # Sin distinguir mayúsculas, como la intercalación de MySQL
+        first_row = {}
+        for number, activo in enumerate(activos, start=1):
+            value = getattr(activo, column)
+            if not value:
+                continue
+            if value.casefold() in first_row:
+                errors[number][column] = [f'Valor repetido en la fila {first_row[value.casefold()]}.']
+            else:
+                first_row[value.casefold()] = number
+
+        # La intercalación puede igualar más que casefold (p. ej. *_ai_ci también ignora acentos)
+        by_collation = {}
+        for key, number in first_row.items():
+            by_collation.setdefault(_collation_key(key), number)
+
+        values = [getattr(activos[number - 1], column) for number in first_row.values()]
+        for start in range(0, len(values), IMPORT_BATCH_SIZE):
+            existing = Activo.objects.filter(
+                **{f'{column}__in': values[start:start + IMPORT_BATCH_SIZE]}
+            ).values_list(column, flat=True)
+            for value in existing:
+                message = f'Ya existe un activo con {column} {value}.'
+                number = first_row.get(value.casefold(), by_collation.get(_collation_key(value)))
+                if number is None:
+                    # Sin fila identificable: el error se reporta para todo el archivo
+                    errors[None].setdefault(column, []).append(message)
+                else:
+                    errors[number][column] = [message]
+    return errors
+
+
+def _collation_key(value):
+    """Value without case or accents, as compared by MySQL *_ai_ci collations."""
+    value = unicodedata.normalize('NFKD', value.casefold())
+    return ''.join(char for char in value if not unicodedata.combining(char))
+
+
+def _is_blank(value):
+    return value is None or (isinstance(value, str) and not value.strip())
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from apps.assets.importer import import_activos, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Import assets from a CSV or JSON file (catalogs by ID or name); nothing is written if any row fails'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON file with one asset per row')
+        parser.add_argument('--format', choices=['csv', 'json'], help='File format (default: from the extension)')
+        parser.add_argument('--user', help='Username recorded as the creator in the audit log')
+        parser.add_argument('--dry-run', action='store_true', help='Validate the file without writing')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"User '{options['user']}' does not exist")
+
+        path = options['path']
+        format = options['format'] or ('json' if path.lower().endswith('.json') else 'csv')
+        try:
+            with open(path, 'rb') as file:
+                rows = read_rows(file.read(), format)
+        except (OSError, ValueError, UnicodeDecodeError) as error:
+            raise CommandError(f'Could not read {path}: {error}')
+
+        result = import_activos(rows, user=user, dry_run=options['dry_run'])
+        for error in result['errors']:
+            messages = '; '.join(f'{column}: {" ".join(texts)}' for column, texts in error['errors'].items())
+            where = f"Row {error['row']}" if error['row'] is not None else 'File'
+            self.stdout.write(self.style.ERROR(f'{where}: {messages}'))
+
+        if result['errors']:
+            raise CommandError(f"{len(result['errors'])} of {result['rows']} rows have errors; nothing was imported")
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"{result['rows']} rows are valid (dry run, nothing was imported)"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Imported {result['created']} activos"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from apps.assets.models import ActivoCount
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the pre-aggregated ActivoCount table used by the dashboards'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding ActivoCount table...')
+        rows = ActivoCount.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Successfully rebuilt {rows} ActivoCount rows'))
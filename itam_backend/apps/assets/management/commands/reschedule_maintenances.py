@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from apps.assets import scheduling
+from apps.assets.models import Activo, Maintenance
+
+
+class Command(BaseCommand):
+    help = 'Recalculate next maintenance dates with the current business-day and holiday calendars'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from-date',
+            help='Only maintenances whose next date is on/after this date (YYYY-MM-DD, default: today)'
+        )
+        parser.add_argument('--all', action='store_true', help='Recalculate every maintenance, including past next dates')
+        parser.add_argument('--dry-run', action='store_true', help='Show the changes without writing them')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Maintenances processed per batch (default: 5000)')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+
+        maintenances = Maintenance.objects.order_by('pk')
+        if not options['all']:
+            from_date = self._parse_date(options['from_date']) if options['from_date'] else timezone.now().date()
+            maintenances = maintenances.filter(next_maintenance_date__gte=from_date)
+
+        # Próxima fecha del último mantenimiento de cada activo (el mismo criterio que Maintenance.save)
+        latest = Maintenance.objects.filter(activo=OuterRef('pk')).order_by('-created_at', '-id')
+
+        self.stdout.write('Rescheduling maintenances...' + (' (dry run)' if dry_run else ''))
+        started = time.monotonic()
+        scanned = changed_count = 0
+        last_pk = 0
+
+        while True:
+            rows = list(
+                maintenances.filter(pk__gt=last_pk).values_list(
+                    'pk', 'activo_id', 'activo__hostname', 'activo__region_id', 'maintenance_date', 'next_maintenance_date'
+                )[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            scanned += len(rows)
+
+            # Todas las fechas del bloque en una sola llamada
+            new_dates = scheduling.next_maintenance_dates([row[4] for row in rows], [row[3] for row in rows])
+            changed = [(row, new_date) for row, new_date in zip(rows, new_dates) if row[5] != new_date]
+            changed_count += len(changed)
+
+            if dry_run:
+                for (pk, _, hostname, _, _, old_date), new_date in changed:
+                    self.stdout.write(f'{hostname} (mantenimiento {pk}): {old_date} -> {new_date}')
+            elif changed:
+                with transaction.atomic():
+                    Maintenance.objects.bulk_update(
+                        [Maintenance(pk=row[0], next_maintenance_date=new_date) for row, new_date in changed],
+                        ['next_maintenance_date'],
+                        batch_size=1000
+                    )
+                    # Los activos toman la próxima fecha de su último mantenimiento en un solo UPDATE
+                    Activo.objects.filter(pk__in={row[1] for row, _ in changed}).update(
+                        proximo_mantenimiento=Subquery(latest.values('next_maintenance_date')[:1])
+                    )
+
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  ... {scanned} maintenances checked, {changed_count} to reschedule')
+
+        elapsed = time.monotonic() - started
+        rate = scanned / elapsed if elapsed else scanned
+        verb = 'would reschedule' if dry_run else 'rescheduled'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {scanned} maintenances, {verb} {changed_count} in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
+
+    def _parse_date(self, value):
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f'--from-date: fecha inválida "{value}" (use YYYY-MM-DD)')
+        return day
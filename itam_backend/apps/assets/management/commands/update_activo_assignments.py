@@ -1,30 +1,49 @@
+from collections import defaultdict
+
 from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
 from apps.assets.models import Assignment, Activo
 from apps.users.models import CustomUser
 
+# Activos por sentencia UPDATE
+BATCH_SIZE = 1000
+
+
 class Command(BaseCommand):
     help = 'Update Activo assigned_to field based on active assignments'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the corrections without writing them')
+
     def handle(self, *args, **options):
-        # Clear all assigned_to fields first
-        Activo.objects.update(assigned_to=None)
-
-        # Get all active assignments
-        active_assignments = Assignment.objects.filter(returned_date__isnull=True).select_related('activo', 'employee')
-
-        updated_count = 0
-        for assignment in active_assignments:
-            if assignment.employee:
-                # Find the user account for this employee
-                try:
-                    user = CustomUser.objects.get(employee=assignment.employee)
-                    assignment.activo.assigned_to = user
-                    assignment.activo.save(update_fields=['assigned_to'])
-                    updated_count += 1
-                    self.stdout.write(f'Updated {assignment.activo.hostname} -> {user.username}')
-                except CustomUser.DoesNotExist:
-                    self.stdout.write(f'No user account found for employee {assignment.employee.first_name} {assignment.employee.last_name}')
-                except Exception as e:
-                    self.stdout.write(f'Error updating {assignment.activo.hostname}: {e}')
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {updated_count} activos with active assignments'))
\ No newline at end of file
+        dry_run = options['dry_run']
+
+        # Usuario deseado por activo: la cuenta del empleado de su asignación activa más reciente
+        employee_user = CustomUser.objects.filter(employee_id=OuterRef('employee_id')).order_by('id').values('id')[:1]
+        active_assignment = Assignment.objects.filter(
+            activo=OuterRef('pk'), returned_date__isnull=True
+        ).order_by('-assigned_date', '-id')
+        desired = Activo.objects.order_by().annotate(
+            desired_user=Subquery(active_assignment.annotate(user_id=Subquery(employee_user)).values('user_id')[:1])
+        ).values_list('pk', 'hostname', 'assigned_to_id', 'desired_user')
+
+        # Solo se tocan los activos cuyo valor actual difiere del deseado, agrupados por usuario destino
+        corrections = defaultdict(list)
+        checked = 0
+        for pk, hostname, current, target in desired.iterator(chunk_size=BATCH_SIZE):
+            checked += 1
+            if current != target:
+                corrections[target].append(pk)
+                if dry_run or options['verbosity'] >= 2:
+                    self.stdout.write(f'{hostname}: assigned_to {current} -> {target}')
+
+        corrected = sum(len(pks) for pks in corrections.values())
+        if not dry_run and corrected:
+            with transaction.atomic():
+                for target, pks in corrections.items():
+                    for start in range(0, len(pks), BATCH_SIZE):
+                        Activo.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).update(assigned_to_id=target)
+
+        verb = 'would correct' if dry_run else 'corrected'
+        self.stdout.write(self.style.SUCCESS(f'Checked {checked} activos, {verb} {corrected} assigned_to values'))
@@ -1,35 +1,102 @@
-from django.core.management.base import BaseCommand
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from apps.assets.models import Activo, Maintenance
 
+# Campo del activo -> campo del mantenimiento más reciente
+MAINTENANCE_FIELDS = {
+    'ultimo_mantenimiento': 'maintenance_date',
+    'proximo_mantenimiento': 'next_maintenance_date',
+    'tecnico_mantenimiento_id': 'technician_id',
+    'ultimo_mantenimiento_hallazgos': 'findings',
+}
+
 
 class Command(BaseCommand):
     help = 'Update Activo maintenance fields with latest maintenance data'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--since',
+            help='Only assets with maintenances created or modified at/after this date or datetime (ISO 8601)'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Show the changes without writing them')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Assets processed per batch (default: 1000)')
+
     def handle(self, *args, **options):
-        self.stdout.write('Updating Activo maintenance fields...')
-
-        updated_count = 0
-        for activo in Activo.objects.all():
-            # Get the latest maintenance for this activo
-            latest_maintenance = Maintenance.objects.filter(activo=activo).order_by('-created_at').first()
-
-            if latest_maintenance:
-                # Update the Activo fields
-                activo.ultimo_mantenimiento = latest_maintenance.maintenance_date
-                activo.proximo_mantenimiento = latest_maintenance.next_maintenance_date
-                activo.tecnico_mantenimiento = latest_maintenance.technician
-                activo.ultimo_mantenimiento_hallazgos = latest_maintenance.findings
-
-                activo.save(update_fields=[
-                    'ultimo_mantenimiento',
-                    'proximo_mantenimiento',
-                    'tecnico_mantenimiento',
-                    'ultimo_mantenimiento_hallazgos'
-                ])
-
-                updated_count += 1
-                self.stdout.write(f'Updated {activo.hostname} with maintenance from {latest_maintenance.maintenance_date}')
-            else:
-                self.stdout.write(f'No maintenance records for {activo.hostname}')
-
-        self.stdout.write(self.style.SUCCESS(f'Successfully updated {updated_count} Activo records'))
\ No newline at end of file
+        since = self._parse_since(options['since'])
+        dry_run = options['dry_run']
+        chunk_size = options['chunk_size']
+
+        # Último mantenimiento de cada activo (el mismo criterio que Maintenance.save)
+        latest = Maintenance.objects.filter(activo=OuterRef('pk')).order_by('-created_at', '-id')
+        new_values = {
+            f'new_{field}': Subquery(latest.values(source)[:1])
+            for field, source in MAINTENANCE_FIELDS.items()
+        }
+
+        maintenances = Maintenance.objects.filter(activo=OuterRef('pk'))
+        if since:
+            maintenances = maintenances.filter(updated_at__gte=since)
+        candidates = Activo.objects.filter(Exists(maintenances)).order_by('pk')
+
+        self.stdout.write('Updating Activo maintenance fields...' + (' (dry run)' if dry_run else ''))
+        started = time.monotonic()
+        scanned = updated = 0
+        last_pk = 0
+
+        while True:
+            rows = list(
+                candidates.filter(pk__gt=last_pk)
+                .annotate(**new_values)
+                .values('pk', 'hostname', *MAINTENANCE_FIELDS, *new_values)[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1]['pk']
+            scanned += len(rows)
+
+            changed = [row for row in rows if any(row[field] != row[f'new_{field}'] for field in MAINTENANCE_FIELDS)]
+            updated += len(changed)
+
+            if dry_run:
+                for row in changed:
+                    diff = ', '.join(
+                        f'{field}: {row[field]} -> {row[f"new_{field}"]}'
+                        for field in MAINTENANCE_FIELDS if row[field] != row[f'new_{field}']
+                    )
+                    self.stdout.write(f'{row["hostname"]}: {diff}')
+            elif changed:
+                # Un solo UPDATE por bloque; los valores se toman del último mantenimiento en SQL
+                with transaction.atomic():
+                    Activo.objects.filter(pk__in=[row['pk'] for row in changed]).update(
+                        **{field: new_values[f'new_{field}'] for field in MAINTENANCE_FIELDS}
+                    )
+
+            if options['verbosity'] >= 2:
+                self.stdout.write(f'  ... {scanned} assets checked, {updated} to update')
+
+        elapsed = time.monotonic() - started
+        rate = scanned / elapsed if elapsed else scanned
+        verb = 'would update' if dry_run else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f'Checked {scanned} Activo records, {verb} {updated} in {elapsed:.2f}s ({rate:.0f} rows/s)'
+        ))
+
+    def _parse_since(self, value):
+        if not value:
+            return None
+        since = parse_datetime(value)
+        if since is None:
+            day = parse_date(value)
+            if day is None:
+                raise CommandError(f'--since: fecha inválida "{value}" (use YYYY-MM-DD o YYYY-MM-DDTHH:MM)')
+            since = datetime.combine(day, datetime.min.time())
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        return since
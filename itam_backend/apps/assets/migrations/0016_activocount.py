@@ -0,0 +1,48 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+KEY_FIELDS = ('estado', 'tipo_activo_id', 'modelo_id', 'region_id', 'finca_id', 'departamento_id')
+
+
+def populate_counts(apps, schema_editor):
+    Activo = apps.get_model('assets', 'Activo')
+    ActivoCount = apps.get_model('assets', 'ActivoCount')
+    rows = Activo.objects.order_by().values(*KEY_FIELDS).annotate(count=Count('id'))
+    ActivoCount.objects.bulk_create(
+        [ActivoCount(total=row.pop('count'), **row) for row in rows],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0015_activo_assigned_to'),
+        ('masterdata', '0015_alter_auditlog_activity_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivoCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado', models.CharField(max_length=20, verbose_name='Estado')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('departamento', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masterdata.departamento', verbose_name='Departamento')),
+                ('finca', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masterdata.finca', verbose_name='Finca')),
+                ('modelo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masterdata.modeloactivo', verbose_name='Modelo')),
+                ('region', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masterdata.region', verbose_name='Región')),
+                ('tipo_activo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='masterdata.tipoactivo', verbose_name='Tipo de Equipo')),
+            ],
+            options={
+                'verbose_name': 'Conteo de Activos',
+                'verbose_name_plural': 'Conteos de Activos',
+                'constraints': [models.UniqueConstraint(fields=('estado', 'tipo_activo', 'modelo', 'region', 'finca', 'departamento'), name='unique_activo_count_key')],
+            },
+        ),
+        migrations.RunPython(populate_counts, migrations.RunPython.noop),
+    ]
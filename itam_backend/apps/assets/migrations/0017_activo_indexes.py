@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 10:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0016_activocount'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['estado', 'tipo_activo'], name='activo_estado_tipo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['estado', 'region'], name='activo_estado_region_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['estado', 'fecha_fin_garantia'], name='activo_estado_garantia_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='activo',
+            index=models.Index(fields=['estado', 'proximo_mantenimiento'], name='activo_estado_prox_mant_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['activo', 'returned_date'], name='assign_activo_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['employee', 'returned_date'], name='assign_employee_returned_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='maintenance',
+            index=models.Index(fields=['activo', '-created_at'], name='maint_activo_created_idx'),
+        ),
+    ]
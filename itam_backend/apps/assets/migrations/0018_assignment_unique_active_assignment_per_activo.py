@@ -0,0 +1,37 @@
+# Generated by Django 5.2.4 on 2026-10-17 11:05
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicate_active_assignments(apps, schema_editor):
+    """El índice no se puede crear si ya hay activos con más de una asignación abierta."""
+    Assignment = apps.get_model('assets', 'Assignment')
+    duplicated = list(
+        Assignment.objects.filter(returned_date__isnull=True).order_by()
+        .values('activo_id').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('activo_id', flat=True)[:20]
+    )
+    if duplicated:
+        raise RuntimeError(
+            'Hay activos con más de una asignación activa (IDs: %s). Devuelva las asignaciones '
+            'sobrantes antes de aplicar esta migración.' % ', '.join(map(str, duplicated))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('assets', '0017_activo_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_active_assignments, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='assignment',
+            constraint=models.UniqueConstraint(
+                models.Case(models.When(returned_date__isnull=True, then=models.F('activo'))),
+                name='unique_active_assignment_per_activo'
+            ),
+        ),
+    ]
@@ -5,16 +5,145 @@ Este archivo define las estructuras de datos para:
 - Activos individuales (equipos tecnológicos)
 - Registros de mantenimiento
 - Asignaciones de equipos a empleados
+- Conteos pre-agregados de activos para los dashboards
 
 Incluye lógica de negocio como cálculo automático de fechas de mantenimiento
 y sincronización de estados entre modelos relacionados.
 """
 
-from django.db import models
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import models, transaction, IntegrityError
+from django.db.models import Case, Count, F, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
 from django.utils import timezone
-from apps.masterdata.models import TipoActivo, Marca, ModeloActivo, Proveedor, Region, Finca, Departamento, Area
-from datetime import timedelta
+from apps.masterdata.models import TipoActivo, Marca, ModeloActivo, Proveedor, Region, Finca, Departamento, Area, AuditLog
+from . import scheduling
+
+# Especificaciones técnicas que el activo puede sobreescribir sobre los valores de su modelo
+SPEC_FIELDS = (
+    'procesador', 'ram', 'almacenamiento', 'tarjeta_grafica', 'wifi', 'ethernet',
+    'puertos_ethernet', 'puertos_sfp', 'puerto_consola', 'puertos_poe', 'alimentacion', 'administrable',
+    'tamano', 'color', 'conectores', 'cables',
+)
+
+
+def effective_spec_annotations(path='', alias='{}_efectivo'):
+    """
+    COALESCE expressions resolving each spec to the asset value or, when it is
+    NULL, the value of its modelo. `path` is the lookup prefix to the Activo
+    (e.g. 'activo__') and `alias` the annotation name template.
+    """
+    return {
+        alias.format(field): Coalesce(f'{path}{field}', f'{path}modelo__{field}')
+        for field in SPEC_FIELDS
+    }
+
+
+class ActivoQuerySet(models.QuerySet):
+    """QuerySet de activos con los datos que necesita el listado del API."""
+
+    def with_list_data(self):
+        """
+        Related objects and subquery annotations used by ActivoSerializer.
+
+        Resolves in the same query what the serializer would otherwise look up
+        per asset: the creator from the CREATE audit log entry (created_by_*)
+        and the attachments of the latest maintenance (ultimo_mantenimiento_adjuntos_db).
+        """
+        create_log = AuditLog.objects.filter(
+            content_type=ContentType.objects.get_for_model(self.model),
+            object_id=OuterRef('pk'),
+            activity_type='CREATE'
+        ).order_by('-timestamp')
+        latest_maintenance = Maintenance.objects.filter(activo=OuterRef('pk')).order_by('-created_at')
+
+        return self.select_related(
+            'tipo_activo', 'proveedor', 'marca', 'modelo__tipo_activo', 'region', 'finca', 'departamento', 'area',
+            'tecnico_mantenimiento', 'assigned_to', 'usuario_baja'
+        ).annotate(
+            created_by_username=Subquery(create_log.values('user__username')[:1]),
+            created_by_first_name=Subquery(create_log.values('user__first_name')[:1]),
+            created_by_last_name=Subquery(create_log.values('user__last_name')[:1]),
+            ultimo_mantenimiento_adjuntos_db=Subquery(
+                latest_maintenance.values('attachments')[:1], output_field=models.JSONField()
+            ),
+        )
+
+    def with_effective_specs(self):
+        """Anota <spec>_efectivo para cada especificación técnica (ver SPEC_FIELDS)."""
+        return self.annotate(**effective_spec_annotations())
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """bulk_create que, como Activo.save(), suma los activos nuevos a ActivoCount en la misma transacción."""
+        if kwargs.get('ignore_conflicts') or kwargs.get('update_conflicts'):
+            raise ValueError('Activo.objects.bulk_create no admite ignore_conflicts ni update_conflicts (ActivoCount).')
+
+        objs = list(objs)
+        with transaction.atomic():
+            created = super().bulk_create(objs, *args, **kwargs)
+            ActivoCount.record_changes((None, ActivoCount.key_for(obj)) for obj in objs)
+            ActivoCount.bump_version()
+        return created
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        """bulk_update que, como Activo.save(), mueve los conteos de ActivoCount en la misma transacción."""
+        if not ActivoCount.affects_key(fields):
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            if ActivoCount.affects_summary(fields):
+                ActivoCount.bump_version()
+            return rows
+
+        objs = list(objs)
+        with transaction.atomic():
+            # Llaves guardadas, con las filas bloqueadas para que nadie las cambie antes del UPDATE
+            stored = {
+                pk: tuple(key) for pk, *key in self.model.objects.select_for_update().filter(
+                    pk__in=[obj.pk for obj in objs]
+                ).values_list('pk', *ActivoCount.KEY_FIELDS)
+            }
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            ActivoCount.record_changes(
+                (stored[obj.pk], ActivoCount.key_for(obj)) for obj in objs if obj.pk in stored
+            )
+            ActivoCount.bump_version()
+        return rows
+
+    def update_with_counts(self, **kwargs):
+        """
+        update() que, como Activo.save(), mueve los conteos de ActivoCount cuando cambia
+        un campo de la llave. Los valores deben ser constantes (no expresiones F/Case).
+        """
+        if not ActivoCount.affects_key(kwargs):
+            updated = self.update(**kwargs)
+            if updated and ActivoCount.affects_summary(kwargs):
+                ActivoCount.bump_version()
+            return updated
+
+        with transaction.atomic():
+            # Se bloquean las filas para que la llave leída sea la que se reemplaza
+            rows = list(self.select_for_update().values_list('pk', *ActivoCount.KEY_FIELDS))
+            if not rows:
+                return 0
+            updated = self.model.objects.filter(pk__in=[row[0] for row in rows]).update(**kwargs)
+            ActivoCount.record_changes(
+                (tuple(old_key), ActivoCount.key_for_values(old_key, kwargs)) for _, *old_key in rows
+            )
+            ActivoCount.bump_version()
+        return updated
+
+
+class AssignmentQuerySet(models.QuerySet):
+    """QuerySet de asignaciones."""
+
+    def with_effective_specs(self):
+        """Anota activo_<spec> con la especificación efectiva del activo asignado."""
+        return self.annotate(**effective_spec_annotations('activo__', 'activo_{}'))
+
 
 class Activo(models.Model):
     """
@@ -217,38 +346,72 @@ class Activo(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ActivoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Activo"
         verbose_name_plural = "Activos"
         ordering = ['-created_at']
+        # Casi todas las consultas filtran activos por estado junto con uno de estos campos
+        indexes = [
+            models.Index(fields=['estado', 'tipo_activo'], name='activo_estado_tipo_idx'),
+            models.Index(fields=['estado', 'region'], name='activo_estado_region_idx'),
+            models.Index(fields=['estado', 'fecha_fin_garantia'], name='activo_estado_garantia_idx'),
+            models.Index(fields=['estado', 'proximo_mantenimiento'], name='activo_estado_prox_mant_idx'),
+        ]
 
     def __str__(self):
         return f"{self.hostname} - {self.serie}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not ActivoCount.affects_key(update_fields):
+            result = super().save(*args, **kwargs)
+            if ActivoCount.affects_summary(update_fields):
+                ActivoCount.bump_version()
+            return result
+
+        # El conteo pre-agregado se actualiza en la misma transacción que el activo
+        with transaction.atomic():
+            old_key = None if self._state.adding else self._stored_count_key()
+            super().save(*args, **kwargs)
+            ActivoCount.record_change(old_key, ActivoCount.key_for(self))
+            ActivoCount.bump_version()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            old_key = self._stored_count_key()
+            result = super().delete(*args, **kwargs)
+            ActivoCount.record_change(old_key, None)
+            ActivoCount.bump_version()
+        return result
+
+    def _stored_count_key(self):
+        """
+        Llave del conteo tal como está guardada en la base de datos. La fila queda
+        bloqueada hasta el fin de la transacción: dos escrituras concurrentes del
+        mismo activo no pueden mover el conteo desde la misma llave.
+        """
+        return Activo.objects.select_for_update().filter(pk=self.pk).values_list(*ActivoCount.KEY_FIELDS).first()
+
+    def effective_spec(self, field):
+        """Valor de la especificación en el activo o, si no tiene, el de su modelo."""
+        value = getattr(self, field)
+        if value is None and self.modelo_id:
+            return getattr(self.modelo, field)
+        return value
+
     def calculate_next_maintenance_date(self, from_date=None):
         """
         Calcula la próxima fecha de mantenimiento: 6 meses + 5 días hábiles desde la fecha dada.
 
         Esta función implementa la lógica de negocio para programar mantenimientos preventivos
-        de equipos tecnológicos según estándares de la industria.
+        de equipos tecnológicos según estándares de la industria. Los feriados de la región
+        del activo no cuentan como días hábiles (ver scheduling.py).
         """
         if not from_date:
             from_date = self.fecha_registro if self.fecha_registro else timezone.now().date()
-
-        # Add 6 months
-        next_date = from_date + timedelta(days=180)  # Approximately 6 months
-
-        # Add 5 business days (Monday-Friday)
-        business_days_added = 0
-        current_date = next_date
-
-        while business_days_added < 5:
-            current_date += timedelta(days=1)
-            # Monday = 0, Tuesday = 1, ..., Sunday = 6
-            if current_date.weekday() < 5:  # Monday to Friday
-                business_days_added += 1
-
-        return current_date
+        return scheduling.next_maintenance_date(from_date, self.region_id)
 
 
 class Maintenance(models.Model):
@@ -301,6 +464,10 @@ class Maintenance(models.Model):
         verbose_name = "Mantenimiento"
         verbose_name_plural = "Mantenimientos"
         ordering = ['-created_at']
+        indexes = [
+            # Último mantenimiento de un activo
+            models.Index(fields=['activo', '-created_at'], name='maint_activo_created_idx'),
+        ]
 
     def __str__(self):
         try:
@@ -326,6 +493,57 @@ class Maintenance(models.Model):
         self.activo.ultimo_mantenimiento_hallazgos = self.findings
         self.activo.save(update_fields=['ultimo_mantenimiento', 'proximo_mantenimiento', 'tecnico_mantenimiento', 'ultimo_mantenimiento_hallazgos'])
 
+    @classmethod
+    def create_batch(cls, activos, maintenance_date, technician, findings, attachments=None):
+        """
+        Register the same maintenance for several assets with the side effects of
+        save() done set-based: the next dates are calculated in one call (they
+        only depend on maintenance_date and the asset's region calendar), the
+        maintenances are inserted with bulk_create and the assets' maintenance
+        columns are written with a single UPDATE.
+        """
+        activos = list(activos)
+        if not activos:
+            return []
+        next_dates = scheduling.next_maintenance_dates(
+            [maintenance_date] * len(activos), [activo.region_id for activo in activos]
+        )
+        by_region = dict(zip((activo.region_id for activo in activos), next_dates))
+        started = timezone.now()
+
+        with transaction.atomic():
+            maintenances = cls.objects.bulk_create([
+                cls(activo=activo, maintenance_date=maintenance_date, next_maintenance_date=next_date,
+                    technician=technician, findings=findings, attachments=attachments)
+                for activo, next_date in zip(activos, next_dates)
+            ])
+            if any(maintenance.pk is None for maintenance in maintenances):
+                # Sin RETURNING (MySQL): el mantenimiento más reciente de este lote para cada activo
+                pks = dict(
+                    cls.objects.filter(
+                        activo__in=activos, technician=technician, maintenance_date=maintenance_date, created_at__gte=started
+                    ).order_by('pk').values_list('activo_id', 'pk')
+                )
+                for maintenance in maintenances:
+                    maintenance.pk = pks[maintenance.activo_id]
+
+            # La próxima fecha depende solo de la región del activo
+            Activo.objects.filter(pk__in=[activo.pk for activo in activos]).update(
+                ultimo_mantenimiento=maintenance_date,
+                proximo_mantenimiento=Case(
+                    *[When(region_id=region_id, then=Value(next_date)) for region_id, next_date in by_region.items()],
+                    output_field=models.DateField(),
+                ),
+                tecnico_mantenimiento=technician,
+                ultimo_mantenimiento_hallazgos=findings,
+            )
+        for activo, next_date in zip(activos, next_dates):
+            activo.ultimo_mantenimiento = maintenance_date
+            activo.proximo_mantenimiento = next_date
+            activo.tecnico_mantenimiento = technician
+            activo.ultimo_mantenimiento_hallazgos = findings
+        return maintenances
+
 
 class Assignment(models.Model):
     """
@@ -381,21 +599,44 @@ class Assignment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = AssignmentQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Asignación"
         verbose_name_plural = "Asignaciones"
         ordering = ['-assigned_date']
         # Ensure no duplicate active assignments for same activo
         unique_together = ['activo', 'employee', 'assigned_date']
+        constraints = [
+            # Una sola asignación activa por activo. Índice funcional (MySQL no admite índices
+            # parciales): la expresión vale activo_id si la asignación está abierta y NULL si
+            # fue devuelta, y los NULL no chocan entre sí en un índice único.
+            models.UniqueConstraint(
+                Case(When(returned_date__isnull=True, then=F('activo'))),
+                name='unique_active_assignment_per_activo'
+            ),
+        ]
+        # Asignación activa (returned_date IS NULL) de un activo o de un empleado
+        indexes = [
+            models.Index(fields=['activo', 'returned_date'], name='assign_activo_returned_idx'),
+            models.Index(fields=['employee', 'returned_date'], name='assign_employee_returned_idx'),
+        ]
 
     def __str__(self):
         return f"{self.activo.hostname} asignado a {self.employee.first_name} {self.employee.last_name}"
 
+    ACTIVE_CONSTRAINT = 'unique_active_assignment_per_activo'
+
     @property
     def is_active(self):
         """Check if assignment is currently active (not returned)"""
         return self.returned_date is None
 
+    @classmethod
+    def is_active_conflict(cls, error):
+        """True if an IntegrityError comes from the one-active-assignment-per-activo constraint."""
+        return cls.ACTIVE_CONSTRAINT in str(error)
+
     def save(self, *args, **kwargs):
         # Si es una nueva asignación (sin fecha de devolución), establece el assigned_to del activo
         if not self.returned_date and self.employee:
@@ -424,6 +665,37 @@ class Assignment(models.Model):
 
         super().save(*args, **kwargs)
 
+    @classmethod
+    def create_active(cls, activos, employee, assigned_by):
+        """
+        Open one assignment per asset for `employee`, with the side effects of
+        save() done set-based: the employee's user account is looked up once and
+        stored as assigned_to of every asset with one bulk_update, and the
+        assignments are inserted with bulk_create.
+
+        Raises IntegrityError (see is_active_conflict) if an asset already has
+        an active assignment.
+        """
+        activos = list(activos)
+        user = employee.user_account.order_by('pk').first()
+        with transaction.atomic():
+            if user is not None:
+                for activo in activos:
+                    activo.assigned_to = user
+                Activo.objects.bulk_update(activos, ['assigned_to'])
+
+            assignments = cls.objects.bulk_create([
+                cls(activo=activo, employee=employee, assigned_by=assigned_by) for activo in activos
+            ])
+            if any(assignment.pk is None for assignment in assignments):
+                # Sin RETURNING (MySQL): la única asignación activa de cada activo es la recién creada
+                pks = dict(
+                    cls.objects.filter(activo__in=activos, returned_date__isnull=True).values_list('activo_id', 'pk')
+                )
+                for assignment in assignments:
+                    assignment.pk = pks[assignment.activo_id]
+        return assignments
+
     def return_assignment(self, returned_by_user, return_date=None):
         """
         Marca la asignación como devuelta.
@@ -435,3 +707,151 @@ class Assignment(models.Model):
         self.returned_date = return_date or timezone.now()
         self.returned_by = returned_by_user
         self.save()
+
+
+class ActivoCount(models.Model):
+    """
+    Conteo pre-agregado de activos por estado, tipo, modelo y ubicación.
+
+    Cada fila guarda cuántos activos comparten la misma combinación de
+    (estado, tipo_activo, modelo, region, finca, departamento). Se mantiene
+    dentro de la misma transacción en que se crea, actualiza, retira, reactiva
+    o elimina un Activo, y los dashboards leen de aquí en lugar de contar
+    la tabla de activos en cada petición.
+
+    Los conteos que se guardan en la caché compartida (p. ej. el resumen por
+    garantía del dashboard) usan version() en su llave; cada escritura de
+    activos que puede cambiarlos llama a bump_version().
+    """
+
+    # Campos de Activo que forman la llave del conteo (en orden)
+    KEY_FIELDS = ('estado', 'tipo_activo_id', 'modelo_id', 'region_id', 'finca_id', 'departamento_id')
+    # Campos que, sin mover el conteo, cambian la categoría de garantía del dashboard
+    SUMMARY_FIELDS = ('fecha_fin_garantia',)
+    VERSION_KEY = 'assets:activo_count:version'
+
+    estado = models.CharField(max_length=20, verbose_name="Estado")
+    tipo_activo = models.ForeignKey(TipoActivo, on_delete=models.CASCADE, related_name='+', verbose_name="Tipo de Equipo")
+    modelo = models.ForeignKey(ModeloActivo, on_delete=models.CASCADE, related_name='+', verbose_name="Modelo")
+    region = models.ForeignKey(Region, on_delete=models.CASCADE, related_name='+', verbose_name="Región")
+    finca = models.ForeignKey(Finca, on_delete=models.CASCADE, related_name='+', verbose_name="Finca")
+    departamento = models.ForeignKey(Departamento, on_delete=models.CASCADE, related_name='+', verbose_name="Departamento")
+    total = models.IntegerField(default=0, verbose_name="Total")
+
+    class Meta:
+        verbose_name = "Conteo de Activos"
+        verbose_name_plural = "Conteos de Activos"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['estado', 'tipo_activo', 'modelo', 'region', 'finca', 'departamento'],
+                name='unique_activo_count_key'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.estado} - {self.total}"
+
+    @classmethod
+    def key_for(cls, activo):
+        """Return the count key (tuple of KEY_FIELDS values) for an Activo instance."""
+        return tuple(getattr(activo, field) for field in cls.KEY_FIELDS)
+
+    @classmethod
+    def key_for_values(cls, old_key, values):
+        """Count key after applying QuerySet.update(**values) to an asset with old_key."""
+        key = []
+        for field, old in zip(cls.KEY_FIELDS, old_key):
+            value = values.get(field, values.get(field[:-3], old) if field.endswith('_id') else old)
+            key.append(value.pk if isinstance(value, models.Model) else value)
+        return tuple(key)
+
+    @classmethod
+    def affects_key(cls, update_fields):
+        """Check whether saving only these fields can move an asset to another count row."""
+        names = set(cls.KEY_FIELDS) | {field[:-3] for field in cls.KEY_FIELDS if field.endswith('_id')}
+        return bool(names & set(update_fields))
+
+    @classmethod
+    def affects_summary(cls, update_fields):
+        """Check whether saving only these fields can change the cached dashboard counts."""
+        return cls.affects_key(update_fields) or bool(set(cls.SUMMARY_FIELDS) & set(update_fields))
+
+    @classmethod
+    def version(cls):
+        """Shared version of the asset counts (see bump_version)."""
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            # Si la caché se vacía, la versión no vuelve a empezar en un valor ya usado
+            cache.add(cls.VERSION_KEY, time.time_ns(), timeout=None)
+            version = cache.get(cls.VERSION_KEY, 0)
+        return version
+
+    @classmethod
+    def bump_version(cls):
+        """
+        Invalidate the cached counts: the version is incremented now, so this
+        transaction does not read its own stale counts, and again on commit, so
+        no worker keeps counts computed before the change was visible.
+        """
+        cls._increment_version()
+        transaction.on_commit(cls._increment_version)
+
+    @classmethod
+    def _increment_version(cls):
+        try:
+            cache.incr(cls.VERSION_KEY)
+        except ValueError:
+            # La llave no existe (caché vacía o expirada)
+            cache.add(cls.VERSION_KEY, time.time_ns(), timeout=None) or cache.incr(cls.VERSION_KEY)
+
+    @classmethod
+    def record_change(cls, old_key, new_key):
+        """Move one asset from old_key to new_key (either may be None for create/delete)."""
+        cls.record_changes([(old_key, new_key)])
+
+    @classmethod
+    def record_changes(cls, changes):
+        """Move several assets at once: (old_key, new_key) pairs applied as one set of deltas."""
+        deltas = defaultdict(int)
+        for old_key, new_key in changes:
+            if old_key == new_key:
+                continue
+            if old_key is not None:
+                deltas[old_key] -= 1
+            if new_key is not None:
+                deltas[new_key] += 1
+        cls.apply_deltas(deltas)
+
+    @classmethod
+    def apply_deltas(cls, deltas):
+        """Apply {key: delta} increments atomically; missing rows are created."""
+        with transaction.atomic():
+            for key, delta in deltas.items():
+                if not delta:
+                    continue
+                lookup = dict(zip(cls.KEY_FIELDS, key))
+                if cls.objects.filter(**lookup).update(total=F('total') + delta):
+                    continue
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(total=delta, **lookup)
+                except IntegrityError:
+                    # Otra transacción creó la fila al mismo tiempo
+                    cls.objects.filter(**lookup).update(total=F('total') + delta)
+
+    @classmethod
+    def rebuild(cls):
+        """Recalculate every count row from the Activo table. Returns the number of rows."""
+        with transaction.atomic():
+            # Toda escritura de activos actualiza ActivoCount en su misma transacción: con los
+            # conteos bloqueados, las escrituras en curso esperan a que termine la reconstrucción
+            # y aplican su cambio sobre los conteos nuevos, que no las incluyen
+            list(cls.objects.select_for_update().values_list('pk', flat=True))
+            rows = Activo.objects.order_by().values(*cls.KEY_FIELDS).annotate(count=Count('id'))
+            counts = [
+                cls(total=row.pop('count'), **row)
+                for row in rows
+            ]
+            cls.objects.all().delete()
+            cls.objects.bulk_create(counts, batch_size=1000)
+        return len(counts)
@@ -0,0 +1,160 @@
+"""
+Planificación de la carga de mantenimientos por técnico y por día.
+
+Los mantenimientos pendientes (activos con proximo_mantenimiento hasta el
+último día del plan, incluidos los vencidos) se agrupan por finca y se
+reparten con un algoritmo voraz por cubetas:
+
+- Cada finca es una cubeta con sus activos ordenados por fecha de vencimiento;
+  las cubetas de cada región están en un heap ordenado por el vencimiento más
+  próximo de la finca.
+- Cada día hábil, cada técnico toma la finca más urgente (de su región, si el
+  usuario tiene una asignada) y atiende hasta su capacidad diaria. Si termina
+  la finca y le queda capacidad, continúa con la siguiente finca más urgente de
+  la misma región; nunca cambia de región en el mismo día.
+- Un día que es feriado en una región (ver scheduling.py) no se planifica
+  trabajo en esa región.
+
+Todo el cálculo es en memoria sobre una sola consulta de activos pendientes,
+con costo O(n log f) para n activos y f fincas. Los nombres de fincas y
+regiones se toman de la caché de catálogos.
+"""
+
+import heapq
+from collections import defaultdict, deque
+from datetime import timedelta
+
+from apps.masterdata import cache as catalog_cache
+from apps.masterdata.models import Finca, Region
+from . import scheduling
+from .models import Activo
+
+DEFAULT_DAILY_CAPACITY = 20
+DEFAULT_PLANNING_DAYS = 10
+MAX_PLANNING_DAYS = 60
+
+
+def planning_days(start, count):
+    """The first `count` weekdays from `start` (inclusive) that are not national holidays."""
+    calendar = scheduling.calendars([None])[None]
+    days, day = [], start
+    while len(days) < count:
+        if calendar.is_business_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def pending_maintenances(until, regions=None, fincas=None):
+    """
+    (id, hostname, proximo_mantenimiento, region_id, finca_id) of the active assets
+    due on or before `until`, optionally limited to some regions or fincas. One query.
+    """
+    queryset = Activo.objects.filter(estado='activo', proximo_mantenimiento__lte=until)
+    if regions:
+        queryset = queryset.filter(region_id__in=regions)
+    if fincas:
+        queryset = queryset.filter(finca_id__in=fincas)
+    return queryset.order_by('proximo_mantenimiento', 'pk').values_list(
+        'pk', 'hostname', 'proximo_mantenimiento', 'region_id', 'finca_id'
+    )
+
+
+def plan_maintenances(pending, technicians, days):
+    """
+    Spread `pending` (see pending_maintenances) over `days` and `technicians`
+    ({'id', 'name', 'capacity', 'region_id'} dicts, region_id None for any region).
+
+    Returns {'days': [{'date', 'assignments': [{'technician', 'technician_name',
+    'total', 'fincas': [{'finca_id', 'finca', 'region_id', 'region', 'activos'}]}]}],
+    'scheduled', 'unscheduled', 'backlog': [{'finca_id', 'finca', 'count', 'first_due'}]}.
+    """
+    buckets = defaultdict(deque)
+    finca_region = {}
+    for activo_id, hostname, due, region_id, finca_id in pending:
+        buckets[finca_id].append((activo_id, hostname, due))
+        finca_region[finca_id] = region_id
+    for finca_id in buckets:
+        # Normalmente ya vienen ordenados por la consulta
+        buckets[finca_id] = deque(sorted(buckets[finca_id], key=lambda asset: (asset[2], asset[0])))
+
+    heaps = defaultdict(list)  # región -> [(vencimiento más próximo, finca)]
+    for finca_id, bucket in buckets.items():
+        heaps[finca_region[finca_id]].append((bucket[0][2], finca_id))
+    for heap in heaps.values():
+        heapq.heapify(heap)
+
+    calendars = scheduling.calendars(heaps)
+    fincas = catalog_cache.objects(Finca)
+    regions = catalog_cache.objects(Region)
+
+    plan, scheduled = [], 0
+    for day in days:
+        open_regions = [region_id for region_id in heaps if heaps[region_id] and calendars[region_id].is_business_day(day)]
+        assignments = []
+        for technician in technicians:
+            allowed = [technician['region_id']] if technician['region_id'] is not None else open_regions
+            candidates = [region_id for region_id in allowed if region_id in open_regions and heaps[region_id]]
+            if not candidates:
+                continue
+            # La región con la finca más urgente
+            region_id = min(candidates, key=lambda region_id: heaps[region_id][0])
+            heap = heaps[region_id]
+
+            capacity = technician['capacity']
+            visits = []
+            while capacity and heap:
+                _, finca_id = heapq.heappop(heap)
+                bucket = buckets[finca_id]
+                taken = [bucket.popleft() for _ in range(min(capacity, len(bucket)))]
+                capacity -= len(taken)
+                if bucket:
+                    heapq.heappush(heap, (bucket[0][2], finca_id))
+                visits.append(_visit(finca_id, region_id, taken, fincas, regions))
+
+            total = sum(len(visit['activos']) for visit in visits)
+            scheduled += total
+            assignments.append({
+                'technician': technician['id'],
+                'technician_name': technician['name'],
+                'total': total,
+                'fincas': visits,
+            })
+        plan.append({'date': day.isoformat(), 'assignments': assignments})
+
+    backlog = sorted(
+        (
+            {
+                'finca_id': finca_id,
+                'finca': _name(fincas, finca_id),
+                'count': len(bucket),
+                'first_due': bucket[0][2].isoformat(),
+            }
+            for finca_id, bucket in buckets.items() if bucket
+        ),
+        key=lambda item: (item['first_due'], item['finca_id'] or 0)
+    )
+    return {
+        'days': plan,
+        'scheduled': scheduled,
+        'unscheduled': sum(item['count'] for item in backlog),
+        'backlog': backlog,
+    }
+
+
+def _visit(finca_id, region_id, assets, fincas, regions):
+    return {
+        'finca_id': finca_id,
+        'finca': _name(fincas, finca_id),
+        'region_id': region_id,
+        'region': _name(regions, region_id),
+        'activos': [
+            {'id': activo_id, 'hostname': hostname, 'proximo_mantenimiento': due.isoformat()}
+            for activo_id, hostname, due in assets
+        ],
+    }
+
+
+def _name(catalog, pk):
+    obj = catalog.get(pk)
+    return obj.name if obj is not None else ''
@@ -0,0 +1,115 @@
+"""
+Programación de fechas de mantenimiento con días hábiles y feriados.
+
+La próxima fecha de mantenimiento es la fecha de referencia más
+MAINTENANCE_INTERVAL_DAYS días naturales y luego MAINTENANCE_BUSINESS_DAYS
+días hábiles. Un día es hábil si es de lunes a viernes y no es feriado en la
+región del activo (ver masterdata.Feriado: los feriados sin región aplican a
+todas las regiones).
+
+next_maintenance_dates() calcula un arreglo completo de fechas en una sola
+llamada: por cada calendario (región) arma una vez la tabla ordenada de días
+hábiles que cubre el rango de fechas pedido, y cada fecha se resuelve con una
+búsqueda binaria en esa tabla en lugar de avanzar día por día. Los feriados se
+leen de la caché de catálogos, así que calcular fechas no consulta la base de
+datos salvo al recargar el catálogo.
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+from apps.masterdata import cache as catalog_cache
+from apps.masterdata.models import Feriado
+
+# 6 meses aproximados + 5 días hábiles (estándar de mantenimiento preventivo)
+MAINTENANCE_INTERVAL_DAYS = 180
+MAINTENANCE_BUSINESS_DAYS = 5
+
+
+class BusinessCalendar:
+    """Monday–Friday calendar without the given holidays, with a lazily built table of business days."""
+
+    def __init__(self, holidays=()):
+        self.holidays = frozenset(day.toordinal() for day in holidays)
+        self._first = self._last = None
+        self._days = []  # ordinales de los días hábiles entre _first y _last, ordenados
+
+    def is_business_day(self, day):
+        return day.weekday() < 5 and day.toordinal() not in self.holidays
+
+    def add_business_days(self, days, count):
+        """
+        For each date in `days`, the `count`-th business day strictly after it
+        (None stays None). One table lookup per date.
+        """
+        ordinals = [day.toordinal() for day in days if day is not None]
+        if not ordinals:
+            return [None] * len(days)
+        self._cover(min(ordinals), max(ordinals), count)
+
+        table, result = self._days, []
+        for day in days:
+            if day is None:
+                result.append(None)
+                continue
+            position = bisect_right(table, day.toordinal()) + count - 1
+            result.append(date.fromordinal(table[position]))
+        return result
+
+    def _cover(self, first, last, count):
+        """Extend the table so it covers (first, last] plus `count` business days after `last`."""
+        start = first if self._first is None else min(first, self._first)
+        end = last if self._last is None else max(last, self._last)
+        while True:
+            if (start, end) != (self._first, self._last):
+                self._days = [
+                    ordinal for ordinal in range(start + 1, end + 1)
+                    if ordinal % 7 not in (0, 6) and ordinal not in self.holidays  # 0 = domingo, 6 = sábado
+                ]
+                self._first, self._last = start, end
+            if len(self._days) - bisect_right(self._days, last) >= count:
+                return
+            # Hacen falta más días hábiles después de `last` (fines de semana y feriados)
+            end += 7 * (count // 5 + 2)
+
+
+def calendars(region_ids):
+    """{region_id: BusinessCalendar} with the national holidays plus each region's own."""
+    by_region = defaultdict(list)
+    for feriado in catalog_cache.objects(Feriado).values():
+        by_region[feriado.region_id].append(feriado.fecha)
+    return {
+        region_id: BusinessCalendar(by_region[None] + (by_region[region_id] if region_id is not None else []))
+        for region_id in set(region_ids)
+    }
+
+
+def next_maintenance_dates(from_dates, region_ids=None):
+    """
+    Next maintenance date for each date in `from_dates`, using the holiday
+    calendar of the matching region in `region_ids` (national holidays only
+    when omitted or None). None dates give None.
+    """
+    from_dates = list(from_dates)
+    region_ids = list(region_ids) if region_ids is not None else [None] * len(from_dates)
+    interval = timedelta(days=MAINTENANCE_INTERVAL_DAYS)
+
+    groups = defaultdict(list)
+    for index, region_id in enumerate(region_ids):
+        groups[region_id].append(index)
+
+    result = [None] * len(from_dates)
+    for region_id, calendar in calendars(groups).items():
+        indexes = groups[region_id]
+        bases = [from_dates[i] + interval if from_dates[i] is not None else None for i in indexes]
+        for i, next_date in zip(indexes, calendar.add_business_days(bases, MAINTENANCE_BUSINESS_DAYS)):
+            result[i] = next_date
+    return result
+
+
+def next_maintenance_date(from_date=None, region_id=None):
+    """Next maintenance date for a single date (today when omitted)."""
+    return next_maintenance_dates([from_date or timezone.now().date()], [region_id])[0]
@@ -6,12 +6,40 @@ para las APIs REST. Incluyen lógica para mostrar nombres en lugar de IDs,
 campos calculados y validaciones personalizadas.
 """
 
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
+from rest_framework.settings import api_settings
 from .models import Activo, Maintenance, Assignment
+from apps.masterdata.serializers import CatalogPrimaryKeyRelatedField
 from apps.masterdata.models import TipoActivo, Marca, ModeloActivo, Proveedor, Region, Finca, Departamento, Area, AuditLog
 from apps.employees.models import Employee
 from django.contrib.contenttypes.models import ContentType
 
+
+class EffectiveSpecField(serializers.ReadOnlyField):
+    """
+    Especificación técnica efectiva de un activo: su propio valor o, si es NULL,
+    el de su modelo.
+
+    Usa la anotación de with_effective_specs() cuando el queryset la trae; si no,
+    resuelve el valor en Python con Activo.effective_spec().
+    """
+
+    def __init__(self, spec, through_activo=False, **kwargs):
+        self.spec = spec
+        self.through_activo = through_activo
+        self.annotation = f'activo_{spec}' if through_activo else f'{spec}_efectivo'
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        if hasattr(instance, self.annotation):
+            return getattr(instance, self.annotation)
+        activo = instance.activo if self.through_activo else instance
+        return activo.effective_spec(self.spec)
+
+
 class ActivoSerializer(serializers.ModelSerializer):
     """
     Serializador principal para el modelo Activo.
@@ -42,22 +70,22 @@ class ActivoSerializer(serializers.ModelSerializer):
 
     # Campos calculados que priorizan valores del activo sobre los del modelo
     # Permiten personalizar especificaciones técnicas por activo individual
-    procesador = serializers.SerializerMethodField()
-    ram = serializers.SerializerMethodField()
-    almacenamiento = serializers.SerializerMethodField()
-    tarjeta_grafica = serializers.SerializerMethodField()
-    wifi = serializers.SerializerMethodField()
-    ethernet = serializers.SerializerMethodField()
-    puertos_ethernet = serializers.SerializerMethodField()
-    puertos_sfp = serializers.SerializerMethodField()
-    puerto_consola = serializers.SerializerMethodField()
-    puertos_poe = serializers.SerializerMethodField()
-    alimentacion = serializers.SerializerMethodField()
-    administrable = serializers.SerializerMethodField()
-    tamano = serializers.SerializerMethodField()
-    color = serializers.SerializerMethodField()
-    conectores = serializers.SerializerMethodField()
-    cables = serializers.SerializerMethodField()
+    procesador = EffectiveSpecField('procesador')
+    ram = EffectiveSpecField('ram')
+    almacenamiento = EffectiveSpecField('almacenamiento')
+    tarjeta_grafica = EffectiveSpecField('tarjeta_grafica')
+    wifi = EffectiveSpecField('wifi')
+    ethernet = EffectiveSpecField('ethernet')
+    puertos_ethernet = EffectiveSpecField('puertos_ethernet')
+    puertos_sfp = EffectiveSpecField('puertos_sfp')
+    puerto_consola = EffectiveSpecField('puerto_consola')
+    puertos_poe = EffectiveSpecField('puertos_poe')
+    alimentacion = EffectiveSpecField('alimentacion')
+    administrable = EffectiveSpecField('administrable')
+    tamano = EffectiveSpecField('tamano')
+    color = EffectiveSpecField('color')
+    conectores = EffectiveSpecField('conectores')
+    cables = EffectiveSpecField('cables')
 
     # Asset type category for conditional display
     asset_type_category = serializers.SerializerMethodField()
@@ -78,42 +106,42 @@ class ActivoSerializer(serializers.ModelSerializer):
     ultimo_mantenimiento_adjuntos = serializers.SerializerMethodField()
 
     # Write-only fields for sending IDs
-    tipo_activo = serializers.PrimaryKeyRelatedField(
+    tipo_activo = CatalogPrimaryKeyRelatedField(
         queryset=TipoActivo.objects.all(),
         write_only=True,
         required=True
     )
-    proveedor = serializers.PrimaryKeyRelatedField(
+    proveedor = CatalogPrimaryKeyRelatedField(
         queryset=Proveedor.objects.all(),
         write_only=True,
         required=True
     )
-    marca = serializers.PrimaryKeyRelatedField(
+    marca = CatalogPrimaryKeyRelatedField(
         queryset=Marca.objects.all(),
         write_only=True,
         required=True
     )
-    modelo = serializers.PrimaryKeyRelatedField(
+    modelo = CatalogPrimaryKeyRelatedField(
         queryset=ModeloActivo.objects.all(),
         write_only=True,
         required=True
     )
-    region = serializers.PrimaryKeyRelatedField(
+    region = CatalogPrimaryKeyRelatedField(
         queryset=Region.objects.all(),
         write_only=True,
         required=True
     )
-    finca = serializers.PrimaryKeyRelatedField(
+    finca = CatalogPrimaryKeyRelatedField(
         queryset=Finca.objects.all(),
         write_only=True,
         required=True
     )
-    departamento = serializers.PrimaryKeyRelatedField(
+    departamento = CatalogPrimaryKeyRelatedField(
         queryset=Departamento.objects.all(),
         write_only=True,
         required=True
     )
-    area = serializers.PrimaryKeyRelatedField(
+    area = CatalogPrimaryKeyRelatedField(
         queryset=Area.objects.all(),
         write_only=True,
         required=True
@@ -186,6 +214,13 @@ class ActivoSerializer(serializers.ModelSerializer):
 
     def get_created_by_user(self, obj):
         """Get the user who created this asset from audit logs"""
+        # Valores anotados por Activo.objects.with_list_data() (sin consultas adicionales)
+        if hasattr(obj, 'created_by_username'):
+            if obj.created_by_username is None:
+                return "Desconocido"
+            full_name = f"{obj.created_by_first_name or ''} {obj.created_by_last_name or ''}".strip()
+            return full_name or obj.created_by_username
+
         try:
             content_type = ContentType.objects.get_for_model(obj)
             audit_log = AuditLog.objects.filter(
@@ -209,61 +244,14 @@ class ActivoSerializer(serializers.ModelSerializer):
 
     def get_ultimo_mantenimiento_adjuntos(self, obj):
         """Get the attachments from the latest maintenance"""
+        if hasattr(obj, 'ultimo_mantenimiento_adjuntos_db'):
+            return obj.ultimo_mantenimiento_adjuntos_db
         try:
             latest_maintenance = obj.maintenances.order_by('-created_at').first()
             return latest_maintenance.attachments if latest_maintenance else None
         except Exception:
             return None
 
-    # Asset spec field getters (prefer asset value, fallback to modelo)
-    def get_procesador(self, obj):
-        return obj.procesador if obj.procesador is not None else (obj.modelo.procesador if obj.modelo else None)
-
-    def get_ram(self, obj):
-        return obj.ram if obj.ram is not None else (obj.modelo.ram if obj.modelo else None)
-
-    def get_almacenamiento(self, obj):
-        return obj.almacenamiento if obj.almacenamiento is not None else (obj.modelo.almacenamiento if obj.modelo else None)
-
-    def get_tarjeta_grafica(self, obj):
-        return obj.tarjeta_grafica if obj.tarjeta_grafica is not None else (obj.modelo.tarjeta_grafica if obj.modelo else None)
-
-    def get_wifi(self, obj):
-        return obj.wifi if obj.wifi is not None else (obj.modelo.wifi if obj.modelo else False)
-
-    def get_ethernet(self, obj):
-        return obj.ethernet if obj.ethernet is not None else (obj.modelo.ethernet if obj.modelo else False)
-
-    def get_puertos_ethernet(self, obj):
-        return obj.puertos_ethernet if obj.puertos_ethernet is not None else (obj.modelo.puertos_ethernet if obj.modelo else None)
-
-    def get_puertos_sfp(self, obj):
-        return obj.puertos_sfp if obj.puertos_sfp is not None else (obj.modelo.puertos_sfp if obj.modelo else None)
-
-    def get_puerto_consola(self, obj):
-        return obj.puerto_consola if obj.puerto_consola is not None else (obj.modelo.puerto_consola if obj.modelo else False)
-
-    def get_puertos_poe(self, obj):
-        return obj.puertos_poe if obj.puertos_poe is not None else (obj.modelo.puertos_poe if obj.modelo else None)
-
-    def get_alimentacion(self, obj):
-        return obj.alimentacion if obj.alimentacion is not None else (obj.modelo.alimentacion if obj.modelo else None)
-
-    def get_administrable(self, obj):
-        return obj.administrable if obj.administrable is not None else (obj.modelo.administrable if obj.modelo else False)
-
-    def get_tamano(self, obj):
-        return obj.tamano if obj.tamano is not None else (obj.modelo.tamano if obj.modelo else None)
-
-    def get_color(self, obj):
-        return obj.color if obj.color is not None else (obj.modelo.color if obj.modelo else None)
-
-    def get_conectores(self, obj):
-        return obj.conectores if obj.conectores is not None else (obj.modelo.conectores if obj.modelo else None)
-
-    def get_cables(self, obj):
-        return obj.cables if obj.cables is not None else (obj.modelo.cables if obj.modelo else None)
-
 
 class MaintenanceSerializer(serializers.ModelSerializer):
     technician_name = serializers.CharField(source='technician.username', read_only=True)
@@ -289,22 +277,22 @@ class AssignmentSerializer(serializers.ModelSerializer):
     activo_modelo_name = serializers.CharField(source='activo.modelo.name', read_only=True)
 
     # Asset specs (prefer activo value, fallback to modelo)
-    activo_procesador = serializers.SerializerMethodField()
-    activo_ram = serializers.SerializerMethodField()
-    activo_almacenamiento = serializers.SerializerMethodField()
-    activo_tarjeta_grafica = serializers.SerializerMethodField()
-    activo_wifi = serializers.SerializerMethodField()
-    activo_ethernet = serializers.SerializerMethodField()
-    activo_puertos_ethernet = serializers.SerializerMethodField()
-    activo_puertos_sfp = serializers.SerializerMethodField()
-    activo_puerto_consola = serializers.SerializerMethodField()
-    activo_puertos_poe = serializers.SerializerMethodField()
-    activo_alimentacion = serializers.SerializerMethodField()
-    activo_administrable = serializers.SerializerMethodField()
-    activo_tamano = serializers.SerializerMethodField()
-    activo_color = serializers.SerializerMethodField()
-    activo_conectores = serializers.SerializerMethodField()
-    activo_cables = serializers.SerializerMethodField()
+    activo_procesador = EffectiveSpecField('procesador', through_activo=True)
+    activo_ram = EffectiveSpecField('ram', through_activo=True)
+    activo_almacenamiento = EffectiveSpecField('almacenamiento', through_activo=True)
+    activo_tarjeta_grafica = EffectiveSpecField('tarjeta_grafica', through_activo=True)
+    activo_wifi = EffectiveSpecField('wifi', through_activo=True)
+    activo_ethernet = EffectiveSpecField('ethernet', through_activo=True)
+    activo_puertos_ethernet = EffectiveSpecField('puertos_ethernet', through_activo=True)
+    activo_puertos_sfp = EffectiveSpecField('puertos_sfp', through_activo=True)
+    activo_puerto_consola = EffectiveSpecField('puerto_consola', through_activo=True)
+    activo_puertos_poe = EffectiveSpecField('puertos_poe', through_activo=True)
+    activo_alimentacion = EffectiveSpecField('alimentacion', through_activo=True)
+    activo_administrable = EffectiveSpecField('administrable', through_activo=True)
+    activo_tamano = EffectiveSpecField('tamano', through_activo=True)
+    activo_color = EffectiveSpecField('color', through_activo=True)
+    activo_conectores = EffectiveSpecField('conectores', through_activo=True)
+    activo_cables = EffectiveSpecField('cables', through_activo=True)
     employee_name = serializers.SerializerMethodField()
     employee_number = serializers.CharField(source='employee.employee_number', read_only=True)
     assigned_by_name = serializers.CharField(source='assigned_by.username', read_only=True)
@@ -349,55 +337,6 @@ class AssignmentSerializer(serializers.ModelSerializer):
         """Get the full name of the employee"""
         return f"{obj.employee.first_name} {obj.employee.last_name}".strip()
 
-    # Asset spec getters for assignment serializer
-    def get_activo_procesador(self, obj):
-        return obj.activo.procesador if obj.activo.procesador is not None else (obj.activo.modelo.procesador if obj.activo.modelo else None)
-
-    def get_activo_ram(self, obj):
-        return obj.activo.ram if obj.activo.ram is not None else (obj.activo.modelo.ram if obj.activo.modelo else None)
-
-    def get_activo_almacenamiento(self, obj):
-        return obj.activo.almacenamiento if obj.activo.almacenamiento is not None else (obj.activo.modelo.almacenamiento if obj.activo.modelo else None)
-
-    def get_activo_tarjeta_grafica(self, obj):
-        return obj.activo.tarjeta_grafica if obj.activo.tarjeta_grafica is not None else (obj.activo.modelo.tarjeta_grafica if obj.activo.modelo else None)
-
-    def get_activo_wifi(self, obj):
-        return obj.activo.wifi if obj.activo.wifi is not None else (obj.activo.modelo.wifi if obj.activo.modelo else False)
-
-    def get_activo_ethernet(self, obj):
-        return obj.activo.ethernet if obj.activo.ethernet is not None else (obj.activo.modelo.ethernet if obj.activo.modelo else False)
-
-    def get_activo_puertos_ethernet(self, obj):
-        return obj.activo.puertos_ethernet if obj.activo.puertos_ethernet is not None else (obj.activo.modelo.puertos_ethernet if obj.activo.modelo else None)
-
-    def get_activo_puertos_sfp(self, obj):
-        return obj.activo.puertos_sfp if obj.activo.puertos_sfp is not None else (obj.activo.modelo.puertos_sfp if obj.activo.modelo else None)
-
-    def get_activo_puerto_consola(self, obj):
-        return obj.activo.puerto_consola if obj.activo.puerto_consola is not None else (obj.activo.modelo.puerto_consola if obj.activo.modelo else False)
-
-    def get_activo_puertos_poe(self, obj):
-        return obj.activo.puertos_poe if obj.activo.puertos_poe is not None else (obj.activo.modelo.puertos_poe if obj.activo.modelo else None)
-
-    def get_activo_alimentacion(self, obj):
-        return obj.activo.alimentacion if obj.activo.alimentacion is not None else (obj.activo.modelo.alimentacion if obj.activo.modelo else None)
-
-    def get_activo_administrable(self, obj):
-        return obj.activo.administrable if obj.activo.administrable is not None else (obj.activo.modelo.administrable if obj.activo.modelo else False)
-
-    def get_activo_tamano(self, obj):
-        return obj.activo.tamano if obj.activo.tamano is not None else (obj.activo.modelo.tamano if obj.activo.modelo else None)
-
-    def get_activo_color(self, obj):
-        return obj.activo.color if obj.activo.color is not None else (obj.activo.modelo.color if obj.activo.modelo else None)
-
-    def get_activo_conectores(self, obj):
-        return obj.activo.conectores if obj.activo.conectores is not None else (obj.activo.modelo.conectores if obj.activo.modelo else None)
-
-    def get_activo_cables(self, obj):
-        return obj.activo.cables if obj.activo.cables is not None else (obj.activo.modelo.cables if obj.activo.modelo else None)
-
     def validate(self, data):
         """Custom validation for assignment rules"""
         activo = data.get('activo')
@@ -416,17 +355,31 @@ class AssignmentSerializer(serializers.ModelSerializer):
                     f"El empleado ya tiene asignado un activo del tipo '{activo.tipo_activo.name}'."
                 )
 
-            # Check if activo is already assigned and not returned
-            if Assignment.objects.filter(
-                activo=activo,
-                returned_date__isnull=True
-            ).exclude(id=getattr(self.instance, 'id', None)).exists():
-                raise serializers.ValidationError(
-                    f"El activo '{activo.hostname}' ya está asignado a otro empleado."
-                )
-
+        # Que el activo no tenga otra asignación activa lo garantiza la base de datos
+        # (Assignment.ACTIVE_CONSTRAINT); ver create() y update()
         return data
 
+    def create(self, validated_data):
+        with self._active_conflict_as_error(validated_data.get('activo')):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self._active_conflict_as_error(validated_data.get('activo', instance.activo)):
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def _active_conflict_as_error(self, activo):
+        """Translate a violation of the one-active-assignment constraint into the usual validation error."""
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as error:
+            if not Assignment.is_active_conflict(error):
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: [f"El activo '{activo.hostname}' ya está asignado a otro empleado."]
+            })
+
     def validate_ram(self, value):
         """Validate RAM is a positive integer"""
         if value is not None and (not isinstance(value, int) or value < 0):
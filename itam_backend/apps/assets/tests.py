@@ -1,3 +1,1147 @@
-from django.test import TestCase
+import io
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+from datetime import date, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, connection, transaction
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.employees.models import Employee
+from apps.masterdata import audit
+from apps.masterdata.models import TipoActivo, Marca, ModeloActivo, Proveedor, Region, Finca, Departamento, Area, Feriado, AuditLog
+from . import importer, planning, scheduling
+from .models import Activo, ActivoCount, Assignment, Maintenance
+
+User = get_user_model()
+
+
+class AssetsTestMixin:
+    """Catálogos mínimos y helpers para crear activos en las pruebas."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+        # Catálogos confirmados (ver masterdata.cache: los cambios sin confirmar no se guardan en caché)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.region = Region.objects.create(name='Costa Sur')
+            self.finca = Finca.objects.create(name='Finca Uno', region=self.region)
+            self.departamento = Departamento.objects.create(name='IT')
+            self.area = Area.objects.create(name='Soporte', departamento=self.departamento)
+            self.marca = Marca.objects.create(name='Dell')
+            self.proveedor = Proveedor.objects.create(
+                nombre_empresa='Proveedor SA', nit='123', direccion='Ciudad', nombre_contacto='Ana'
+            )
+        self._serial = 0
+
+    def make_employee(self, number, username=None):
+        employee = Employee.objects.create(
+            employee_number=number, first_name='Empleado', last_name=number, start_date=date(2020, 1, 1)
+        )
+        user = User.objects.create_user(
+            username=username, email=f'{username}@itam.com', password='clave12345', employee=employee
+        ) if username else None
+        return employee, user
+
+    def make_tipo(self, name):
+        tipo = TipoActivo.objects.create(name=name)
+        modelo = ModeloActivo.objects.create(name=f'Modelo {name}', marca=self.marca, tipo_activo=tipo)
+        return tipo, modelo
+
+    def make_activo(self, tipo, modelo, **kwargs):
+        self._serial += 1
+        data = {
+            'tipo_activo': tipo, 'proveedor': self.proveedor, 'marca': self.marca, 'modelo': modelo,
+            'region': self.region, 'finca': self.finca, 'departamento': self.departamento, 'area': self.area,
+            'serie': f'SER-{self._serial}', 'hostname': f'HOST-{self._serial}',
+            'fecha_registro': date.today(), 'fecha_fin_garantia': date.today() + timedelta(days=365),
+        }
+        data.update(kwargs)
+        return Activo.objects.create(**data)
+
+
+class DashboardSummaryTests(AssetsTestMixin, TestCase):
+
+    def _create_types_with_assets(self, count):
+        today = date.today()
+        start = TipoActivo.objects.count()
+        for i in range(start, start + count):
+            tipo, modelo = self.make_tipo(f'Tipo {i}')
+            self.make_activo(tipo, modelo, fecha_fin_garantia=today + timedelta(days=90))
+            self.make_activo(tipo, modelo, fecha_fin_garantia=today + timedelta(days=10))
+            self.make_activo(tipo, modelo, fecha_fin_garantia=today - timedelta(days=1))
+
+    def test_summary_counts_per_type(self):
+        self._create_types_with_assets(2)
+        tipo_sin_activos, _ = self.make_tipo('Sin activos')
+        tipo, modelo = TipoActivo.objects.get(name='Tipo 0'), ModeloActivo.objects.get(name='Modelo Tipo 0')
+        self.make_activo(tipo, modelo, estado='retirado')
+
+        response = self.client.get(reverse('dashboard_summary'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_assets'], 6)
+        self.assertEqual([row['tipo_activo'] for row in response.data['asset_types']], ['Tipo 0', 'Tipo 1'])
+        self.assertEqual(response.data['asset_types'][0], {
+            'tipo_activo': 'Tipo 0',
+            'total_equipment': 3,
+            'valid_warranty': 1,
+            'expiring_warranty': 1,
+            'no_warranty': 1,
+        })
+
+    def test_summary_query_count_is_constant(self):
+        self._create_types_with_assets(3)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('dashboard_summary'))
+
+        self._create_types_with_assets(20)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('dashboard_summary'))
+        self.assertEqual(len(response.data['asset_types']), 23)
+
+
+class DashboardDetailTests(AssetsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        today = date.today()
+        self.activos = [
+            self.make_activo(
+                self.tipo, self.modelo,
+                fecha_fin_garantia=today - timedelta(days=400) if i % 5 == 0 else today + timedelta(days=(i % 4) * 20 - 10)
+            )
+            for i in range(23)
+        ]
+
+    def _detail(self, **params):
+        return self.client.get(reverse('dashboard_detail_data'), params)
+
+    def test_rejects_orderings_without_index(self):
+        for ordering in ('marca__name', 'solicitante', 'fecha_registro', 'id; DROP TABLE'):
+            response = self._detail(category='total_assets', ordering=ordering)
+            self.assertEqual(response.status_code, 400, ordering)
+            self.assertIn('-hostname', response.data['allowed'])
+
+        response = self._detail(category='total_assets', ordering='-hostname', page_size=3)
+        self.assertEqual(response.status_code, 200)
+        expected = sorted(self.activos, key=lambda activo: activo.hostname, reverse=True)[:3]
+        self.assertEqual([row['id'] for row in response.data['assets']], [activo.pk for activo in expected])
+
+    def test_cursor_pages_cover_every_asset_in_order(self):
+        # Descendente, con los empates de fecha ordenados por id
+        expected = [
+            activo.pk for activo in sorted(
+                self.activos, key=lambda activo: (activo.fecha_fin_garantia, activo.pk), reverse=True
+            )
+        ]
+        seen, pages, cursor = [], [], None
+        while True:
+            params = {'category': 'total_assets', 'ordering': '-fecha_fin_garantia', 'page_size': 5}
+            if cursor:
+                params['cursor'] = cursor
+            pagination = self._detail(**params).data
+            pages.append(pagination)
+            seen += [row['id'] for row in pagination['assets']]
+            cursor = pagination['pagination']['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(pages), 5)
+
+        # previous_cursor vuelve a la página anterior
+        response = self._detail(
+            category='total_assets', ordering='-fecha_fin_garantia', page_size=5,
+            cursor=pages[2]['pagination']['previous_cursor']
+        )
+        self.assertEqual(response.data['assets'], pages[1]['assets'])
+
+        # ?page= lee la misma página y también devuelve cursores
+        response = self._detail(category='total_assets', ordering='-fecha_fin_garantia', page_size=5, page=2)
+        self.assertEqual(response.data['assets'], pages[1]['assets'])
+        self.assertIsNotNone(response.data['pagination']['previous_cursor'])
+
+        response = self._detail(category='total_assets', ordering='serie', cursor=pages[1]['pagination']['next_cursor'])
+        self.assertEqual(response.status_code, 404)
+
+    def test_categories_match_summary_without_counting(self):
+        summary = self.client.get(reverse('dashboard_summary')).data['asset_types'][0]
+
+        for category, total in (
+            ('total_assets', 23), (self.tipo.name, 23), ('valid_warranty', summary['valid_warranty']),
+            ('expiring_warranty', summary['expiring_warranty']), ('no_warranty', summary['no_warranty']),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                response = self._detail(category=category, page_size=50)
+            self.assertEqual(response.data['pagination']['total_count'], total, category)
+            self.assertEqual(len(response.data['assets']), total, category)
+            self.assertEqual(len(queries), 1, category)
+            self.assertNotIn('COUNT(', queries[0]['sql'].upper())
+
+    def test_cached_counts_follow_asset_changes(self):
+        self.assertEqual(self._detail(category='valid_warranty').data['pagination']['total_count'], 4)
+
+        activo = Activo.objects.get(pk=self.activos[3].pk)
+        activo.fecha_fin_garantia = date.today() - timedelta(days=1)
+        activo.save(update_fields=['fecha_fin_garantia'])
+        self.assertEqual(self._detail(category='valid_warranty').data['pagination']['total_count'], 3)
+
+        Activo.objects.filter(pk=self.activos[7].pk).update_with_counts(estado='retirado')
+        response = self.client.get(reverse('dashboard_summary'))
+        self.assertEqual(response.data['total_assets'], 22)
+        self.assertEqual(self._detail(category='valid_warranty').data['pagination']['total_count'], 2)
+
+    def test_type_without_active_assets_and_invalid_category(self):
+        tipo, _ = self.make_tipo('Impresora')
+        response = self._detail(category=tipo.name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['assets'], [])
+        self.assertEqual(response.data['pagination']['total_count'], 0)
+
+        self.assertEqual(self._detail(category='No existe').status_code, 400)
+
+
+class ActivoCountTests(AssetsTestMixin, TestCase):
+
+    def _counts(self):
+        return {
+            (row.estado, row.tipo_activo_id): row.total
+            for row in ActivoCount.objects.filter(total__gt=0)
+        }
+
+    def test_counts_follow_create_retire_and_delete(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        activo = self.make_activo(tipo, modelo)
+        self.make_activo(tipo, modelo)
+        self.assertEqual(self._counts(), {('activo', tipo.id): 2})
+
+        activo = Activo.objects.get(pk=activo.pk)
+        activo.estado = 'retirado'
+        activo.save()
+        self.assertEqual(self._counts(), {('activo', tipo.id): 1, ('retirado', tipo.id): 1})
+
+        activo.delete()
+        self.assertEqual(self._counts(), {('activo', tipo.id): 1})
+
+    def test_stale_instances_move_the_count_once(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        activo = self.make_activo(tipo, modelo)
+        # Dos peticiones leyeron el activo antes de que cualquiera lo retirara
+        first, second = Activo.objects.get(pk=activo.pk), Activo.objects.get(pk=activo.pk)
+        for stale in (first, second):
+            stale.estado = 'retirado'
+            stale.save()
+        self.assertEqual(self._counts(), {('retirado', tipo.id): 1})
+
+        first.delete()
+        self.assertEqual(self._counts(), {})
+
+    def test_rebuild_matches_incremental_counts(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        for _ in range(3):
+            self.make_activo(tipo, modelo)
+        Activo.objects.filter(serie='SER-1').update(estado='retirado')  # bypasses save()
+
+        ActivoCount.rebuild()
+
+        self.assertEqual(self._counts(), {('activo', tipo.id): 2, ('retirado', tipo.id): 1})
+
+    def test_dashboards_read_counts_in_constant_queries(self):
+        for i in range(12):
+            tipo, modelo = self.make_tipo(f'Tipo {i}')
+            self.make_activo(tipo, modelo)
+
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard_data'))
+        self.assertEqual(response.data['tipos_activo'][-1]['total'], 12)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard_models_data'))
+        names = [row['name'] for row in response.data['modelos_activo']]
+        self.assertEqual(len(names), 12)
+        self.assertEqual(names[-2:], ['Otros modelos', 'Total'])
+        self.assertEqual(response.data['modelos_activo'][-2]['total'], 2)
+        self.assertEqual(response.data['modelos_activo'][-1]['counts'], {'Costa Sur': 12})
+
+
+class MaintenanceOverviewTests(AssetsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        today = date.today()
+        tipo, modelo = self.make_tipo('Laptop')
+        self.make_activo(tipo, modelo, hostname='NUNCA')
+        self.make_activo(tipo, modelo, hostname='VENCIDO', ultimo_mantenimiento=today - timedelta(days=200),
+                         proximo_mantenimiento=today - timedelta(days=5))
+        self.make_activo(tipo, modelo, hostname='PROXIMO', ultimo_mantenimiento=today - timedelta(days=170),
+                         proximo_mantenimiento=today + timedelta(days=10))
+        self.make_activo(tipo, modelo, hostname='REALIZADO', ultimo_mantenimiento=today - timedelta(days=10),
+                         proximo_mantenimiento=today + timedelta(days=170))
+
+    def _get(self, **params):
+        response = self.client.get(reverse('maintenance_overview'), {'page_size': 50, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_default_order_by_status_priority(self):
+        data = self._get()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(
+            [(row['hostname'], row['status']) for row in data['results']],
+            [('NUNCA', 'nunca'), ('VENCIDO', 'vencidos'), ('PROXIMO', 'proximos'), ('REALIZADO', 'realizados')]
+        )
+
+    def test_status_filter_and_ordering_combine(self):
+        data = self._get(status=['vencidos', 'realizados'], ordering='-proximo_mantenimiento')
+        self.assertEqual([row['hostname'] for row in data['results']], ['REALIZADO', 'VENCIDO'])
+
+    def test_empty_dates_sort_last_ascending(self):
+        data = self._get(ordering='proximo_mantenimiento')
+        self.assertEqual([row['hostname'] for row in data['results']], ['VENCIDO', 'PROXIMO', 'REALIZADO', 'NUNCA'])
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(4):
+            self._get(page_size=2)
+
+
+class ActivoListQueryTests(AssetsTestMixin, TestCase):
+
+    def _create_assets(self, count):
+        tipo, modelo = self.make_tipo(f'Laptop {TipoActivo.objects.count()}')
+        content_type = ContentType.objects.get_for_model(Activo)
+        for _ in range(count):
+            activo = self.make_activo(tipo, modelo, tecnico_mantenimiento=self.user, assigned_to=self.user)
+            AuditLog.objects.create(user=self.user, activity_type='CREATE', description='Activo creado',
+                                    content_type=content_type, object_id=activo.id)
+            Maintenance.objects.create(activo=activo, maintenance_date=date.today(), technician=self.user,
+                                       findings='OK', attachments=[{'name': 'informe.pdf'}])
+
+    def test_list_query_budget_does_not_grow_with_page_size(self):
+        self._create_assets(3)
+        with self.assertNumQueries(2):  # count + page
+            response = self.client.get(reverse('activo-list'), {'page_size': 50})
+        self.assertEqual(response.data['count'], 3)
+
+        self._create_assets(20)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('activo-list'), {'page_size': 50})
+        self.assertEqual(response.data['count'], 23)
+
+        row = response.data['results'][0]
+        self.assertEqual(row['created_by_user'], 'admin')
+        self.assertEqual(row['ultimo_mantenimiento_adjuntos'], [{'name': 'informe.pdf'}])
+        self.assertEqual(row['tecnico_mantenimiento_name'], 'admin')
+
+    def test_available_assets_query_budget(self):
+        self._create_assets(10)
+        with self.assertNumQueries(2):  # count + page; the assigned ids are an inline subquery
+            response = self.client.get(reverse('assignment-available-assets'), {'page_size': 50})
+        self.assertEqual(response.data['count'], 10)
+
+
+class EffectiveSpecTests(AssetsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tipo, modelo = self.make_tipo('Laptop')
+        ModeloActivo.objects.filter(pk=modelo.pk).update(procesador='i5', ram=8, wifi=True)
+        modelo.refresh_from_db()
+        self.heredado = self.make_activo(tipo, modelo, hostname='HEREDADO')
+        self.propio = self.make_activo(tipo, modelo, hostname='PROPIO', procesador='i7', ram=32, wifi=False)
+
+    def test_list_exposes_effective_values(self):
+        response = self.client.get(reverse('activo-list'), {'ordering': 'ram_efectivo'})
+        rows = [(row['hostname'], row['procesador'], row['ram'], row['wifi']) for row in response.data['results']]
+        self.assertEqual(rows, [('HEREDADO', 'i5', 8, True), ('PROPIO', 'i7', 32, False)])
+
+    def test_filter_on_effective_values(self):
+        response = self.client.get(reverse('activo-list'), {'ram_min': 16})
+        self.assertEqual([row['hostname'] for row in response.data['results']], ['PROPIO'])
+        response = self.client.get(reverse('activo-list'), {'procesador': 'i5'})
+        self.assertEqual([row['hostname'] for row in response.data['results']], ['HEREDADO'])
+
+    def test_update_returns_values_of_new_modelo(self):
+        tipo = TipoActivo.objects.get(name='Laptop')
+        otro = ModeloActivo.objects.create(name='Workstation', marca=self.marca, tipo_activo=tipo, procesador='i9', ram=64)
+
+        response = self.client.patch(reverse('activo-detail', args=[self.heredado.pk]), {'modelo': otro.pk}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['procesador'], response.data['ram']), ('i9', 64))
+        response = self.client.get(reverse('activo-detail', args=[self.heredado.pk]))
+        self.assertEqual((response.data['procesador'], response.data['ram']), ('i9', 64))
+
+    def test_serializer_falls_back_without_annotations(self):
+        from .serializers import ActivoSerializer
+        data = ActivoSerializer(Activo.objects.get(pk=self.heredado.pk)).data
+        self.assertEqual((data['procesador'], data['ram'], data['wifi']), ('i5', 8, True))
+
+
+class AuditSnapshotTests(AssetsTestMixin, TestCase):
+
+    def test_snapshot_matches_model_to_dict_with_display_names(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        activo = self.make_activo(tipo, modelo, costo=Decimal('1500.50'), documentos_baja=['acta.pdf'])
+        activo = Activo.objects.get(pk=activo.pk)
+
+        expected = json.loads(json.dumps(model_to_dict(activo), cls=DjangoJSONEncoder))
+        expected.update({
+            'tipo_activo': 'Laptop', 'marca': 'Dell', 'modelo': str(modelo), 'proveedor': 'Proveedor SA',
+            'region': 'Costa Sur', 'finca': 'Finca Uno', 'departamento': 'IT', 'area': 'Soporte',
+        })
+        self.assertEqual(audit.snapshot(activo), expected)
+
+    def test_snapshot_resolves_catalog_names_without_queries(self):
+        # Catálogos confirmados: los que tienen cambios sin confirmar no se guardan en caché
+        with self.captureOnCommitCallbacks(execute=True):
+            tipo, modelo = self.make_tipo('Laptop')
+            first, second = self.make_activo(tipo, modelo), self.make_activo(tipo, modelo)
+        audit.snapshot(Activo.objects.get(pk=first.pk))  # carga los mapas de nombres
+
+        activo = Activo.objects.get(pk=second.pk)
+        with self.assertNumQueries(0):
+            data = audit.snapshot(activo)
+        self.assertEqual(data['region'], 'Costa Sur')
+
+        # Un catálogo renombrado se refleja en el siguiente snapshot
+        self.region.name = 'Occidente'
+        self.region.save()
+        self.assertEqual(audit.snapshot(activo)['region'], 'Occidente')
+
+
+class UpdateActivoMaintenanceCommandTests(AssetsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        tipo, modelo = self.make_tipo('Laptop')
+        self.activos = [self.make_activo(tipo, modelo) for _ in range(3)]
+        # bulk_create no pasa por Maintenance.save(), así que los activos quedan desactualizados
+        Maintenance.objects.bulk_create(
+            Maintenance(activo=activo, maintenance_date=date(2025, 1, i + 1), next_maintenance_date=date(2025, 7, i + 1),
+                        technician=self.user, findings=f'Hallazgo {i}')
+            for i, activo in enumerate(self.activos[:2])
+        )
+
+    def _run(self, *args):
+        out = io.StringIO()
+        call_command('update_activo_maintenance', *args, '--chunk-size', '1', stdout=out)
+        return out.getvalue()
+
+    def test_updates_assets_from_latest_maintenance(self):
+        output = self._run()
+        self.assertIn('Checked 2 Activo records, updated 2', output)
+        activo = Activo.objects.get(pk=self.activos[1].pk)
+        self.assertEqual(
+            (activo.ultimo_mantenimiento, activo.proximo_mantenimiento, activo.tecnico_mantenimiento, activo.ultimo_mantenimiento_hallazgos),
+            (date(2025, 1, 2), date(2025, 7, 2), self.user, 'Hallazgo 1')
+        )
+        self.assertIn('updated 0', self._run())
+
+    def test_dry_run_reports_diff_without_writing(self):
+        output = self._run('--dry-run')
+        self.assertIn('ultimo_mantenimiento: None -> 2025-01-01', output)
+        self.assertFalse(Activo.objects.filter(ultimo_mantenimiento__isnull=False).exists())
+
+    def test_since_limits_to_recent_maintenances(self):
+        Maintenance.objects.filter(activo=self.activos[0]).update(updated_at=timezone.now() - timedelta(days=10))
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+        self.assertIn('Checked 1 Activo records', self._run('--since', since))
+        self.assertIsNone(Activo.objects.get(pk=self.activos[0].pk).ultimo_mantenimiento)
+
+
+class UpdateActivoAssignmentsCommandTests(AssetsTestMixin, TestCase):
+
+    def test_reconciles_assigned_to_with_active_assignments(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        ana, ana_user = self.make_employee('E1', 'ana')
+        luis, luis_user = self.make_employee('E2', 'luis')
+        sin_cuenta, _ = self.make_employee('E3')
+
+        correcto = self.make_activo(tipo, modelo, assigned_to=ana_user)
+        incorrecto = self.make_activo(tipo, modelo, assigned_to=ana_user)
+        devuelto = self.make_activo(tipo, modelo, assigned_to=luis_user)
+        sin_usuario = self.make_activo(tipo, modelo)
+        Assignment.objects.bulk_create([
+            Assignment(activo=correcto, employee=ana, assigned_by=self.user),
+            Assignment(activo=incorrecto, employee=luis, assigned_by=self.user),
+            Assignment(activo=devuelto, employee=luis, assigned_by=self.user, returned_date=timezone.now()),
+            Assignment(activo=sin_usuario, employee=sin_cuenta, assigned_by=self.user),
+        ])
+
+        out = io.StringIO()
+        call_command('update_activo_assignments', '--dry-run', stdout=out)
+        self.assertIn('would correct 2', out.getvalue())
+        self.assertEqual(Activo.objects.get(pk=incorrecto.pk).assigned_to, ana_user)
+
+        with self.assertNumQueries(5):  # lectura + savepoint con un UPDATE por usuario destino
+            call_command('update_activo_assignments', stdout=io.StringIO())
+
+        assigned = dict(Activo.objects.values_list('pk', 'assigned_to'))
+        self.assertEqual(assigned, {
+            correcto.pk: ana_user.pk, incorrecto.pk: luis_user.pk, devuelto.pk: None, sin_usuario.pk: None,
+        })
+
+
+class ActiveAssignmentConstraintTests(AssetsTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.laptop, self.laptop_modelo = self.make_tipo('Laptop')
+        self.monitor, self.monitor_modelo = self.make_tipo('Monitor')
+        self.ana, _ = self.make_employee('E1')
+        self.luis, _ = self.make_employee('E2')
+
+    def test_database_allows_one_active_assignment_per_activo(self):
+        activo = self.make_activo(self.laptop, self.laptop_modelo)
+        first = Assignment.objects.create(activo=activo, employee=self.ana, assigned_by=self.user)
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            Assignment.objects.create(activo=activo, employee=self.luis, assigned_by=self.user)
+        self.assertTrue(Assignment.is_active_conflict(raised.exception))
+
+        first.return_assignment(self.user)
+        Assignment.objects.create(activo=activo, employee=self.luis, assigned_by=self.user)
+        self.assertEqual(Assignment.objects.filter(activo=activo).count(), 2)
+
+    def test_create_reports_conflict_with_the_usual_message(self):
+        activo = self.make_activo(self.laptop, self.laptop_modelo)
+        Assignment.objects.create(activo=activo, employee=self.ana, assigned_by=self.user)
+
+        response = self.client.post(
+            reverse('assignment-list'), {'activo': activo.pk, 'employee': self.luis.pk, 'assigned_by': self.user.pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['non_field_errors'], [f"El activo '{activo.hostname}' ya está asignado a otro empleado."]
+        )
+        self.assertEqual(Assignment.objects.filter(activo=activo).count(), 1)
+
+    def test_bulk_assign_is_all_or_nothing(self):
+        libre = self.make_activo(self.monitor, self.monitor_modelo)
+        ocupado = self.make_activo(self.laptop, self.laptop_modelo)
+        Assignment.objects.create(activo=ocupado, employee=self.ana, assigned_by=self.user)
+
+        response = self.client.post(reverse('assignment-bulk-assign'), {
+            'employee_id': self.luis.pk, 'activo_ids': [libre.pk, ocupado.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], f'Los siguientes activos ya están asignados: {ocupado.hostname}')
+        self.assertFalse(Assignment.objects.filter(employee=self.luis).exists())
+
+        response = self.client.post(reverse('assignment-bulk-assign'), {
+            'employee_id': self.luis.pk, 'activo_ids': [libre.pk],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+class BulkAssignTests(AssetsTestMixin, TestCase):
+    """bulk_assign resuelve todo el kit con un número fijo de consultas."""
+
+    def setUp(self):
+        super().setUp()
+        self.tipos = [self.make_tipo(f'Tipo {i}') for i in range(3)]
+        self.finanzas = Departamento.objects.create(name='Finanzas')
+
+    def make_kit(self, size):
+        return [self.make_activo(*self.tipos[i % len(self.tipos)]) for i in range(size)]
+
+    def bulk_assign(self, employee, kit, asset_updates=None):
+        response = self.client.post(reverse('assignment-bulk-assign'), {
+            'employee_id': employee.pk, 'activo_ids': [activo.pk for activo in kit], 'asset_updates': asset_updates or {},
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response
+
+    def test_query_count_does_not_depend_on_kit_size(self):
+        # Antes: 67 consultas para 3 activos y 517 para 30 (con actualización de cada activo)
+        ContentType.objects.get_for_models(Activo, Assignment)  # caché de ContentType ya cargada
+        counts = []
+        for number, size in (('E1', 3), ('E2', 30)):
+            employee, _ = self.make_employee(number, username=f'user{number}')
+            kit = self.make_kit(size)
+            updates = {str(activo.pk): {'ram': 16} for activo in kit}
+            # Como en una petición real: la transacción se confirma dentro de audit.buffered() (middleware)
+            with CaptureQueriesContext(connection) as queries, audit.buffered(), self.captureOnCommitCallbacks(execute=True):
+                self.bulk_assign(employee, kit, updates)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], 15)
+
+    def test_side_effects_match_single_assignments(self):
+        employee, account = self.make_employee('E1', username='empleado')
+        kit = self.make_kit(4)
+        moved = kit[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.bulk_assign(employee, kit, {
+                str(moved.pk): {'departamento_id': self.finanzas.pk, 'ram': ''},
+                str(kit[1].pk): {'hostname': kit[1].hostname},  # sin cambios
+            })
+
+        self.assertEqual(len(response.data['assignments']), 4)
+        self.assertEqual([item['id'] for item in response.data['updated_assets']], [moved.pk])
+        ids = [item['id'] for item in response.data['assignments']]
+        self.assertEqual(sorted(ids), sorted(Assignment.objects.filter(employee=employee).values_list('pk', flat=True)))
+        self.assertEqual(set(Activo.objects.filter(pk__in=[a.pk for a in kit]).values_list('assigned_to', flat=True)), {account.pk})
+        self.assertEqual(Activo.objects.get(pk=moved.pk).departamento, self.finanzas)
+
+        # Conteos pre-agregados iguales a un recálculo completo
+        def counts():
+            rows = ActivoCount.objects.filter(total__gt=0).values_list(*ActivoCount.KEY_FIELDS, 'total')
+            return {tuple(key): total for *key, total in rows}
+        before = counts()
+        ActivoCount.rebuild()
+        self.assertEqual(before, counts())
+
+        logs = AuditLog.objects.filter(user=self.user)
+        self.assertEqual(logs.filter(activity_type='CREATE', content_type=ContentType.objects.get_for_model(Assignment)).count(), 4)
+        update = logs.get(activity_type='UPDATE', object_id=moved.pk)
+        self.assertEqual(update.new_data['departamento'], 'Finanzas')
+
+
+class BulkRetireTests(AssetsTestMixin, TestCase):
+    """Retiro y reactivación en lote con documentos compartidos."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        self.activos = [self.make_activo(self.tipo, self.modelo) for _ in range(3)]
+        self.retirado = self.make_activo(self.tipo, self.modelo, estado='retirado')
+
+    def retire(self, ids, **data):
+        document = SimpleUploadedFile('acta.pdf', b'%PDF-1.4', content_type='application/pdf')
+        return self.client.post(reverse('activo-bulk-retire'), {
+            'activo_ids': ','.join(str(pk) for pk in ids), 'motivo_baja': 'Renovación', 'documentos_baja': document, **data
+        }, format='multipart')
+
+    def assertCountsMatchTable(self):
+        counts = set(ActivoCount.objects.filter(total__gt=0).values_list(*ActivoCount.KEY_FIELDS, 'total'))
+        ActivoCount.rebuild()
+        self.assertEqual(counts, set(ActivoCount.objects.values_list(*ActivoCount.KEY_FIELDS, 'total')))
+
+    def test_bulk_retire_shares_documents_and_reports_each_asset(self):
+        ids = [activo.pk for activo in self.activos] + [self.retirado.pk, 999999]
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as queries:
+            response = self.retire(ids)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['retired'], 3)
+        self.assertEqual(
+            [(result['id'], result['success']) for result in response.data['results']],
+            [(pk, pk in ids[:3]) for pk in ids]
+        )
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "assets_activo"')]
+        self.assertEqual(len(updates), 1)
+
+        documents = response.data['documentos_baja']
+        self.assertEqual(len(documents), 1)
+        self.assertTrue(default_storage.exists(documents[0]))
+        retired = Activo.objects.filter(pk__in=ids[:3])
+        self.assertEqual({(a.estado, a.motivo_baja, a.usuario_baja_id) for a in retired}, {('retirado', 'Renovación', self.user.pk)})
+        self.assertTrue(all(activo.documentos_baja == documents for activo in retired))
+        self.assertEqual(AuditLog.objects.filter(activity_type='RETIRE').count(), 3)
+        self.assertCountsMatchTable()
+
+    def test_documents_are_deleted_with_the_last_reactivated_asset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            document = self.retire([activo.pk for activo in self.activos]).data['documentos_baja'][0]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('activo-bulk-reactivate'), {
+                'activo_ids': [self.activos[0].pk, self.activos[1].pk, self.activos[0].pk]
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['reactivated'], 2)
+        self.assertTrue(default_storage.exists(document))
+        log = AuditLog.objects.filter(activity_type='REACTIVATE').first()
+        self.assertEqual((log.old_data['usuario_baja'], log.old_data['documentos_baja']), ('admin', [document]))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('activo-reactivate', args=[self.activos[2].pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(default_storage.exists(document))
+        self.assertEqual(Activo.objects.filter(estado='activo').count(), 3)
+        self.assertCountsMatchTable()
+
+    def test_bulk_retire_requires_ids_and_motivo(self):
+        self.assertEqual(self.retire([self.activos[0].pk], motivo_baja=' ').status_code, 400)
+        self.assertEqual(self.retire([]).status_code, 400)
+        self.assertEqual(self.retire(['uno']).status_code, 400)
+        self.assertFalse(Activo.objects.filter(pk=self.activos[0].pk, estado='retirado').exists())
+
+
+class BulkMaintenanceTests(AssetsTestMixin, TestCase):
+    """Registro de mantenimientos en lote (jornadas de campo de los técnicos)."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media = override_settings(MEDIA_ROOT=media_root.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+
+    def register(self, identifiers, **data):
+        attachment = SimpleUploadedFile('informe.pdf', b'%PDF-1.4', content_type='application/pdf')
+        return self.client.post(reverse('maintenance-bulk'), {
+            'asset_identifiers': '\n'.join(identifiers), 'maintenance_date': '2025-03-03',
+            'technician': self.user.pk, 'findings': 'Limpieza general', 'attachments': attachment, **data
+        }, format='multipart')
+
+    def test_registers_maintenance_for_every_asset(self):
+        activos = [self.make_activo(self.tipo, self.modelo) for _ in range(3)]
+        identifiers = [activos[0].hostname, activos[1].serie, activos[2].hostname, activos[0].serie]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.register(identifiers)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 3)
+
+        next_date = activos[0].calculate_next_maintenance_date(date(2025, 3, 3))
+        attachments = response.data['attachments']
+        self.assertEqual(len(attachments), 1)
+        self.assertTrue(default_storage.exists(attachments[0]))
+        maintenances = Maintenance.objects.filter(activo__in=activos)
+        self.assertEqual(
+            {(m.activo_id, m.next_maintenance_date, tuple(m.attachments)) for m in maintenances},
+            {(activo.pk, next_date, tuple(attachments)) for activo in activos}
+        )
+        self.assertEqual(
+            set(Activo.objects.values_list('ultimo_mantenimiento', 'proximo_mantenimiento', 'tecnico_mantenimiento', 'ultimo_mantenimiento_hallazgos')),
+            {(date(2025, 3, 3), next_date, self.user.pk, 'Limpieza general')}
+        )
+        self.assertEqual(
+            set(AuditLog.objects.filter(activity_type='CREATE', content_type=ContentType.objects.get_for_model(Maintenance)).values_list('object_id', flat=True)),
+            {m.pk for m in maintenances}
+        )
+
+    def test_queries_do_not_grow_with_assets(self):
+        few = [self.make_activo(self.tipo, self.modelo).hostname for _ in range(2)]
+        many = [self.make_activo(self.tipo, self.modelo).hostname for _ in range(20)]
+        ContentType.objects.get_for_models(Maintenance)
+        with CaptureQueriesContext(connection) as few_queries:
+            self.assertEqual(self.register(few).status_code, 201)
+        with CaptureQueriesContext(connection) as many_queries:
+            self.assertEqual(self.register(many).status_code, 201)
+        self.assertEqual(len(few_queries), len(many_queries))
+
+    def test_unknown_identifier_registers_nothing(self):
+        activo = self.make_activo(self.tipo, self.modelo)
+        response = self.register([activo.hostname, 'NO-EXISTE'])
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.data['not_found'], ['NO-EXISTE'])
+        self.assertFalse(Maintenance.objects.exists())
+        self.assertEqual(self.register([activo.hostname], technician=999999).status_code, 404)
+        self.assertEqual(self.register([activo.hostname], maintenance_date='03/03/2025').status_code, 400)
+
+
+def legacy_next_maintenance_date(from_date):
+    """Cálculo anterior (día por día, sin feriados) usado como referencia."""
+    current = from_date + timedelta(days=180)
+    added = 0
+    while added < 5:
+        current += timedelta(days=1)
+        if current.weekday() < 5:
+            added += 1
+    return current
+
+
+class MaintenanceSchedulingTests(AssetsTestMixin, TestCase):
+    """Fechas de mantenimiento con días hábiles y feriados por región (scheduling.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        self.otra_region = Region.objects.create(name='Occidente')
+
+    def test_matches_previous_calculation_without_holidays(self):
+        days = [date(2024, 1, 1) + timedelta(days=i) for i in range(800)]
+        self.assertEqual(scheduling.next_maintenance_dates(days), [legacy_next_maintenance_date(day) for day in days])
+        self.assertEqual(scheduling.next_maintenance_dates([None, days[0]])[0], None)
+
+    def test_national_and_regional_holidays(self):
+        # 2025-03-03 + 180 días = sábado 2025-08-30; el 5.º día hábil siguiente es el viernes 2025-09-05
+        day = date(2025, 3, 3)
+        self.assertEqual(scheduling.next_maintenance_date(day, self.region.pk), date(2025, 9, 5))
+
+        Feriado.objects.create(fecha=date(2025, 9, 3), nombre='Feriado regional', region=self.region)
+        self.assertEqual(
+            scheduling.next_maintenance_dates([day, day, day], [self.region.pk, self.otra_region.pk, None]),
+            [date(2025, 9, 8), date(2025, 9, 5), date(2025, 9, 5)]
+        )
+        Feriado.objects.create(fecha=date(2025, 9, 1), nombre='Feriado nacional')
+        self.assertEqual(
+            scheduling.next_maintenance_dates([day, day], [self.region.pk, self.otra_region.pk]),
+            [date(2025, 9, 9), date(2025, 9, 8)]
+        )
+
+    def test_maintenance_save_and_bulk_use_the_region_calendar(self):
+        Feriado.objects.create(fecha=date(2025, 9, 3), nombre='Feriado regional', region=self.region)
+        activo = self.make_activo(self.tipo, self.modelo)
+        maintenance = Maintenance.objects.create(
+            activo=activo, maintenance_date=date(2025, 3, 3), technician=self.user, findings='OK'
+        )
+        self.assertEqual(maintenance.next_maintenance_date, date(2025, 9, 8))
+
+        otra = self.make_activo(self.tipo, self.modelo, region=self.otra_region,
+                                finca=Finca.objects.create(name='Finca Dos', region=self.otra_region))
+        Maintenance.create_batch([activo, otra], date(2025, 3, 3), self.user, 'OK')
+        self.assertEqual(
+            dict(Activo.objects.values_list('pk', 'proximo_mantenimiento')),
+            {activo.pk: date(2025, 9, 8), otra.pk: date(2025, 9, 5)}
+        )
+
+    def test_reschedule_command(self):
+        activo = self.make_activo(self.tipo, self.modelo)
+        today = timezone.now().date()
+        maintenance = Maintenance.objects.create(activo=activo, maintenance_date=today, technician=self.user, findings='OK')
+        old_date = maintenance.next_maintenance_date
+        # Feriado nacional en el primer día hábil del conteo: la fecha se corre un día hábil
+        first_business_day = scheduling.BusinessCalendar().add_business_days([today + timedelta(days=180)], 1)[0]
+        response = self.client.post(reverse('feriado-list'), {'fecha': first_business_day, 'nombre': 'Nuevo feriado'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        response = self.client.post(reverse('feriado-list'), {'fecha': first_business_day, 'nombre': 'Repetido'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+        out = io.StringIO()
+        call_command('reschedule_maintenances', '--dry-run', stdout=out)
+        self.assertIn('would reschedule 1', out.getvalue())
+        maintenance.refresh_from_db()
+        self.assertEqual(maintenance.next_maintenance_date, old_date)
+
+        call_command('reschedule_maintenances', stdout=out)
+        maintenance.refresh_from_db()
+        activo.refresh_from_db()
+        self.assertGreater(maintenance.next_maintenance_date, old_date)
+        self.assertEqual(activo.proximo_mantenimiento, maintenance.next_maintenance_date)
+
+
+@unittest.skipUnless(os.environ.get('ITAM_BENCHMARK'), 'Benchmark: ejecutar con ITAM_BENCHMARK=1')
+class MaintenanceSchedulingBenchmark(TestCase):
+    """
+    Next maintenance dates for 100k dates (ITAM_BENCHMARK_DATES): one
+    next_maintenance_dates() call against the previous day-by-day loop.
+    """
+
+    def test_vectorized_is_faster(self):
+        size = int(os.environ.get('ITAM_BENCHMARK_DATES', '100000'))
+        days = [date(2015, 1, 1) + timedelta(days=i % 3650) for i in range(size)]
+
+        started = time.perf_counter()
+        expected = [legacy_next_maintenance_date(day) for day in days]
+        legacy = time.perf_counter() - started
+
+        started = time.perf_counter()
+        result = scheduling.next_maintenance_dates(days)
+        vectorized = time.perf_counter() - started
+
+        self.assertEqual(result, expected)
+        print(f'\n{size} fechas: día por día {legacy:.3f}s, en lote {vectorized:.3f}s')
+        self.assertLess(vectorized, legacy)
+
+
+class MaintenancePlannerTests(AssetsTestMixin, TestCase):
+    """Reparto de mantenimientos pendientes por técnico, día y finca (planning.py)."""
+
+    def setUp(self):
+        super().setUp()
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        self.finca_b = Finca.objects.create(name='Finca B', region=self.region)
+        self.occidente = Region.objects.create(name='Occidente')
+        self.finca_c = Finca.objects.create(name='Finca C', region=self.occidente)
+        self.monday = date(2025, 9, 1)
+
+    def pending(self, finca, count, due):
+        return [(finca.pk * 1000 + i, f'{finca.name}-{i}', due, finca.region_id, finca.pk) for i in range(count)]
+
+    def technician(self, pk, capacity=3, region_id=None):
+        return {'id': pk, 'name': f'Técnico {pk}', 'capacity': capacity, 'region_id': region_id}
+
+    def test_greedy_plan_by_finca(self):
+        pending = (self.pending(self.finca, 4, date(2025, 8, 1)) + self.pending(self.finca_b, 2, date(2025, 8, 20))
+                   + self.pending(self.finca_c, 2, date(2025, 8, 10)))
+        days = planning.planning_days(self.monday, 2)
+        plan = planning.plan_maintenances(pending, [self.technician(1), self.technician(2)], days)
+
+        first_day = plan['days'][0]['assignments']
+        # El primer técnico va a la finca más urgente; el segundo termina esa finca y sigue en la misma región
+        self.assertEqual([(v['finca'], len(v['activos'])) for v in first_day[0]['fincas']], [('Finca Uno', 3)])
+        self.assertEqual([(v['finca'], len(v['activos'])) for v in first_day[1]['fincas']], [('Finca Uno', 1), ('Finca B', 2)])
+        second_day = plan['days'][1]['assignments']
+        self.assertEqual([(v['finca'], len(v['activos'])) for v in second_day[0]['fincas']], [('Finca C', 2)])
+        self.assertEqual((plan['scheduled'], plan['unscheduled'], plan['backlog']), (8, 0, []))
+        self.assertEqual([day['date'] for day in plan['days']], ['2025-09-01', '2025-09-02'])
+
+    def test_technician_region_capacity_and_holidays(self):
+        Feriado.objects.create(fecha=self.monday, nombre='Feriado regional', region=self.occidente)
+        pending = self.pending(self.finca, 5, date(2025, 8, 1)) + self.pending(self.finca_c, 5, date(2025, 7, 1))
+        days = planning.planning_days(self.monday, 2)
+        plan = planning.plan_maintenances(pending, [self.technician(1, capacity=2, region_id=self.occidente.pk)], days)
+
+        self.assertEqual(plan['days'][0]['assignments'], [])  # feriado en su región
+        visits = plan['days'][1]['assignments'][0]['fincas']
+        self.assertEqual([(v['finca'], len(v['activos'])) for v in visits], [('Finca C', 2)])
+        self.assertEqual(plan['unscheduled'], 8)
+        self.assertEqual([(item['finca'], item['count']) for item in plan['backlog']], [('Finca C', 3), ('Finca Uno', 5)])
+
+    def test_endpoint(self):
+        tecnico = User.objects.create_user(username='tecnico', email='tecnico@itam.com', password='clave12345',
+                                           first_name='Ana', last_name='López')
+        for i in range(5):
+            self.make_activo(self.tipo, self.modelo, proximo_mantenimiento=self.monday - timedelta(days=i))
+        self.make_activo(self.tipo, self.modelo, proximo_mantenimiento=self.monday + timedelta(days=90))
+        self.make_activo(self.tipo, self.modelo, proximo_mantenimiento=self.monday, estado='retirado')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('maintenance_planner'), {
+                'technicians': [self.user.pk, {'id': tecnico.pk, 'capacity': 1}],
+                'capacity': 2, 'start': '2025-08-30', 'days': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['start'], response.data['end']), ('2025-09-01', '2025-09-01'))
+        self.assertEqual([a['total'] for a in response.data['days'][0]['assignments']], [2, 1])
+        self.assertEqual(response.data['days'][0]['assignments'][1]['technician_name'], 'Ana López')
+        self.assertEqual((response.data['scheduled'], response.data['unscheduled']), (3, 2))
+        self.assertLessEqual(len(queries), 8)
+
+        bad = self.client.post(reverse('maintenance_planner'), {'technicians': [999999]}, format='json')
+        self.assertEqual(bad.status_code, 400)
+
+        # La región del técnico llega como texto desde formularios
+        response = self.client.post(reverse('maintenance_planner'), {
+            'technicians': [{'id': tecnico.pk, 'region': str(self.region.pk)}], 'start': '2025-09-01', 'days': 1,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['technicians'][0]['region_id'], self.region.pk)
+        self.assertEqual(response.data['scheduled'], 5)
+        for technicians in (str(tecnico.pk), [{'id': tecnico.pk, 'region': 'norte'}], [{'id': tecnico.pk, 'region': 999999}]):
+            bad = self.client.post(reverse('maintenance_planner'), {'technicians': technicians}, format='json')
+            self.assertEqual(bad.status_code, 400, technicians)
+        self.assertEqual(self.client.post(reverse('maintenance_planner'), {}, format='json').status_code, 400)
+
+
+@unittest.skipUnless(os.environ.get('ITAM_BENCHMARK'), 'Benchmark: ejecutar con ITAM_BENCHMARK=1')
+class MaintenancePlannerBenchmark(TestCase):
+    """Plan for 50k pending assets (ITAM_BENCHMARK_ASSETS) over 200 fincas and 20 technicians."""
+
+    def test_plan_is_fast(self):
+        size = int(os.environ.get('ITAM_BENCHMARK_ASSETS', '50000'))
+        regions = [Region.objects.create(name=f'Región {i}') for i in range(5)]
+        fincas = [Finca.objects.create(name=f'Finca {i}', region=regions[i % 5]) for i in range(200)]
+        start = date(2025, 9, 1)
+        pending = [
+            (i, f'HOST-{i}', start - timedelta(days=i % 400), fincas[i % 200].region_id, fincas[i % 200].pk)
+            for i in range(size)
+        ]
+        technicians = [{'id': i, 'name': f'Técnico {i}', 'capacity': 40, 'region_id': None} for i in range(20)]
+        days = planning.planning_days(start, planning.MAX_PLANNING_DAYS)
+
+        started = time.perf_counter()
+        plan = planning.plan_maintenances(pending, technicians, days)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(plan['scheduled'] + plan['unscheduled'], size)
+        print(f'\n{size} activos: plan en {elapsed:.3f}s')
+        self.assertLess(elapsed, 1.0)
+
+
+class AssignmentsReportTests(AssetsTestMixin, TestCase):
+
+    def _export(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('assignments_report_csv'))
+            content = b''.join(response.streaming_content).decode('utf-8')
+        return content, len(queries)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        tipo, modelo = self.make_tipo('Laptop')
+        employee, _ = self.make_employee('E1')
+        counts = []
+        for size in (2, 12):
+            Assignment.objects.bulk_create(
+                Assignment(activo=self.make_activo(tipo, modelo), employee=employee, assigned_by=self.user)
+                for _ in range(size)
+            )
+            content, count = self._export()
+            counts.append(count)
+        self.assertEqual(counts[0], counts[1])
+        self.assertIn('Laptop', content)
+        self.assertEqual(content.count('Modelo Laptop'), 14)
+
+
+class BulkImportTests(AssetsTestMixin, TestCase):
+    """Importación de activos en lote (importer.py, acción bulk-import y comando import_activos)."""
+
+    def setUp(self):
+        super().setUp()
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        # Mismo nombre de área en otro departamento: el nombre se resuelve dentro del departamento de la fila
+        Area.objects.create(name='Soporte', departamento=Departamento.objects.create(name='Finanzas'))
+
+    def csv_file(self, rows, name='activos.csv'):
+        lines = ['Serie;Hostname;Tipo Activo;Marca;Modelo;Proveedor;Región;Finca;Departamento;Área;'
+                 'Fecha Registro;Fecha Fin Garantía;RAM;WIFI']
+        lines += [';'.join(row) for row in rows]
+        return SimpleUploadedFile(name, '\n'.join(lines).encode('utf-8'), content_type='text/csv')
+
+    def row(self, number, **overrides):
+        values = {
+            'serie': f'IMP-{number}', 'hostname': f'IMPHOST-{number}', 'tipo': 'laptop', 'marca': str(self.marca.pk),
+            'modelo': 'Modelo Laptop', 'proveedor': 'PROVEEDOR SA', 'region': 'Costa Sur', 'finca': 'Finca Uno',
+            'departamento': 'IT', 'area': 'Soporte', 'registro': '2025-01-15', 'garantia': '2028-01-15',
+            'ram': '16', 'wifi': 'Sí',
+        }
+        values.update(overrides)
+        return list(values.values())
+
+    def post(self, upload, **params):
+        url = reverse('activo-bulk-import')
+        if params:
+            url += '?' + '&'.join(f'{key}={value}' for key, value in params.items())
+        return self.client.post(url, {'file': upload}, format='multipart')
+
+    def test_dry_run_validates_without_writing(self):
+        response = self.post(self.csv_file([self.row(1), self.row(2)]), dry_run='true')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['rows'], response.data['created']), (2, 0))
+        self.assertFalse(Activo.objects.exists())
+
+    def test_import_creates_assets_counts_and_audit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post(self.csv_file([self.row(i) for i in range(3)]))
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 3)
+
+        activo = Activo.objects.get(serie='IMP-0')
+        self.assertEqual((activo.tipo_activo, activo.proveedor, activo.area), (self.tipo, self.proveedor, self.area))
+        self.assertEqual((activo.ram, activo.wifi, activo.fecha_fin_garantia), (16, True, date(2028, 1, 15)))
+        self.assertEqual(ActivoCount.objects.get(tipo_activo=self.tipo).total, 3)
+        log = AuditLog.objects.get(activity_type='CREATE', object_id=activo.pk)
+        self.assertEqual((log.user, log.new_data['proveedor']), (self.user, 'Proveedor SA'))
+
+    def test_errors_are_reported_per_row_and_nothing_is_imported(self):
+        existing = self.make_activo(self.tipo, self.modelo)
+        response = self.post(self.csv_file([
+            self.row(1),
+            self.row(2, marca='Lenovo', ram='mucha'),
+            self.row(3, serie='imp-1'),
+            self.row(4, hostname=existing.hostname, registro=''),
+        ]))
+        self.assertEqual(response.status_code, 400)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(set(errors), {2, 3, 4})
+        self.assertEqual(set(errors[2]), {'marca', 'ram'})
+        self.assertEqual(errors[3]['serie'], ['Valor repetido en la fila 1.'])
+        self.assertEqual(set(errors[4]), {'hostname', 'fecha_registro'})
+        self.assertEqual(Activo.objects.count(), 1)
+
+    def test_database_matches_beyond_casefold_are_reported(self):
+        # Una intercalación *_ai_ci de MySQL también ignora acentos: 'nandu-1' encuentra 'ÑANDU-1'
+        found = {'serie': ['ÑANDU-1', 'SIN-FILA'], 'hostname': []}
+
+        def filter_existing(**lookup):
+            return mock.Mock(values_list=mock.Mock(return_value=found[next(iter(lookup)).split('__')[0]]))
+
+        rows = importer.normalize_rows([{
+            'serie': 'nandu-1', 'hostname': 'H-1', 'tipo_activo': self.tipo.pk, 'marca': 'Dell', 'modelo': self.modelo.pk,
+            'proveedor': self.proveedor.pk, 'region': self.region.pk, 'finca': self.finca.pk,
+            'departamento': self.departamento.pk, 'area': self.area.pk,
+            'fecha_registro': '2025-01-15', 'fecha_fin_garantia': '2028-01-15',
+        }])
+        with mock.patch.object(Activo.objects, 'filter', side_effect=filter_existing):
+            result = importer.import_activos(rows, dry_run=True)
+
+        errors = {error['row']: error['errors'] for error in result['errors']}
+        self.assertEqual(errors[1], {'serie': ['Ya existe un activo con serie ÑANDU-1.']})
+        self.assertEqual(errors[None], {'serie': ['Ya existe un activo con serie SIN-FILA.']})
+
+    def test_validation_queries_do_not_grow_with_rows(self):
+        rows = [{'serie': f'S-{i}', 'hostname': f'H-{i}', 'tipo_activo': self.tipo.pk, 'marca': 'Dell',
+                 'modelo': self.modelo.pk, 'proveedor': self.proveedor.pk, 'region': self.region.pk, 'finca': self.finca.pk,
+                 'departamento': self.departamento.pk, 'area': self.area.pk,
+                 'fecha_registro': '2025-01-15', 'fecha_fin_garantia': '2028-01-15'} for i in range(60)]
+        importer.import_activos(importer.normalize_rows(rows[:1]), dry_run=True)  # caché de catálogos cargada
+        with CaptureQueriesContext(connection) as few:
+            importer.import_activos(importer.normalize_rows(rows[:5]), dry_run=True)
+        with CaptureQueriesContext(connection) as many:
+            result = importer.import_activos(importer.normalize_rows(rows), dry_run=True)
+        self.assertEqual(result['errors'], [])
+        self.assertEqual(len(few), len(many))
+
+    def test_command(self):
+        upload = self.csv_file([self.row(1)])
+        path = f'{self._testMethodName}.csv'
+        with open(path, 'wb') as file:
+            file.write(upload.read())
+        self.addCleanup(os.remove, path)
+
+        out = io.StringIO()
+        call_command('import_activos', path, '--dry-run', stdout=out)
+        self.assertIn('1 rows are valid', out.getvalue())
+        self.assertFalse(Activo.objects.exists())
+        call_command('import_activos', path, '--user', 'admin', stdout=out)
+        self.assertTrue(Activo.objects.filter(serie='IMP-1').exists())
+
+
+class QueryPlanTests(AssetsTestMixin, TestCase):
+    """Los filtros más usados deben resolverse con sus índices compuestos."""
+
+    def setUp(self):
+        super().setUp()
+        self.tipo, self.modelo = self.make_tipo('Laptop')
+        self.activo = self.make_activo(self.tipo, self.modelo)
+        self.employee, _ = self.make_employee('E-1')
+
+    def hot_queries(self):
+        """(nombre, queryset, índice esperado) de los accesos de los endpoints más usados."""
+        today = date.today()
+        content_type = ContentType.objects.get_for_model(Activo)
+        return [
+            ('activos por tipo', Activo.objects.filter(estado='activo', tipo_activo=self.tipo), 'activo_estado_tipo_idx'),
+            ('activos por región', Activo.objects.filter(estado='activo', region=self.region), 'activo_estado_region_idx'),
+            ('garantías por vencer',
+             Activo.objects.filter(estado='activo', fecha_fin_garantia__gt=today, fecha_fin_garantia__lte=today + timedelta(days=30)),
+             'activo_estado_garantia_idx'),
+            ('mantenimientos vencidos',
+             Activo.objects.filter(estado='activo', proximo_mantenimiento__lt=today), 'activo_estado_prox_mant_idx'),
+            ('último mantenimiento',
+             Maintenance.objects.filter(activo=self.activo).order_by('-created_at')[:1], 'maint_activo_created_idx'),
+            ('asignación activa del activo',
+             Assignment.objects.filter(activo=self.activo, returned_date__isnull=True), 'assign_activo_returned_idx'),
+            ('asignaciones activas del empleado',
+             Assignment.objects.filter(employee=self.employee, returned_date__isnull=True), 'assign_employee_returned_idx'),
+            ('creación del activo',
+             AuditLog.objects.filter(content_type=content_type, object_id=self.activo.pk, activity_type='CREATE'),
+             'auditlog_object_idx'),
+            ('auditoría reciente', AuditLog.objects.filter(timestamp__gte=timezone.now() - timedelta(days=1)),
+             'auditlog_timestamp_idx'),
+        ]
+
+    def test_hot_queries_use_their_indexes(self):
+        if connection.vendor not in ('sqlite', 'mysql'):
+            self.skipTest('Los planes solo se comparan en SQLite y MySQL')
+        for name, queryset, index in self.hot_queries():
+            with self.subTest(name):
+                plan = queryset.explain()
+                self.assertIn(index, plan, f'{name}: el plan no usa {index}\n{plan}')
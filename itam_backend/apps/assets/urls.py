@@ -9,7 +9,7 @@ Define todas las rutas API para:
 
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import ActivoViewSet, MaintenanceViewSet, AssignmentViewSet, dashboard_data, dashboard_models_data, dashboard_warranty_data, dashboard_summary, dashboard_detail_data, maintenance_overview, assets_report_csv, maintenance_report_csv, assignments_report_csv
+from .views import ActivoViewSet, MaintenanceViewSet, AssignmentViewSet, dashboard_data, dashboard_models_data, dashboard_warranty_data, dashboard_summary, dashboard_detail_data, maintenance_overview, maintenance_planner, assets_report_csv, maintenance_report_csv, assignments_report_csv
 
 # Router que registra automáticamente las URLs CRUD para los ViewSets
 router = DefaultRouter()
@@ -26,6 +26,7 @@ urlpatterns = router.urls + [
     path('dashboard-summary/', dashboard_summary, name='dashboard_summary'),      # Resumen de activos
     path('dashboard-detail/', dashboard_detail_data, name='dashboard_detail_data'), # Detalles por categoría
     path('maintenance-overview/', maintenance_overview, name='maintenance_overview'), # Vista general de mantenimientos
+    path('maintenance-planner/', maintenance_planner, name='maintenance_planner'), # Plan de mantenimientos por técnico
 
     # Reportes CSV descargables
     path('reports/assets/csv/', assets_report_csv, name='assets_report_csv'),        # Reporte de activos
@@ -4,6 +4,7 @@ Vistas API para la gestión de activos tecnológicos en el sistema ITAM.
 Este archivo contiene:
 - ViewSets para CRUD de activos, mantenimientos y asignaciones
 - Funciones de dashboard con estadísticas en tiempo real
+- Planificación de mantenimientos por técnico y día
 - Endpoints para reportes CSV
 - Lógica de negocio para retiro, reactivación y asignación de activos
 - Auditoría automática de todas las operaciones
@@ -14,28 +15,30 @@ from rest_framework import filters as drf_filters
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, permission_classes, action
-from django.db import models
-from django.db.models import ProtectedError, Count, Q
+from django.db import models, transaction, IntegrityError
+from django.db.models import ProtectedError, Count, Q, Sum, F, Case, When, Value, Subquery, OuterRef
+from django.db.models.functions import Coalesce
 from datetime import date, timedelta
-from django.contrib.contenttypes.models import ContentType
-from django.forms.models import model_to_dict
-from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from django_filters import rest_framework as filters
+from django.core.cache import cache
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from django.conf import settings
 from datetime import datetime, time
-from django.http import HttpResponse
-import json
 import os
+import re
 import uuid
-import csv
 
-from .models import Activo, Maintenance, Assignment
+from .models import Activo, ActivoCount, Maintenance, Assignment, SPEC_FIELDS
 from .serializers import ActivoSerializer, MaintenanceSerializer, AssignmentSerializer
+from . import importer, planning
 from django.contrib.auth import get_user_model
 from apps.users.permissions import CanViewReports
+from apps.masterdata.reports import iterate_in_chunks, streaming_csv_response
+from apps.masterdata.pagination import KeysetPagination, StandardKeysetPagination
+from apps.masterdata import audit
+from apps.masterdata import cache as catalog_cache
 
 User = get_user_model()
 from apps.masterdata.models import TipoActivo, Region
@@ -45,70 +48,40 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 200
 
+class DashboardDetailPagination(KeysetPagination):
+    """Cursores del detalle de las tarjetas del dashboard (mismo formato que ?cursor= en los listados)."""
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
 class ActivoFilter(filters.FilterSet):
     fecha_garantia_desde = filters.DateFilter(field_name='fecha_fin_garantia', lookup_expr='gte')
     fecha_garantia_hasta = filters.DateFilter(field_name='fecha_fin_garantia', lookup_expr='lte')
     region_name = filters.CharFilter(field_name='region__name', lookup_expr='icontains')
     assigned_to = filters.NumberFilter(field_name='assigned_to', lookup_expr='exact')
 
+    # Especificaciones efectivas (valor del activo o, si no tiene, el del modelo)
+    procesador = filters.CharFilter(field_name='procesador_efectivo', lookup_expr='icontains')
+    ram = filters.NumberFilter(field_name='ram_efectivo')
+    ram_min = filters.NumberFilter(field_name='ram_efectivo', lookup_expr='gte')
+    ram_max = filters.NumberFilter(field_name='ram_efectivo', lookup_expr='lte')
+    almacenamiento = filters.CharFilter(field_name='almacenamiento_efectivo', lookup_expr='icontains')
+    tarjeta_grafica = filters.CharFilter(field_name='tarjeta_grafica_efectivo', lookup_expr='icontains')
+    wifi = filters.BooleanFilter(field_name='wifi_efectivo')
+    ethernet = filters.BooleanFilter(field_name='ethernet_efectivo')
+    puertos_ethernet = filters.CharFilter(field_name='puertos_ethernet_efectivo', lookup_expr='icontains')
+    puertos_sfp = filters.CharFilter(field_name='puertos_sfp_efectivo', lookup_expr='icontains')
+    puerto_consola = filters.BooleanFilter(field_name='puerto_consola_efectivo')
+    puertos_poe = filters.CharFilter(field_name='puertos_poe_efectivo', lookup_expr='icontains')
+    alimentacion = filters.CharFilter(field_name='alimentacion_efectivo', lookup_expr='icontains')
+    administrable = filters.BooleanFilter(field_name='administrable_efectivo')
+    tamano = filters.CharFilter(field_name='tamano_efectivo', lookup_expr='icontains')
+    color = filters.CharFilter(field_name='color_efectivo', lookup_expr='icontains')
+
     class Meta:
         model = Activo
         fields = ['id', 'estado', 'tipo_activo', 'proveedor', 'marca', 'modelo', 'region', 'finca', 'departamento', 'area', 'assigned_to']
 
-def serialize_model_data(instance):
-    """Serialize model instance data to JSON-compatible format."""
-    # Exclude fields that contain model instances (ManyToMany, ForeignKey objects)
-    exclude_fields = []
-    if hasattr(instance, 'groups'):
-        exclude_fields.append('groups')
-    if hasattr(instance, 'user_permissions'):
-        exclude_fields.append('user_permissions')
-    if hasattr(instance, 'permissions'):
-        exclude_fields.append('permissions')  # Exclude permissions from Group model
-    if hasattr(instance, 'password'):
-        exclude_fields.append('password')  # Don't log passwords
-
-    data = model_to_dict(instance, exclude=exclude_fields)
-
-    # Replace foreign key IDs with names for better readability in audit logs
-    if hasattr(instance, 'region') and instance.region:
-        data['region'] = instance.region.name
-    if hasattr(instance, 'departamento') and instance.departamento:
-        data['departamento'] = instance.departamento.name
-    if hasattr(instance, 'marca') and instance.marca:
-        data['marca'] = instance.marca.name
-    if hasattr(instance, 'tipo_activo') and instance.tipo_activo:
-        data['tipo_activo'] = instance.tipo_activo.name
-    if hasattr(instance, 'area') and instance.area:
-        data['area'] = instance.area.name
-    if hasattr(instance, 'finca') and instance.finca:
-        data['finca'] = instance.finca.name
-    if hasattr(instance, 'modelo') and instance.modelo:
-        data['modelo'] = str(instance.modelo)
-    if hasattr(instance, 'proveedor') and instance.proveedor:
-        data['proveedor'] = instance.proveedor.nombre_empresa
-
-    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
-
-def get_changed_fields(old_data, new_data):
-    """Return only the fields that changed between old_data and new_data."""
-    if not old_data or not new_data:
-        return old_data or new_data or {}
-
-    changed = {}
-    all_keys = set(old_data.keys()) | set(new_data.keys())
-
-    for key in all_keys:
-        old_value = old_data.get(key)
-        new_value = new_data.get(key)
-        if old_value != new_value:
-            changed[key] = {
-                'old': old_value,
-                'new': new_value
-            }
-
-    return changed
-
 def save_uploaded_documents(files, subfolder='documents'):
     """Save uploaded files and return list of relative paths."""
     allowed_extensions = ['jpg', 'jpeg', 'png', 'gif', 'pdf', 'doc', 'docx']
@@ -130,6 +103,96 @@ def save_uploaded_documents(files, subfolder='documents'):
 
     return saved_paths
 
+def delete_unreferenced_documents(paths):
+    """Delete stored retirement documents that no asset references anymore (a bulk retirement shares them)."""
+    paths = set(paths or [])
+    if not paths:
+        return
+    referenced = Q()
+    for path in paths:
+        referenced |= Q(documentos_baja__icontains=path)
+    for documentos in Activo.objects.filter(referenced).values_list('documentos_baja', flat=True):
+        paths.difference_update(documentos or [])
+
+    for doc_path in paths:
+        try:
+            if default_storage.exists(doc_path):
+                default_storage.delete(doc_path)
+        except Exception as e:
+            # Log the error but don't fail the reactivation
+            print(f"Error deleting file {doc_path}: {e}")
+
+def request_list(request, name):
+    """Values sent as a JSON list or as repeated / comma- or line-separated form values, without duplicates."""
+    data = request.data
+    values = data.getlist(name) if hasattr(data, 'getlist') else data.get(name) or []
+    if not isinstance(values, list):
+        values = [values]
+    items = [part.strip() for value in values for part in re.split(r'[,\n]', str(value)) if part.strip()]
+    return list(dict.fromkeys(items))
+
+def request_id_list(request, name):
+    """IDs sent as in request_list(); raises ValueError for a non-numeric value."""
+    return list(dict.fromkeys(int(value) for value in request_list(request, name)))
+
+# Ordenamientos del detalle del dashboard: solo columnas con índice (serie y hostname
+# son únicos; fecha_fin_garantia usa activo_estado_garantia_idx junto con estado)
+DASHBOARD_DETAIL_ORDERINGS = ('serie', 'hostname', 'fecha_fin_garantia')
+DASHBOARD_SUMMARY_TIMEOUT = 60 * 60 * 24
+
+def warranty_category_filters(today=None):
+    """Return the Q filter for each warranty category shown on the dashboard cards."""
+    today = today or date.today()
+    thirty_days_from_now = today + timedelta(days=30)
+    return {
+        # Assets with valid warranty (>30 days)
+        'valid_warranty': Q(fecha_fin_garantia__gt=thirty_days_from_now),
+        # Assets with warranty expiring within 30 days (but not today)
+        'expiring_warranty': Q(fecha_fin_garantia__gt=today, fecha_fin_garantia__lte=thirty_days_from_now),
+        # Assets without warranty or expired warranty
+        'no_warranty': Q(fecha_fin_garantia__isnull=True) | Q(fecha_fin_garantia__lte=today),
+    }
+
+def dashboard_summary_counts(today=None):
+    """
+    Active asset counts per type and warranty category, ordered by type id:
+    [{'tipo_activo_id', 'tipo_activo', 'total_equipment', 'valid_warranty',
+    'expiring_warranty', 'no_warranty'}]. Only types with active assets appear.
+
+    Kept in the shared cache until an asset write changes them (ActivoCount.version),
+    an asset type is renamed or the day changes (the categories depend on today).
+    """
+    today = today or date.today()
+    key = 'assets:dashboard_summary:{}:{}:{}'.format(
+        ActivoCount.version(), catalog_cache.versions([TipoActivo])[TipoActivo], today.isoformat()
+    )
+    rows = cache.get(key)
+    if rows is not None:
+        return rows
+
+    # Una sola consulta agrupada por tipo de activo con conteos condicionales
+    warranty_filters = warranty_category_filters(today)
+    rows = [
+        {
+            'tipo_activo_id': row['tipo_activo_id'],
+            'tipo_activo': row['tipo_activo__name'],
+            'total_equipment': row['total_equipment'],
+            'valid_warranty': row['valid_warranty'],
+            'expiring_warranty': row['expiring_warranty'],
+            'no_warranty': row['no_warranty'],
+        }
+        for row in Activo.objects.filter(estado='activo').values(
+            'tipo_activo_id', 'tipo_activo__name'
+        ).annotate(
+            total_equipment=Count('id'),
+            valid_warranty=Count('id', filter=warranty_filters['valid_warranty']),
+            expiring_warranty=Count('id', filter=warranty_filters['expiring_warranty']),
+            no_warranty=Count('id', filter=warranty_filters['no_warranty']),
+        ).order_by('tipo_activo_id')
+    ]
+    cache.set(key, rows, DASHBOARD_SUMMARY_TIMEOUT)
+    return rows
+
 # ----------------------------------------------------
 # APLICACIÓN DE PERMISOS: Usar permisos específicos del modelo para mayor seguridad.
 # ----------------------------------------------------
@@ -137,33 +200,23 @@ def save_uploaded_documents(files, subfolder='documents'):
 class AuditLogMixin:
     def perform_create(self, serializer):
         instance = serializer.save()
-        self._log_activity('CREATE', instance, old_data=None, new_data=serialize_model_data(instance))
+        self._log_activity('CREATE', instance, old_data=None, new_data=audit.snapshot(instance))
 
     def perform_update(self, serializer):
-        old_instance = self.get_object()
-        old_data = serialize_model_data(old_instance)
+        # Estado previo tomado de la instancia que el serializador va a modificar (sin volver a consultarla)
+        old_data = audit.snapshot(serializer.instance)
         instance = serializer.save()
-        new_data = serialize_model_data(instance)
-        changed_fields = get_changed_fields(old_data, new_data)
+        new_data = audit.snapshot(instance)
+        changed_fields = audit.changed_fields(old_data, new_data)
         self._log_activity('UPDATE', instance, old_data=old_data, new_data=changed_fields)
 
     def perform_destroy(self, instance):
-        old_data = serialize_model_data(instance)
+        old_data = audit.snapshot(instance)
         self._log_activity('DELETE', instance, old_data=old_data, new_data=None)
         super().perform_destroy(instance)
 
     def _log_activity(self, activity_type, instance, old_data=None, new_data=None):
-        from apps.masterdata.models import AuditLog, ContentType
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type=activity_type,
-            description=f"{activity_type} {instance.__class__.__name__}: {instance}",
-            user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
-            old_data=old_data,
-            new_data=new_data
-        )
+        audit.record(activity_type, user=self.request.user, instance=instance, old_data=old_data, new_data=new_data)
 
 class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
     """
@@ -173,7 +226,8 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
     - Listar activos con filtros y búsqueda
     - Crear nuevos activos
     - Ver, actualizar y eliminar activos existentes
-    - Retirar y reactivar activos
+    - Retirar y reactivar activos, uno a uno o en lote (bulk-retire, bulk-reactivate)
+    - Importar activos en lote desde CSV o JSON (bulk-import)
     - Auditoría automática de todas las operaciones
     """
 
@@ -182,14 +236,16 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
         'tipo_activo', 'proveedor', 'marca', 'modelo', 'region', 'finca', 'departamento', 'area'
     ).all()
     serializer_class = ActivoSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = StandardKeysetPagination
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
 
     # Configuración de filtros y búsqueda
     filter_backends = [drf_filters.SearchFilter, drf_filters.OrderingFilter, filters.DjangoFilterBackend]
     filterset_class = ActivoFilter
     search_fields = ['serie', 'hostname', 'solicitante', 'correo_electronico', 'orden_compra', 'region__name', 'cuenta_contable', 'departamento__name', 'area__name']
-    ordering_fields = ['hostname', 'serie', 'tipo_activo__name', 'marca__name', 'modelo__name', 'fecha_fin_garantia', 'region__name', 'finca__name', 'estado']
+    ordering_fields = [
+        'hostname', 'serie', 'tipo_activo__name', 'marca__name', 'modelo__name', 'fecha_fin_garantia', 'region__name', 'finca__name', 'estado',
+    ] + [f'{field}_efectivo' for field in SPEC_FIELDS]
     ordering = ['hostname']  # Ordenamiento por defecto
 
     def get_queryset(self):
@@ -197,6 +253,14 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
             'tipo_activo', 'proveedor', 'marca', 'modelo', 'region', 'finca', 'departamento', 'area'
         )
 
+        # Listado y detalle: resolver en la misma consulta los datos que pide el serializador
+        if self.action in ['list', 'retrieve']:
+            queryset = Activo.objects.with_list_data()
+
+            # Especificaciones efectivas calculadas en SQL (filtrables y ordenables). Solo en
+            # lectura: tras guardar, la anotación seguiría con los valores del modelo anterior
+            queryset = queryset.with_effective_specs()
+
         # For detail actions, don't filter by estado to allow operations on retired assets
         if self.action in ['retrieve', 'update', 'partial_update', 'destroy', 'retire', 'reactivate']:
             return queryset
@@ -274,16 +338,6 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
             'documentos_baja': activo.documentos_baja
         }
 
-        # Delete associated files from filesystem
-        if activo.documentos_baja:
-            for doc_path in activo.documentos_baja:
-                try:
-                    if default_storage.exists(doc_path):
-                        default_storage.delete(doc_path)
-                except Exception as e:
-                    # Log the error but don't fail the reactivation
-                    print(f"Error deleting file {doc_path}: {e}")
-
         activo.estado = 'activo'
         activo.fecha_baja = None
         activo.motivo_baja = None
@@ -291,6 +345,9 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
         activo.documentos_baja = None  # Clear the documents field
         activo.save()
 
+        # Delete associated files from filesystem once no other retired asset shares them
+        transaction.on_commit(lambda: delete_unreferenced_documents(old_data['documentos_baja']))
+
         # Log the reactivation
         self._log_activity('REACTIVATE', activo,
                             old_data=old_data,
@@ -305,6 +362,157 @@ class ActivoViewSet(AuditLogMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(activo)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['post'], url_path='bulk-retire', permission_classes=[permissions.IsAuthenticated, permissions.DjangoModelPermissions])
+    def bulk_retire(self, request):
+        """
+        Retire several assets ('activo_ids') with one motivo_baja and one shared set of
+        documentos_baja. Returns the outcome per asset; assets already retired are skipped.
+        """
+        try:
+            activo_ids = request_id_list(request, 'activo_ids')
+        except ValueError:
+            return Response({'error': 'activo_ids debe ser una lista de IDs'}, status=status.HTTP_400_BAD_REQUEST)
+        if not activo_ids:
+            return Response({'error': 'activo_ids es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        motivo = request.data.get('motivo_baja', '').strip()
+        if not motivo:
+            return Response({'error': 'El motivo de baja es obligatorio'}, status=status.HTTP_400_BAD_REQUEST)
+
+        documentos_paths = []
+        with transaction.atomic():
+            activos, results = self._lock_for_state_change(activo_ids, 'activo', 'El activo ya está retirado')
+            if activos and 'documentos_baja' in request.FILES:
+                # Un solo juego de documentos para todo el lote
+                try:
+                    documentos_paths = save_uploaded_documents(request.FILES.getlist('documentos_baja'), 'retirement_documents')
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            if activos:
+                fecha_baja = timezone.now()
+                Activo.objects.filter(pk__in=[activo.pk for activo in activos]).update_with_counts(
+                    estado='retirado', fecha_baja=fecha_baja, motivo_baja=motivo, usuario_baja=request.user,
+                    documentos_baja=documentos_paths or None, updated_at=fecha_baja,
+                )
+
+                new_data = {
+                    'estado': 'retirado',
+                    'fecha_baja': fecha_baja.isoformat(),
+                    'motivo_baja': motivo,
+                    'usuario_baja': request.user.username
+                }
+                if documentos_paths:
+                    new_data['documentos_baja'] = documentos_paths
+                # Las entradas de auditoría se insertan juntas al confirmar (ver audit.record)
+                for activo in activos:
+                    self._log_activity('RETIRE', activo, old_data={'estado': 'activo'}, new_data=new_data)
+
+        return Response({
+            'retired': len(activos),
+            'documentos_baja': documentos_paths,
+            'results': [results[activo_id] for activo_id in activo_ids],
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk-reactivate', permission_classes=[permissions.IsAuthenticated, permissions.DjangoModelPermissions])
+    def bulk_reactivate(self, request):
+        """
+        Reactivate several retired assets ('activo_ids'), clearing their retirement fields.
+        Returns the outcome per asset; assets already active are skipped.
+        """
+        try:
+            activo_ids = request_id_list(request, 'activo_ids')
+        except ValueError:
+            return Response({'error': 'activo_ids debe ser una lista de IDs'}, status=status.HTTP_400_BAD_REQUEST)
+        if not activo_ids:
+            return Response({'error': 'activo_ids es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            activos, results = self._lock_for_state_change(
+                activo_ids, 'retirado', 'El activo ya está activo',
+                extra_fields=('fecha_baja', 'motivo_baja', 'usuario_baja', 'documentos_baja'),
+            )
+            if activos:
+                usernames = dict(User.objects.filter(
+                    pk__in={activo.usuario_baja_id for activo in activos if activo.usuario_baja_id}
+                ).values_list('pk', 'username'))
+                Activo.objects.filter(pk__in=[activo.pk for activo in activos]).update_with_counts(
+                    estado='activo', fecha_baja=None, motivo_baja=None, usuario_baja=None,
+                    documentos_baja=None, updated_at=timezone.now(),
+                )
+
+                new_data = {
+                    'estado': 'activo',
+                    'fecha_baja': None,
+                    'motivo_baja': None,
+                    'usuario_baja': None,
+                    'documentos_baja': None
+                }
+                documentos = set()
+                for activo in activos:
+                    self._log_activity('REACTIVATE', activo, old_data={
+                        'estado': 'retirado',
+                        'fecha_baja': activo.fecha_baja.isoformat() if activo.fecha_baja else None,
+                        'motivo_baja': activo.motivo_baja,
+                        'usuario_baja': usernames.get(activo.usuario_baja_id),
+                        'documentos_baja': activo.documentos_baja
+                    }, new_data=new_data)
+                    documentos.update(activo.documentos_baja or [])
+
+                # Los archivos se borran después de confirmar, si ningún otro activo retirado los comparte
+                transaction.on_commit(lambda: delete_unreferenced_documents(documentos))
+
+        return Response({
+            'reactivated': len(activos),
+            'results': [results[activo_id] for activo_id in activo_ids],
+        })
+
+    def _lock_for_state_change(self, activo_ids, estado, wrong_state_error, extra_fields=()):
+        """
+        Lock the requested assets and split them into the ones in `estado` (returned for
+        the change) and per-asset outcomes {id: {'id', 'success', 'error'?}} for all ids.
+        """
+        found = {
+            activo.pk: activo
+            for activo in Activo.objects.select_for_update().filter(pk__in=activo_ids).only(
+                'id', 'hostname', 'serie', 'estado', *extra_fields
+            )
+        }
+        activos, results = [], {}
+        for activo_id in activo_ids:
+            activo = found.get(activo_id)
+            if activo is None:
+                results[activo_id] = {'id': activo_id, 'success': False, 'error': 'Activo no encontrado'}
+            elif activo.estado != estado:
+                results[activo_id] = {'id': activo_id, 'success': False, 'error': wrong_state_error}
+            else:
+                results[activo_id] = {'id': activo_id, 'success': True}
+                activos.append(activo)
+        return activos, results
+
+    @action(detail=False, methods=['post'], url_path='bulk-import', permission_classes=[permissions.IsAuthenticated, permissions.DjangoModelPermissions])
+    def bulk_import(self, request):
+        """
+        Import assets from an uploaded CSV/JSON file ('file') or a JSON list of rows
+        (see importer.py). With ?dry_run=true only the validation report is returned.
+        """
+        upload = request.FILES.get('file')
+        try:
+            if upload is not None:
+                format = 'json' if upload.name.lower().endswith('.json') else 'csv'
+                rows = importer.read_rows(upload.read(), format)
+            else:
+                rows = importer.normalize_rows(request.data.get('rows') if isinstance(request.data, dict) else request.data)
+        except (ValueError, UnicodeDecodeError) as error:
+            return Response({'error': f'No se pudo leer el archivo: {error}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        params = request.data if isinstance(request.data, dict) else {}
+        dry_run = str(request.query_params.get('dry_run', params.get('dry_run', 'false'))).lower() in ('1', 'true')
+        result = importer.import_activos(rows, user=request.user, dry_run=dry_run)
+        if result['errors']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_200_OK if dry_run else status.HTTP_201_CREATED)
+
 
 class MaintenanceViewSet(AuditLogMixin, viewsets.ModelViewSet):
     queryset = Maintenance.objects.select_related('activo', 'technician').all()
@@ -396,23 +604,101 @@ class MaintenanceViewSet(AuditLogMixin, viewsets.ModelViewSet):
         # This method is now handled in create() above
         pass
 
+    @action(detail=False, methods=['post'], url_path='bulk', permission_classes=[permissions.IsAuthenticated, permissions.DjangoModelPermissions])
+    def bulk(self, request):
+        """
+        Register the same maintenance (date, technician, findings and attachments) for
+        several assets given by hostname or serie in 'asset_identifiers'. All or nothing.
+        """
+        identifiers = request_list(request, 'asset_identifiers')
+        maintenance_date = request.data.get('maintenance_date')
+        technician_id = request.data.get('technician')
+        findings = request.data.get('findings')
+
+        if maintenance_date and isinstance(maintenance_date, str):
+            try:
+                maintenance_date = datetime.strptime(maintenance_date, '%Y-%m-%d').date()
+            except ValueError:
+                return Response({'error': 'Formato de fecha inválido. Use YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+        if not all([identifiers, maintenance_date, technician_id, findings]):
+            return Response({'error': 'Todos los campos son obligatorios'}, status=status.HTTP_400_BAD_REQUEST)
+
+        technician = User.objects.filter(pk=technician_id).first() if str(technician_id).isdigit() else None
+        if technician is None:
+            return Response({'error': 'Técnico no encontrado'}, status=status.HTTP_404_NOT_FOUND)
+
+        # Todos los identificadores en una consulta; el hostname tiene prioridad sobre la serie
+        by_hostname, by_serie = {}, {}
+        for activo in Activo.objects.filter(Q(hostname__in=identifiers) | Q(serie__in=identifiers)).only(
+            'id', 'hostname', 'serie', 'fecha_registro', 'region'
+        ):
+            by_hostname[activo.hostname.casefold()] = activo
+            by_serie[activo.serie.casefold()] = activo
+        resolved = {
+            identifier: by_hostname.get(identifier.casefold()) or by_serie.get(identifier.casefold())
+            for identifier in identifiers
+        }
+        missing = [identifier for identifier, activo in resolved.items() if activo is None]
+        if missing:
+            return Response({
+                'error': f'Activos no encontrados: {", ".join(missing)}',
+                'not_found': missing
+            }, status=status.HTTP_404_NOT_FOUND)
+        activos = list({activo.pk: activo for activo in resolved.values()}.values())
+
+        # Un solo juego de adjuntos para todos los mantenimientos
+        attachments_paths = []
+        if 'attachments' in request.FILES:
+            try:
+                attachments_paths = save_uploaded_documents(request.FILES.getlist('attachments'), 'maintenance_documents')
+            except ValueError as e:
+                return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            maintenances = Maintenance.create_batch(
+                activos, maintenance_date, technician, findings, attachments_paths or None
+            )
+            # Las entradas de auditoría se insertan juntas al confirmar (ver audit.record)
+            for maintenance in maintenances:
+                self._log_activity('CREATE', maintenance,
+                                   old_data=None,
+                                   new_data={
+                                       'maintenance_date': maintenance.maintenance_date.isoformat(),
+                                       'technician': technician.username,
+                                       'findings': maintenance.findings,
+                                       'next_maintenance_date': maintenance.next_maintenance_date.isoformat() if maintenance.next_maintenance_date else None,
+                                       'attachments': attachments_paths
+                                   })
+
+        serializer = self.get_serializer(maintenances, many=True)
+        return Response({
+            'created': len(maintenances),
+            'attachments': attachments_paths,
+            'maintenances': serializer.data
+        }, status=status.HTTP_201_CREATED)
+
 
 class AssignmentViewSet(AuditLogMixin, viewsets.ModelViewSet):
     queryset = Assignment.objects.select_related(
         'activo', 'employee', 'assigned_by', 'returned_by'
     ).all()
     serializer_class = AssignmentSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = StandardKeysetPagination
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
     filter_backends = [drf_filters.SearchFilter, drf_filters.OrderingFilter]
     search_fields = ['activo__hostname', 'activo__serie', 'employee__first_name', 'employee__last_name', 'employee__employee_number']
-    ordering_fields = ['assigned_date', 'returned_date', 'activo__hostname', 'employee__first_name']
+    ordering_fields = [
+        'assigned_date', 'returned_date', 'activo__hostname', 'employee__first_name',
+    ] + [f'activo_{field}' for field in SPEC_FIELDS]
     ordering = ['-assigned_date']
 
     def get_queryset(self):
         queryset = Assignment.objects.select_related(
-            'activo', 'employee', 'assigned_by', 'returned_by'
+            'activo__tipo_activo', 'activo__marca', 'activo__modelo', 'employee', 'assigned_by', 'returned_by'
         )
+        if self.action in ['list', 'retrieve']:
+            # Como en ActivoViewSet: las anotaciones no se refrescan al guardar
+            queryset = queryset.with_effective_specs()
 
         # Filter by employee if provided
         employee_id = self.request.query_params.get('employee', None)
@@ -456,14 +742,14 @@ class AssignmentViewSet(AuditLogMixin, viewsets.ModelViewSet):
             return_date = timezone.now()
 
         # Update the assignment
-        old_data = serialize_model_data(assignment)
+        old_data = audit.snapshot(assignment)
         assignment.returned_date = return_date
         assignment.returned_by = request.user
         assignment.save()
 
         # Log the return
         try:
-            new_data = serialize_model_data(assignment)
+            new_data = audit.snapshot(assignment)
             self._log_activity('RETURN', assignment, old_data=old_data, new_data=new_data)
         except Exception as e:
             print(f"Error logging return assignment: {e}")
@@ -481,9 +767,7 @@ class AssignmentViewSet(AuditLogMixin, viewsets.ModelViewSet):
 
         available_assets = Activo.objects.filter(
             estado='activo'
-        ).exclude(id__in=assigned_activo_ids).select_related(
-            'tipo_activo', 'marca', 'modelo', 'region'
-        )
+        ).exclude(id__in=assigned_activo_ids).with_list_data()
 
         # Apply search filter if provided
         search = request.query_params.get('search', '')
@@ -529,82 +813,80 @@ class AssignmentViewSet(AuditLogMixin, viewsets.ModelViewSet):
             return Response({'error': 'Empleado no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
         # Validate all assets exist and are available
-        activos = Activo.objects.filter(id__in=activo_ids, estado='activo')
-        if activos.count() != len(activo_ids):
+        # Relaciones que leen el snapshot de auditoría y el serializador de asignaciones
+        activos = list(Activo.objects.filter(id__in=activo_ids, estado='activo').select_related(
+            'tipo_activo', 'proveedor', 'marca', 'modelo__marca', 'modelo__tipo_activo', 'region', 'finca', 'departamento', 'area'
+        ))
+        if len(activos) != len(activo_ids):
             return Response({'error': 'Uno o más activos no existen o no están activos'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Check for already assigned assets
-        assigned_activos = Assignment.objects.filter(
-            activo_id__in=activo_ids,
-            returned_date__isnull=True
-        ).values_list('activo_id', flat=True)
-
-        if assigned_activos:
-            assigned_hostnames = Activo.objects.filter(id__in=assigned_activos).values_list('hostname', flat=True)
-            return Response({
-                'error': f'Los siguientes activos ya están asignados: {", ".join(assigned_hostnames)}'
-            }, status=status.HTTP_400_BAD_REQUEST)
-
         # Check assignment rules: one per tipo_activo
-        employee_active_assignments = Assignment.objects.filter(
+        assigned_tipos = set(Assignment.objects.filter(
             employee=employee,
             returned_date__isnull=True
-        ).select_related('activo__tipo_activo')
-
-        assigned_tipos = {assignment.activo.tipo_activo for assignment in employee_active_assignments}
-        conflicting_tipos = []
-
-        for activo in activos:
-            if activo.tipo_activo in assigned_tipos:
-                conflicting_tipos.append(activo.tipo_activo.name)
+        ).values_list('activo__tipo_activo_id', flat=True))
+        conflicting_tipos = {activo.tipo_activo.name for activo in activos if activo.tipo_activo_id in assigned_tipos}
 
         if conflicting_tipos:
             return Response({
-                'error': f'El empleado ya tiene asignado activos de los siguientes tipos: {", ".join(set(conflicting_tipos))}'
+                'error': f'El empleado ya tiene asignado activos de los siguientes tipos: {", ".join(conflicting_tipos)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create assignments and update assets
-        created_assignments = []
+        # Apply asset updates in memory; they are written below with a single bulk_update
         updated_assets = []
-
+        updated_fields = set()
         for activo in activos:
-            # Update asset if updates provided
-            activo_id_str = str(activo.id)
-            asset_updated = False
-            if activo_id_str in asset_updates:
-                update_data = asset_updates[activo_id_str]
-                old_asset_data = serialize_model_data(activo)
-                for field, value in update_data.items():
+            update_data = asset_updates.get(str(activo.id))
+            if not update_data:
+                continue
+            old_asset_data = audit.snapshot(activo)
+            changed = set()
+            for field, value in update_data.items():
+                if hasattr(activo, field) and value is not None:
+                    field_obj = activo._meta.get_field(field)
                     # Skip empty strings for integer fields
-                    if hasattr(activo, field) and value is not None:
-                        field_obj = activo._meta.get_field(field)
-                        # Skip empty strings for integer fields
-                        if isinstance(field_obj, models.IntegerField) and value == '':
-                            continue
-                        # Check if value has actually changed
-                        if str(getattr(activo, field)) != str(value):
-                            setattr(activo, field, value)
-                            asset_updated = True
-
-                if asset_updated:
-                    activo.save()
-                    updated_assets.append(activo)
-                    # Log asset update
-                    new_asset_data = serialize_model_data(activo)
-                    self._log_activity('UPDATE', activo, old_data=old_asset_data, new_data=new_asset_data)
-
-            # Create assignment
-            assignment = Assignment.objects.create(
-                activo=activo,
-                employee=employee,
-                assigned_by=request.user
-            )
-            created_assignments.append(assignment)
-
-            # Log the assignment
-            self._log_activity('CREATE', assignment, old_data=None, new_data=serialize_model_data(assignment))
+                    if isinstance(field_obj, models.IntegerField) and value == '':
+                        continue
+                    # Check if value has actually changed
+                    if str(getattr(activo, field)) != str(value):
+                        setattr(activo, field, value)
+                        changed.add(field_obj.name)
+            if changed:
+                updated_assets.append((activo, old_asset_data))
+                updated_fields |= changed
+
+        # Todo o nada y por lotes: actualización de activos, assigned_to y asignaciones en una
+        # transacción. Los activos que ya tengan una asignación activa los rechaza el índice
+        # único de la base de datos (Assignment.ACTIVE_CONSTRAINT) sin consultarlos antes.
+        try:
+            with transaction.atomic():
+                if updated_assets:
+                    now = timezone.now()
+                    for activo, _ in updated_assets:
+                        activo.updated_at = now
+                    Activo.objects.bulk_update([activo for activo, _ in updated_assets], [*updated_fields, 'updated_at'])
+                    for activo, old_asset_data in updated_assets:
+                        self._log_activity('UPDATE', activo, old_data=old_asset_data, new_data=audit.snapshot(activo))
+
+                created_assignments = Assignment.create_active(activos, employee, request.user)
+                # Las entradas de auditoría se insertan juntas al confirmar (ver audit.record)
+                for assignment in created_assignments:
+                    self._log_activity('CREATE', assignment, old_data=None, new_data=audit.snapshot(assignment))
+        except IntegrityError as error:
+            if not Assignment.is_active_conflict(error):
+                raise
+            assigned = Assignment.objects.filter(
+                activo__in=activos, returned_date__isnull=True
+            ).values_list('activo__hostname', flat=True)
+            return Response({
+                'error': f'Los siguientes activos ya están asignados: {", ".join(assigned)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = self.get_serializer(created_assignments, many=True)
+        if updated_assets:
+            # Datos del listado en una sola consulta (con el assigned_to ya actualizado)
+            updated_ids = [activo.id for activo, _ in updated_assets]
+            updated_assets = Activo.objects.with_list_data().with_effective_specs().filter(id__in=updated_ids).order_by('id')
         return Response({
             'assignments': serializer.data,
             'updated_assets': ActivoSerializer(updated_assets, many=True).data if updated_assets else []
@@ -648,54 +930,20 @@ def dashboard_warranty_data(request):
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_summary(request):
     # Get summary statistics for dashboard cards
-    today = date.today()
-    thirty_days_from_now = today + timedelta(days=30)
-
-    # Total assets card
-    total_assets = Activo.objects.filter(estado='activo').count()
-
-    # Get all asset types that have assets
-    asset_types_data = []
-    tipos_activo = TipoActivo.objects.all()
-
-    for tipo in tipos_activo:
-        # Count total assets for this type
-        total_count = Activo.objects.filter(tipo_activo=tipo, estado='activo').count()
-
-        if total_count > 0:  # Only include types that have assets
-            # Assets with valid warranty (>30 days)
-            valid_warranty = Activo.objects.filter(
-                tipo_activo=tipo,
-                estado='activo',
-                fecha_fin_garantia__gt=thirty_days_from_now
-            ).exclude(fecha_fin_garantia__isnull=True).count()
-
-            # Assets with warranty expiring within 30 days (but not today)
-            expiring_warranty = Activo.objects.filter(
-                tipo_activo=tipo,
-                estado='activo',
-                fecha_fin_garantia__gt=today,
-                fecha_fin_garantia__lte=thirty_days_from_now
-            ).count()
-
-            # Assets without warranty or expired warranty
-            no_warranty = Activo.objects.filter(
-                Q(tipo_activo=tipo) &
-                Q(estado='activo') &
-                (Q(fecha_fin_garantia__isnull=True) | Q(fecha_fin_garantia__lte=today))
-            ).count()
-
-            asset_types_data.append({
-                'tipo_activo': tipo.name,
-                'total_equipment': total_count,
-                'valid_warranty': valid_warranty,
-                'expiring_warranty': expiring_warranty,
-                'no_warranty': no_warranty
-            })
+    rows = dashboard_summary_counts()
 
     data = {
-        'total_assets': total_assets,
-        'asset_types': asset_types_data
+        'total_assets': sum(row['total_equipment'] for row in rows),
+        'asset_types': [
+            {
+                'tipo_activo': row['tipo_activo'],
+                'total_equipment': row['total_equipment'],
+                'valid_warranty': row['valid_warranty'],
+                'expiring_warranty': row['expiring_warranty'],
+                'no_warranty': row['no_warranty']
+            }
+            for row in rows
+        ]
     }
 
     return Response(data)
@@ -703,58 +951,59 @@ def dashboard_summary(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_detail_data(request):
-    """Get detailed asset data for a specific category with sorting and pagination"""
+    """
+    Get the active assets of a dashboard card category, one page at a time.
+
+    Only the orderings in DASHBOARD_DETAIL_ORDERINGS are accepted. ?page= reads
+    a page by number; each response also carries next_cursor/previous_cursor,
+    and following them with ?cursor= reads deep pages without an OFFSET (the
+    ?page= sent with a cursor only labels the page). total_count comes from the
+    cached dashboard_summary counts.
+    """
     category = request.GET.get('category', '')
     ordering = request.GET.get('ordering', 'serie')  # Default sort by serie
-    page = int(request.GET.get('page', 1))
-    page_size = int(request.GET.get('page_size', 10))
-
+    if ordering.lstrip('-') not in DASHBOARD_DETAIL_ORDERINGS:
+        return Response({
+            'error': 'Invalid ordering',
+            'allowed': [f'{prefix}{field}' for field in DASHBOARD_DETAIL_ORDERINGS for prefix in ('', '-')]
+        }, status=400)
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        return Response({'error': 'Invalid page'}, status=400)
+    paginator = DashboardDetailPagination()
+    page_size = paginator.get_page_size(request)
+
+    # Mismas categorías y conteos que las tarjetas de dashboard_summary
+    today = date.today()
+    warranty_filters = warranty_category_filters(today)
+    summary = dashboard_summary_counts(today)
     if category == 'total_assets':
-        assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(estado='activo')
-    elif category == 'valid_warranty':
-        today = date.today()
-        thirty_days_from_now = today + timedelta(days=30)
-        assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(
-            estado='activo',
-            fecha_fin_garantia__gt=thirty_days_from_now
-        ).exclude(fecha_fin_garantia__isnull=True)
-    elif category == 'expiring_warranty':
-        today = date.today()
-        thirty_days_from_now = today + timedelta(days=30)
-        assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(
-            Q(estado='activo') &
-            Q(fecha_fin_garantia__gt=today) & Q(fecha_fin_garantia__lte=thirty_days_from_now)
-        )
-    elif category == 'no_warranty':
-        today = date.today()
-        assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(
-            Q(estado='activo') &
-            (Q(fecha_fin_garantia__isnull=True) | Q(fecha_fin_garantia__lte=today))
-        )
+        condition = Q()
+        total_count = sum(row['total_equipment'] for row in summary)
+    elif category in warranty_filters:
+        condition = warranty_filters[category]
+        total_count = sum(row[category] for row in summary)
     else:
         # Check if category matches an asset type name
-        try:
-            tipo_activo = TipoActivo.objects.get(name=category)
-            assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(
-                tipo_activo=tipo_activo,
-                estado='activo'
+        row = next((row for row in summary if row['tipo_activo'] == category), None)
+        if row is not None:
+            tipo_activo_id, total_count = row['tipo_activo_id'], row['total_equipment']
+        else:
+            # Tipo sin activos activos (o categoría inválida)
+            tipo_activo = next(
+                (tipo for tipo in catalog_cache.objects(TipoActivo).values() if tipo.name == category), None
             )
-        except TipoActivo.DoesNotExist:
-            return Response({'error': 'Invalid category'}, status=400)
+            if tipo_activo is None:
+                return Response({'error': 'Invalid category'}, status=400)
+            tipo_activo_id, total_count = tipo_activo.pk, 0
+        condition = Q(tipo_activo_id=tipo_activo_id)
 
-    # Apply ordering
-    if ordering.startswith('-'):
-        assets = assets.order_by(ordering)
-    else:
-        assets = assets.order_by(ordering)
-
-    # Get total count for pagination
-    total_count = assets.count()
-
-    # Apply pagination
-    start_index = (page - 1) * page_size
-    end_index = start_index + page_size
-    assets_page = assets[start_index:end_index]
+    assets = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region').filter(
+        condition, estado='activo'
+    ).order_by(ordering)
+    offset = 0 if request.GET.get(paginator.cursor_query_param) else (page - 1) * page_size
+    assets_page = paginator.paginate_keyset(assets, request, page_size, offset=offset)
 
     # Serialize the assets
     data = []
@@ -780,7 +1029,9 @@ def dashboard_detail_data(request):
             'page': page,
             'page_size': page_size,
             'total_count': total_count,
-            'total_pages': (total_count + page_size - 1) // page_size
+            'total_pages': (total_count + page_size - 1) // page_size,
+            'next_cursor': paginator.next_cursor,
+            'previous_cursor': paginator.previous_cursor
         }
     })
 
@@ -790,6 +1041,7 @@ def dashboard_data(request):
     # Get all tipos_activo and regions
     tipos_activo = TipoActivo.objects.all().order_by('name')
     regions = Region.objects.all().order_by('name')
+    region_names = {region.id: region.name for region in regions}
 
     # Prepare data structure
     data = {
@@ -798,6 +1050,14 @@ def dashboard_data(request):
         'totals': {region.name: 0 for region in regions}
     }
 
+    # Conteos por tipo y región leídos de la tabla pre-agregada (una sola consulta)
+    counts_by_tipo = {}
+    counts = ActivoCount.objects.filter(estado='activo', total__gt=0).values(
+        'tipo_activo_id', 'region_id'
+    ).annotate(count=Sum('total'))
+    for count_data in counts:
+        counts_by_tipo.setdefault(count_data['tipo_activo_id'], []).append(count_data)
+
     for tipo in tipos_activo:
         tipo_data = {
             'name': tipo.name,
@@ -805,11 +1065,8 @@ def dashboard_data(request):
             'total': 0
         }
 
-        # Count assets for this tipo_activo per region
-        counts = Activo.objects.filter(tipo_activo=tipo, estado='activo').values('region__name').annotate(count=Count('id'))
-
-        for count_data in counts:
-            region_name = count_data['region__name']
+        for count_data in counts_by_tipo.get(tipo.id, []):
+            region_name = region_names[count_data['region_id']]
             count = count_data['count']
             tipo_data['counts'][region_name] = count
             tipo_data['total'] += count
@@ -830,22 +1087,26 @@ def dashboard_data(request):
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def dashboard_models_data(request):
-    from apps.masterdata.models import ModeloActivo
-
     regions = Region.objects.all().order_by('name')
+    region_names = {region.id: region.name for region in regions}
+
+    # Conteos por modelo y región leídos de la tabla pre-agregada (una sola consulta)
+    modelos = {}
+    counts = ActivoCount.objects.filter(estado='activo', total__gt=0).values(
+        'modelo_id', 'modelo__name', 'region_id'
+    ).annotate(count=Sum('total'))
+    for count_data in counts:
+        modelo = modelos.setdefault(count_data['modelo_id'], {
+            'name': count_data['modelo__name'],
+            'counts': {},
+            'total_count': 0
+        })
+        region_name = region_names[count_data['region_id']]
+        modelo['counts'][region_name] = modelo['counts'].get(region_name, 0) + count_data['count']
+        modelo['total_count'] += count_data['count']
 
-    # Get all modelos_activo with their total counts
-    modelos_with_counts = []
-    for modelo in ModeloActivo.objects.select_related('marca', 'tipo_activo').all():
-        total_count = Activo.objects.filter(modelo=modelo, estado='activo').count()
-        if total_count > 0:  # Only include models that have assets
-            modelos_with_counts.append({
-                'modelo': modelo,
-                'total_count': total_count
-            })
-
-    # Sort by total count descending and take top 10
-    modelos_with_counts.sort(key=lambda x: x['total_count'], reverse=True)
+    # Sort by total count descending (ties by model name) and take top 10
+    modelos_with_counts = sorted(modelos.values(), key=lambda x: (-x['total_count'], x['name']))
     top_modelos = modelos_with_counts[:10]
     other_modelos = modelos_with_counts[10:]
 
@@ -858,19 +1119,13 @@ def dashboard_models_data(request):
 
     # Process top 10 models
     for item in top_modelos:
-        modelo = item['modelo']
         modelo_data = {
-            'name': modelo.name,  # Just model name without brand
+            'name': item['name'],  # Just model name without brand
             'counts': {region.name: 0 for region in regions},
             'total': 0
         }
 
-        # Count assets for this modelo per region
-        counts = Activo.objects.filter(modelo=modelo, estado='activo').values('region__name').annotate(count=Count('id'))
-
-        for count_data in counts:
-            region_name = count_data['region__name']
-            count = count_data['count']
+        for region_name, count in item['counts'].items():
             modelo_data['counts'][region_name] = count
             modelo_data['total'] += count
             data['totals'][region_name] += count
@@ -886,12 +1141,7 @@ def dashboard_models_data(request):
         }
 
         for item in other_modelos:
-            modelo = item['modelo']
-            counts = Activo.objects.filter(modelo=modelo, estado='activo').values('region__name').annotate(count=Count('id'))
-
-            for count_data in counts:
-                region_name = count_data['region__name']
-                count = count_data['count']
+            for region_name, count in item['counts'].items():
                 otros_data['counts'][region_name] += count
                 otros_data['total'] += count
                 data['totals'][region_name] += count
@@ -908,20 +1158,100 @@ def dashboard_models_data(request):
 
     return Response(data)
 
+# Prioridad de cada estado de mantenimiento para el ordenamiento por defecto
+MAINTENANCE_STATUS_PRIORITY = {'nunca': 0, 'vencidos': 1, 'proximos': 2, 'realizados': 3}
+
+# Campos de la respuesta de maintenance_overview que se pueden usar en ?ordering=
+MAINTENANCE_OVERVIEW_ORDERING = {
+    'id': 'id',
+    'hostname': 'hostname',
+    'serie': 'serie',
+    'tipo': 'tipo_activo__name',
+    'marca': 'marca__name',
+    'modelo': 'modelo__name',
+    'ultimo_mantenimiento': 'mant_ultimo',
+    'proximo_mantenimiento': 'mant_proximo',
+    'region': 'region__name',
+    'finca': 'finca__name',
+    'tecnico_mantenimiento': 'mant_tecnico',
+    'usuario': 'tecnico_mantenimiento__username',
+    'status': 'mant_status',
+}
+
+def maintenance_status_queryset(today=None):
+    """
+    Active assets annotated with their effective maintenance dates and status.
+
+    The dates stored on Activo are used; when either is missing the latest
+    Maintenance record (if any) is used instead. Annotations:
+    mant_ultimo, mant_proximo, mant_tecnico, mant_status, mant_status_priority.
+    """
+    today = today or date.today()
+    latest = Maintenance.objects.filter(activo=OuterRef('pk')).order_by('-created_at')
+
+    # Si faltan fechas en el activo y existe un mantenimiento, se usa el último mantenimiento
+    use_latest = (
+        (Q(ultimo_mantenimiento__isnull=True) | Q(proximo_mantenimiento__isnull=True)) &
+        Q(mant_latest_id__isnull=False)
+    )
+
+    queryset = Activo.objects.filter(estado='activo').annotate(
+        mant_latest_id=Subquery(latest.values('pk')[:1])
+    ).annotate(
+        mant_ultimo=Case(
+            When(use_latest, then=Subquery(latest.values('maintenance_date')[:1])),
+            default=F('ultimo_mantenimiento'),
+            output_field=models.DateField()
+        ),
+        mant_proximo=Case(
+            When(use_latest, then=Subquery(latest.values('next_maintenance_date')[:1])),
+            default=F('proximo_mantenimiento'),
+            output_field=models.DateField()
+        ),
+        mant_tecnico=Coalesce(
+            Case(
+                When(use_latest, then=Subquery(latest.values('technician__username')[:1])),
+                default=F('tecnico_mantenimiento__username'),
+                output_field=models.CharField()
+            ),
+            Value('')
+        ),
+    )
+
+    # Determine status based on maintenance dates - COMPREHENSIVE LOGIC
+    status_whens = [
+        # No maintenance history at all
+        When(mant_ultimo__isnull=True, mant_proximo__isnull=True, then=Value('nunca')),
+        # Has maintenance history but no next scheduled
+        When(mant_proximo__isnull=True, then=Value('realizados')),
+        # Next maintenance is overdue
+        When(mant_proximo__lt=today, then=Value('vencidos')),
+        # Next maintenance is within 30 days
+        When(mant_proximo__lte=today + timedelta(days=30), then=Value('proximos')),
+    ]
+    return queryset.annotate(
+        mant_status=Case(*status_whens, default=Value('realizados'), output_field=models.CharField())
+    ).annotate(
+        mant_status_priority=Case(
+            *[When(mant_status=name, then=Value(priority)) for name, priority in MAINTENANCE_STATUS_PRIORITY.items()],
+            default=Value(len(MAINTENANCE_STATUS_PRIORITY)),
+            output_field=models.IntegerField()
+        )
+    )
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def maintenance_overview(request):
     """Get maintenance overview data for all active assets"""
-    from datetime import date, timedelta
-    today = date.today()
-
     # Get filters
     region_filter = request.GET.getlist('regions', [])
     tipo_filter = request.GET.getlist('tipos', [])
     status_filter = request.GET.getlist('status', [])
 
-    # Get all active assets
-    activos = Activo.objects.select_related('tipo_activo', 'marca', 'modelo', 'region', 'finca', 'tecnico_mantenimiento').filter(estado='activo')
+    # Estado, filtros, orden y paginación se resuelven en la base de datos
+    activos = maintenance_status_queryset().select_related(
+        'tipo_activo', 'marca', 'modelo', 'region', 'finca', 'tecnico_mantenimiento'
+    )
 
     # Get filter options from all active assets
     all_activos = Activo.objects.filter(estado='activo')
@@ -936,43 +1266,28 @@ def maintenance_overview(request):
     if tipo_filter:
         activos = activos.filter(tipo_activo__name__in=tipo_filter)
 
-    data = []
-    for activo in activos:
-        # Use the maintenance dates stored directly on the Activo model (these are updated by Maintenance.save())
-        ultimo_mantenimiento = activo.ultimo_mantenimiento
-        proximo_mantenimiento = activo.proximo_mantenimiento
-        tecnico_mantenimiento = activo.tecnico_mantenimiento.username if activo.tecnico_mantenimiento else ''
-
-        # If Activo fields are empty, check Maintenance records as fallback
-        if not ultimo_mantenimiento or not proximo_mantenimiento:
-            latest_maintenance = Maintenance.objects.filter(activo=activo).select_related('technician').order_by('-created_at').first()
-            if latest_maintenance:
-                ultimo_mantenimiento = latest_maintenance.maintenance_date
-                proximo_mantenimiento = latest_maintenance.next_maintenance_date
-                tecnico_mantenimiento = latest_maintenance.technician.username if latest_maintenance.technician else ''
-
-        # Determine status based on maintenance dates - COMPREHENSIVE LOGIC
-        if not ultimo_mantenimiento and not proximo_mantenimiento:
-            # No maintenance history at all
-            status = 'nunca'
-        elif ultimo_mantenimiento and not proximo_mantenimiento:
-            # Has maintenance history but no next scheduled
-            status = 'realizados'
-        elif proximo_mantenimiento:
-            # Has next maintenance scheduled
-            if proximo_mantenimiento < today:
-                # Next maintenance is overdue
-                status = 'vencidos'
-            elif proximo_mantenimiento <= today + timedelta(days=30):
-                # Next maintenance is within 30 days (extended from 15)
-                status = 'proximos'
-            else:
-                # Next maintenance is scheduled but not urgent
-                status = 'realizados'
+    # Apply status filter if specified
+    if status_filter:
+        activos = activos.filter(mant_status__in=status_filter)
+
+    # Apply user-specified ordering (empty values always last ascending, first descending)
+    ordering = request.GET.get('ordering')
+    field = MAINTENANCE_OVERVIEW_ORDERING.get(ordering.lstrip('-')) if ordering else None
+    if field:
+        if ordering.startswith('-'):
+            activos = activos.order_by(F(field).desc(nulls_first=True), '-created_at', '-id')
         else:
-            # Fallback case - has last maintenance
-            status = 'realizados'
+            activos = activos.order_by(F(field).asc(nulls_last=True), '-created_at', '-id')
+    else:
+        # Default sorting: status priority (nunca, vencidos, proximos, realizados) then by proximo_mantenimiento date
+        activos = activos.order_by('mant_status_priority', F('mant_proximo').asc(nulls_last=True), '-created_at', '-id')
 
+    # Apply pagination: only the requested page is materialized
+    paginator = StandardResultsSetPagination()
+    page = paginator.paginate_queryset(activos, request)
+
+    data = []
+    for activo in page:
         data.append({
             'id': activo.id,
             'hostname': activo.hostname,
@@ -980,50 +1295,17 @@ def maintenance_overview(request):
             'tipo': activo.tipo_activo.name if activo.tipo_activo else '',
             'marca': activo.marca.name if activo.marca else '',
             'modelo': activo.modelo.name if activo.modelo else '',
-            'ultimo_mantenimiento': ultimo_mantenimiento.isoformat() if ultimo_mantenimiento else None,
-            'proximo_mantenimiento': proximo_mantenimiento.isoformat() if proximo_mantenimiento else None,
+            'ultimo_mantenimiento': activo.mant_ultimo.isoformat() if activo.mant_ultimo else None,
+            'proximo_mantenimiento': activo.mant_proximo.isoformat() if activo.mant_proximo else None,
             'region': activo.region.name if activo.region else '',
             'finca': activo.finca.name if activo.finca else '',
-            'tecnico_mantenimiento': tecnico_mantenimiento,
+            'tecnico_mantenimiento': activo.mant_tecnico,
             'usuario': activo.tecnico_mantenimiento.username if activo.tecnico_mantenimiento else '',
-            'status': status,
+            'status': activo.mant_status,
             'maintenance_id': None  # Not needed for this view
         })
 
-    # Apply custom sorting or user-specified ordering
-    ordering = request.GET.get('ordering')
-    if ordering:
-        reverse = ordering.startswith('-')
-        field = ordering.lstrip('-')
-        def sort_key(item):
-            value = item.get(field)
-            if value is None:
-                # None values always at end for ascending, beginning for descending
-                return ('z' * 100,)
-            return (value,)
-        data.sort(key=sort_key, reverse=reverse)
-    else:
-        # Default sorting: status priority (nunca, vencidos, proximos, realizados) then by proximo_mantenimiento date
-        def sort_func(item):
-            # Status priority: nunca (0), vencidos (1), proximos (2), realizados (3)
-            status_priority = {'nunca': 0, 'vencidos': 1, 'proximos': 2, 'realizados': 3}
-            status_value = status_priority.get(item.get('status'), 4)
-
-            # For date sorting, use proximo_mantenimiento, put None values at the end
-            date_value = item.get('proximo_mantenimiento') or '9999-12-31'
-
-            return (status_value, date_value)
-
-        data.sort(key=sort_func)
-    
-        # Apply status filter if specified
-        if status_filter:
-            data = [item for item in data if item['status'] in status_filter]
-
-    # Apply pagination
-    paginator = StandardResultsSetPagination()
-    paginated_data = paginator.paginate_queryset(data, request)
-    response = paginator.get_paginated_response(paginated_data)
+    response = paginator.get_paginated_response(data)
 
     # Add filter options to response
     response.data['filter_options'] = {
@@ -1035,6 +1317,80 @@ def maintenance_overview(request):
     return response
 
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def maintenance_planner(request):
+    """
+    Day-by-day maintenance plan per technician, grouped by finca (see planning.py).
+
+    Body: technicians (user ids, or {"id", "capacity", "region"} objects), capacity
+    (default daily capacity), start (YYYY-MM-DD, default today), days (business days),
+    and optional regions / fincas filters.
+    """
+    data = request.data
+    if not isinstance(data.get('technicians') or [], list):
+        return Response({'error': 'technicians debe ser una lista'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        capacity = int(data.get('capacity') or planning.DEFAULT_DAILY_CAPACITY)
+        days = int(data.get('days') or planning.DEFAULT_PLANNING_DAYS)
+        start = datetime.strptime(data['start'], '%Y-%m-%d').date() if data.get('start') else date.today()
+        requested = [dict(item) if isinstance(item, dict) else {'id': item} for item in data.get('technicians') or []]
+        technician_ids = [int(item['id']) for item in requested]
+        capacities = [int(item.get('capacity') or capacity) for item in requested]
+        for item in requested:
+            if item.get('region') is not None:
+                item['region'] = int(item['region'])
+        regions = request_id_list(request, 'regions')
+        fincas = request_id_list(request, 'fincas')
+    except (KeyError, TypeError, ValueError):
+        return Response({'error': 'Parámetros inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+
+    if not technician_ids:
+        return Response({'error': 'technicians es requerido'}, status=status.HTTP_400_BAD_REQUEST)
+    unknown_regions = {
+        item['region'] for item in requested if item.get('region') is not None
+    } - catalog_cache.objects(Region).keys()
+    if unknown_regions:
+        return Response({
+            'error': f'Regiones no encontradas: {", ".join(map(str, sorted(unknown_regions)))}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    if min(capacities, default=capacity) < 1 or capacity < 1 or not 1 <= days <= planning.MAX_PLANNING_DAYS:
+        return Response({
+            'error': f'capacity debe ser mayor que 0 y days estar entre 1 y {planning.MAX_PLANNING_DAYS}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    users = {
+        pk: (f'{first_name} {last_name}'.strip() or username, region_id)
+        for pk, username, first_name, last_name, region_id in User.objects.filter(
+            pk__in=technician_ids, is_active=True
+        ).values_list('pk', 'username', 'first_name', 'last_name', 'region_id')
+    }
+    missing = [pk for pk in technician_ids if pk not in users]
+    if missing:
+        return Response({'error': f'Técnicos no encontrados: {", ".join(map(str, missing))}'}, status=status.HTTP_400_BAD_REQUEST)
+
+    technicians = []
+    for item, pk, technician_capacity in zip(requested, technician_ids, capacities):
+        name, region_id = users[pk]
+        technicians.append({
+            'id': pk,
+            'name': name,
+            'capacity': technician_capacity,
+            # Por defecto el técnico trabaja en la región de su usuario (sin región: cualquiera)
+            'region_id': item['region'] if 'region' in item else region_id,
+        })
+
+    plan_days = planning.planning_days(start, days)
+    pending = planning.pending_maintenances(plan_days[-1], regions=regions, fincas=fincas)
+    result = planning.plan_maintenances(pending, technicians, plan_days)
+    return Response({
+        'start': plan_days[0].isoformat(),
+        'end': plan_days[-1].isoformat(),
+        'technicians': technicians,
+        **result,
+    })
+
+
 # CSV Report Generation Functions
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
@@ -1050,10 +1406,10 @@ def assets_report_csv(request):
     departamento = request.GET.get('departamento')
     area = request.GET.get('area')
 
-    # Build queryset
+    # Build queryset (especificaciones efectivas: valor del activo o el de su modelo)
     queryset = Activo.objects.select_related(
         'tipo_activo', 'proveedor', 'marca', 'modelo', 'region', 'finca', 'departamento', 'area'
-    )
+    ).with_effective_specs()
 
     if estado == 'all':
         pass  # Include all
@@ -1077,15 +1433,51 @@ def assets_report_csv(request):
     if area:
         queryset = queryset.filter(area_id=area)
 
-    # Create CSV response with UTF-8 BOM for Excel compatibility
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_activos.csv"'
-    # Add UTF-8 BOM for proper Excel display
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    # Write header
-    writer.writerow([
+    # Stream the CSV in keyset-paginated chunks (memoria acotada sin importar el número de filas)
+    def rows():
+        for activo in iterate_in_chunks(queryset):
+            yield [
+                activo.id,
+                activo.serie,
+                activo.hostname,
+                activo.tipo_activo.name if activo.tipo_activo else '',
+                activo.marca.name if activo.marca else '',
+                activo.modelo.name if activo.modelo else '',
+                activo.proveedor.nombre_empresa if activo.proveedor else '',
+                activo.region.name if activo.region else '',
+                activo.finca.name if activo.finca else '',
+                activo.departamento.name if activo.departamento else '',
+                activo.area.name if activo.area else '',
+                activo.fecha_registro.isoformat() if activo.fecha_registro else '',
+                activo.fecha_fin_garantia.isoformat() if activo.fecha_fin_garantia else '',
+                activo.estado,
+                activo.solicitante or '',
+                activo.correo_electronico or '',
+                activo.orden_compra or '',
+                activo.cuenta_contable or '',
+                activo.tipo_costo or '',
+                activo.cuotas or '',
+                activo.moneda or '',
+                activo.costo or '',
+                activo.procesador_efectivo or '',
+                activo.ram_efectivo or '',
+                activo.almacenamiento_efectivo or '',
+                activo.tarjeta_grafica_efectivo or '',
+                'Sí' if activo.wifi_efectivo else 'No',
+                'Sí' if activo.ethernet_efectivo else 'No',
+                activo.puertos_ethernet_efectivo or '',
+                activo.puertos_sfp_efectivo or '',
+                'Sí' if activo.puerto_consola_efectivo else 'No',
+                activo.puertos_poe_efectivo or '',
+                activo.alimentacion_efectivo or '',
+                'Sí' if activo.administrable_efectivo else 'No',
+                activo.tamano_efectivo or '',
+                activo.color_efectivo or '',
+                activo.conectores_efectivo or '',
+                activo.cables_efectivo or ''
+            ]
+
+    return streaming_csv_response('reporte_activos.csv', [
         'ID', 'Serie', 'Hostname', 'Tipo Activo', 'Marca', 'Modelo', 'Proveedor',
         'Región', 'Finca', 'Departamento', 'Área', 'Fecha Registro', 'Fecha Fin Garantía',
         'Estado', 'Solicitante', 'Correo Electrónico', 'Orden Compra', 'Cuenta Contable',
@@ -1093,52 +1485,7 @@ def assets_report_csv(request):
         'Tarjeta Gráfica', 'WIFI', 'Ethernet', 'Puertos Ethernet', 'Puertos SFP',
         'Puerto Consola', 'Puertos PoE', 'Alimentación', 'Administrable', 'Tamaño',
         'Color', 'Conectores', 'Cables'
-    ])
-
-    # Write data
-    for activo in queryset:
-        writer.writerow([
-            activo.id,
-            activo.serie,
-            activo.hostname,
-            activo.tipo_activo.name if activo.tipo_activo else '',
-            activo.marca.name if activo.marca else '',
-            activo.modelo.name if activo.modelo else '',
-            activo.proveedor.nombre_empresa if activo.proveedor else '',
-            activo.region.name if activo.region else '',
-            activo.finca.name if activo.finca else '',
-            activo.departamento.name if activo.departamento else '',
-            activo.area.name if activo.area else '',
-            activo.fecha_registro.isoformat() if activo.fecha_registro else '',
-            activo.fecha_fin_garantia.isoformat() if activo.fecha_fin_garantia else '',
-            activo.estado,
-            activo.solicitante or '',
-            activo.correo_electronico or '',
-            activo.orden_compra or '',
-            activo.cuenta_contable or '',
-            activo.tipo_costo or '',
-            activo.cuotas or '',
-            activo.moneda or '',
-            activo.costo or '',
-            activo.procesador or '',
-            activo.ram or '',
-            activo.almacenamiento or '',
-            activo.tarjeta_grafica or '',
-            'Sí' if activo.wifi else 'No',
-            'Sí' if activo.ethernet else 'No',
-            activo.puertos_ethernet or '',
-            activo.puertos_sfp or '',
-            'Sí' if activo.puerto_consola else 'No',
-            activo.puertos_poe or '',
-            activo.alimentacion or '',
-            'Sí' if activo.administrable else 'No',
-            activo.tamano or '',
-            activo.color or '',
-            activo.conectores or '',
-            activo.cables or ''
-        ])
-
-    return response
+    ], rows())
 
 
 @api_view(['GET'])
@@ -1199,34 +1546,25 @@ def maintenance_report_csv(request):
         except ValueError:
             pass
 
-    # Create CSV response with UTF-8 BOM for Excel compatibility
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_mantenimiento.csv"'
-    # Add UTF-8 BOM for proper Excel display
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    # Write header
-    writer.writerow([
+    # Stream the CSV in keyset-paginated chunks (memoria acotada sin importar el número de filas)
+    def rows():
+        for maintenance in iterate_in_chunks(queryset.order_by('-maintenance_date')):
+            yield [
+                maintenance.id,
+                maintenance.activo.hostname,
+                maintenance.activo.serie,
+                maintenance.maintenance_date.isoformat(),
+                maintenance.technician.username,
+                maintenance.next_maintenance_date.isoformat() if maintenance.next_maintenance_date else '',
+                maintenance.findings,
+                ', '.join(maintenance.attachments) if maintenance.attachments else '',
+                maintenance.created_at.isoformat()
+            ]
+
+    return streaming_csv_response('reporte_mantenimiento.csv', [
         'ID', 'Activo Hostname', 'Activo Serie', 'Fecha Mantenimiento', 'Técnico',
         'Próximo Mantenimiento', 'Hallazgos', 'Archivos Adjuntos', 'Fecha Creación'
-    ])
-
-    # Write data
-    for maintenance in queryset.order_by('-maintenance_date'):
-        writer.writerow([
-            maintenance.id,
-            maintenance.activo.hostname,
-            maintenance.activo.serie,
-            maintenance.maintenance_date.isoformat(),
-            maintenance.technician.username,
-            maintenance.next_maintenance_date.isoformat() if maintenance.next_maintenance_date else '',
-            maintenance.findings,
-            ', '.join(maintenance.attachments) if maintenance.attachments else '',
-            maintenance.created_at.isoformat()
-        ])
-
-    return response
+    ], rows())
 
 
 @api_view(['GET'])
@@ -1243,7 +1581,7 @@ def assignments_report_csv(request):
 
     # Build queryset
     queryset = Assignment.objects.select_related(
-        'activo', 'employee', 'assigned_by', 'returned_by'
+        'activo__tipo_activo', 'activo__marca', 'activo__modelo', 'employee', 'assigned_by', 'returned_by'
     )
 
     if employee_id:
@@ -1271,36 +1609,27 @@ def assignments_report_csv(request):
     if active_only:
         queryset = queryset.filter(returned_date__isnull=True)
 
-    # Create CSV response with UTF-8 BOM for Excel compatibility
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_asignaciones.csv"'
-    # Add UTF-8 BOM for proper Excel display
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    # Write header
-    writer.writerow([
+    # Stream the CSV in keyset-paginated chunks (memoria acotada sin importar el número de filas)
+    def rows():
+        for assignment in iterate_in_chunks(queryset.order_by('-assigned_date')):
+            yield [
+                assignment.id,
+                assignment.activo.hostname,
+                assignment.activo.serie,
+                assignment.activo.tipo_activo.name if assignment.activo.tipo_activo else '',
+                assignment.activo.marca.name if assignment.activo.marca else '',
+                assignment.activo.modelo.name if assignment.activo.modelo else '',
+                f"{assignment.employee.first_name} {assignment.employee.last_name}",
+                assignment.employee.employee_number,
+                assignment.assigned_date.isoformat(),
+                assignment.assigned_by.username,
+                assignment.returned_date.isoformat() if assignment.returned_date else '',
+                assignment.returned_by.username if assignment.returned_by else '',
+                'Activa' if assignment.returned_date is None else 'Devuelta'
+            ]
+
+    return streaming_csv_response('reporte_asignaciones.csv', [
         'ID', 'Activo Hostname', 'Activo Serie', 'Tipo Activo', 'Marca', 'Modelo',
         'Empleado', 'Número Empleado', 'Fecha Asignación', 'Asignado Por',
         'Fecha Devolución', 'Devuelto Por', 'Estado'
-    ])
-
-    # Write data
-    for assignment in queryset.order_by('-assigned_date'):
-        writer.writerow([
-            assignment.id,
-            assignment.activo.hostname,
-            assignment.activo.serie,
-            assignment.activo.tipo_activo.name if assignment.activo.tipo_activo else '',
-            assignment.activo.marca.name if assignment.activo.marca else '',
-            assignment.activo.modelo.name if assignment.activo.modelo else '',
-            f"{assignment.employee.first_name} {assignment.employee.last_name}",
-            assignment.employee.employee_number,
-            assignment.assigned_date.isoformat(),
-            assignment.assigned_by.username,
-            assignment.returned_date.isoformat() if assignment.returned_date else '',
-            assignment.returned_by.username if assignment.returned_by else '',
-            'Activa' if assignment.returned_date is None else 'Devuelta'
-        ])
-
-    return response
+    ], rows())
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 15:20
+
+from django.db import migrations, models
+
+from apps.employees.models import normalize_name
+
+BATCH_SIZE = 1000
+
+
+def fill_name_keys(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    employees = []
+    for employee in Employee.objects.only('first_name', 'last_name').iterator(chunk_size=BATCH_SIZE):
+        employee.name_key = normalize_name(employee.first_name, employee.last_name)[:255]
+        employees.append(employee)
+    Employee.objects.bulk_update(employees, ['name_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0002_employee_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, verbose_name='Llave de Nombre'),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:40
+
+from django.db import migrations, models
+
+from apps.employees.models import normalize_name
+
+BATCH_SIZE = 1000
+
+
+def fill_last_name_keys(apps, schema_editor):
+    Employee = apps.get_model('employees', 'Employee')
+    employees = []
+    for employee in Employee.objects.only('last_name').iterator(chunk_size=BATCH_SIZE):
+        employee.last_name_key = normalize_name(employee.last_name)[:100]
+        employees.append(employee)
+    Employee.objects.bulk_update(employees, ['last_name_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_name_key'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='last_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=100, verbose_name='Llave de Apellidos'),
+        ),
+        migrations.RunPython(fill_last_name_keys, migrations.RunPython.noop),
+    ]
@@ -6,9 +6,23 @@ de empleados, incluyendo su jerarquía organizacional, ubicación geográfica
 y documentos asociados.
 """
 
+import re
+import unicodedata
+
 from django.db import models
 from apps.masterdata.models import Region, Finca, Departamento, Area
 
+
+def normalize_name(*parts):
+    """
+    Name key used to match people across tables: accents and casing removed and
+    tokens sorted, so 'José  PÉREZ' and 'Perez Jose' give the same key.
+    """
+    text = unicodedata.normalize('NFKD', ' '.join(part or '' for part in parts))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).casefold()
+    return ' '.join(sorted(re.findall(r'\w+', text)))
+
+
 class Employee(models.Model):
     """
     Modelo que representa a un empleado en la organización.
@@ -20,6 +34,9 @@ class Employee(models.Model):
     employee_number = models.CharField(max_length=50, unique=True, verbose_name="Número de Empleado")
     first_name = models.CharField(max_length=100, verbose_name="Nombres")
     last_name = models.CharField(max_length=100, verbose_name="Apellidos")
+    # Nombre completo y apellidos normalizados (ver normalize_name), usados para vincular usuarios con empleados
+    name_key = models.CharField(max_length=255, blank=True, db_index=True, editable=False, verbose_name="Llave de Nombre")
+    last_name_key = models.CharField(max_length=100, blank=True, db_index=True, editable=False, verbose_name="Llave de Apellidos")
 
     # Jerarquía organizacional
     department = models.ForeignKey(
@@ -88,3 +105,11 @@ class Employee(models.Model):
 
     def __str__(self):
         return f"{self.employee_number} - {self.first_name} {self.last_name}"
+
+    def save(self, *args, **kwargs):
+        self.name_key = normalize_name(self.first_name, self.last_name)[:255]
+        self.last_name_key = normalize_name(self.last_name)[:100]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'name_key', 'last_name_key'}
+        super().save(*args, **kwargs)
@@ -8,6 +8,7 @@ de escritura para enviar IDs de las entidades relacionadas.
 
 from rest_framework import serializers
 from .models import Employee
+from apps.masterdata.serializers import CatalogPrimaryKeyRelatedField
 from apps.masterdata.models import Region, Finca, Departamento, Area
 
 class EmployeeSerializer(serializers.ModelSerializer):
@@ -34,25 +35,25 @@ class EmployeeSerializer(serializers.ModelSerializer):
     supervisor_id = serializers.IntegerField(source='supervisor.id', read_only=True, allow_null=True)
 
     # Campos de escritura para enviar IDs de las relaciones
-    department = serializers.PrimaryKeyRelatedField(
+    department = CatalogPrimaryKeyRelatedField(
         queryset=Departamento.objects.all(),
         write_only=True,
         required=False,
         allow_null=True
     )
-    area = serializers.PrimaryKeyRelatedField(
+    area = CatalogPrimaryKeyRelatedField(
         queryset=Area.objects.all(),
         write_only=True,
         required=False,
         allow_null=True
     )
-    region = serializers.PrimaryKeyRelatedField(
+    region = CatalogPrimaryKeyRelatedField(
         queryset=Region.objects.all(),
         write_only=True,
         required=False,
         allow_null=True
     )
-    finca = serializers.PrimaryKeyRelatedField(
+    finca = CatalogPrimaryKeyRelatedField(
         queryset=Finca.objects.all(),
         write_only=True,
         required=False,
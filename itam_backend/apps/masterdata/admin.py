@@ -1,9 +1,10 @@
 # itam_backend/masterdata/admin.py
 
 from django.contrib import admin
-from .models import Region, Finca, Departamento, Area
+from .models import Region, Finca, Departamento, Area, Feriado
 
 admin.site.register(Region)
 admin.site.register(Finca)
 admin.site.register(Departamento)
-admin.site.register(Area)
\ No newline at end of file
+admin.site.register(Area)
+admin.site.register(Feriado)
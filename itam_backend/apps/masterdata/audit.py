@@ -0,0 +1,324 @@
+"""
+Registro de auditoría con escritura agrupada.
+
+Las vistas registran entradas con record() en lugar de crear cada AuditLog
+por separado. Las entradas se acumulan y se insertan con bulk_create:
+
+- Cada entrada se entrega con transaction.on_commit: dentro de una
+  transacción, al confirmarla; fuera de ella, de inmediato. Si la transacción
+  o un savepoint se revierten, Django descarta sus callbacks y las entradas se
+  pierden igual que los datos.
+- Dentro de buffered() (p. ej. durante una petición HTTP, ver
+  middleware.AuditBufferMiddleware) las entradas entregadas se acumulan y se
+  insertan juntas al salir del bloque; fuera de él cada entrada se inserta
+  al entregarse.
+
+Con AUDIT_LOG_WRITER = 'thread' la inserción la realiza un hilo de fondo con
+una cola acotada (AUDIT_LOG_QUEUE_SIZE). Si la cola está llena por más de
+AUDIT_LOG_QUEUE_TIMEOUT segundos, quien registra escribe directamente
+(contrapresión). Al terminar el proceso la cola se vacía antes de salir.
+
+snapshot() produce los datos old_data/new_data de cada entrada con un plan de
+campos calculado una vez por modelo; los nombres de los catálogos referenciados
+se toman de la caché de catálogos (ver cache.py) en lugar de consultar cada
+relación.
+"""
+
+import atexit
+import datetime
+import decimal
+import logging
+import queue
+import threading
+import uuid
+from contextlib import contextmanager
+from functools import lru_cache, partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, models, transaction
+from django.utils.duration import duration_iso_string
+
+from . import cache as catalog_cache
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+def record(activity_type, user=None, instance=None, description=None, old_data=None, new_data=None):
+    """
+    Queue an audit log entry for `instance` (optional) done by `user`.
+
+    The description defaults to "<ACTIVITY> <Model>: <instance>". Returns the
+    unsaved AuditLog; it gets its primary key once written.
+    """
+    if description is None:
+        description = f"{activity_type} {instance.__class__.__name__}: {instance}"
+
+    entry = AuditLog(
+        activity_type=activity_type,
+        description=description,
+        user=user,
+        content_type=ContentType.objects.get_for_model(instance) if instance is not None else None,
+        object_id=instance.pk if instance is not None else None,
+        old_data=old_data,
+        new_data=new_data
+    )
+    _add(entry)
+    return entry
+
+
+@contextmanager
+def buffered():
+    """Acumula las entradas registradas dentro del bloque y las escribe al salir."""
+    if getattr(_local, 'buffer', None) is not None:
+        # Ya hay un bloque activo más externo: él escribe al final
+        yield
+        return
+
+    _local.buffer = []
+    try:
+        yield
+    finally:
+        entries, _local.buffer = _local.buffer, None
+        _write(entries)
+
+
+def _add(entry):
+    # Un callback por entrada: Django descarta los de un savepoint revertido
+    transaction.on_commit(partial(_deliver, [entry]))
+
+
+def _deliver(entries):
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is not None:
+        buffer.extend(entries)
+    else:
+        _write(entries)
+
+
+def _write(entries):
+    if not entries:
+        return
+    if getattr(settings, 'AUDIT_LOG_WRITER', 'sync') == 'thread':
+        _background_writer().submit(entries)
+    else:
+        AuditLog.objects.bulk_create(entries)
+
+
+class BackgroundWriter:
+    """
+    Hilo que inserta lotes de entradas de auditoría desde una cola acotada.
+
+    submit() espera hasta `timeout` segundos si la cola está llena y, si sigue
+    llena, escribe el lote en el hilo que llama para no perder entradas.
+    """
+
+    _STOP = object()
+
+    def __init__(self, write, maxsize=1000, timeout=1.0):
+        self.write = write
+        self.timeout = timeout
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.thread = threading.Thread(target=self._run, name='audit-log-writer', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def submit(self, entries):
+        try:
+            self.queue.put(entries, timeout=self.timeout)
+        except queue.Full:
+            logger.warning('Cola de auditoría llena; escribiendo %d entradas de forma síncrona', len(entries))
+            self.write(entries)
+
+    def stop(self, timeout=30):
+        """Escribe lo pendiente en la cola y detiene el hilo."""
+        if self.thread.is_alive():
+            self.queue.put(self._STOP)
+            self.thread.join(timeout)
+
+    def _run(self):
+        try:
+            while True:
+                batch = self.queue.get()
+                if batch is self._STOP:
+                    return
+                # Agrupa en una sola inserción los lotes que ya estén en cola
+                stop = False
+                while True:
+                    try:
+                        more = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if more is self._STOP:
+                        stop = True
+                        break
+                    batch = batch + more
+                try:
+                    self.write(batch)
+                except Exception:
+                    logger.exception('No se pudieron escribir %d entradas de auditoría', len(batch))
+                if stop:
+                    return
+        finally:
+            connections.close_all()
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _background_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = BackgroundWriter(
+                AuditLog.objects.bulk_create,
+                maxsize=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 1000),
+                timeout=getattr(settings, 'AUDIT_LOG_QUEUE_TIMEOUT', 1.0),
+            ).start()
+    return _writer
+
+
+# ----------------------------------------------------
+# Snapshots de instancias para old_data / new_data
+# ----------------------------------------------------
+
+# Campos que nunca se registran
+SNAPSHOT_EXCLUDE = {'password'}
+
+# Llaves foráneas que se registran con su nombre en lugar del ID
+FK_DISPLAY = {
+    'region': lambda obj: obj.name,
+    'departamento': lambda obj: obj.name,
+    'marca': lambda obj: obj.name,
+    'tipo_activo': lambda obj: obj.name,
+    'area': lambda obj: obj.name,
+    'finca': lambda obj: obj.name,
+    'modelo': str,
+    'proveedor': lambda obj: obj.nombre_empresa,
+    'employee': str,
+}
+
+
+def snapshot(instance):
+    """
+    JSON-ready dict of the editable fields of `instance`, for audit old/new data.
+
+    Same output as model_to_dict + DjangoJSONEncoder: many-to-many fields and
+    passwords are skipped, and the foreign keys in FK_DISPLAY are replaced by
+    their display name.
+    """
+    data = {}
+    for name, attname, convert, display in _snapshot_plan(type(instance)):
+        value = getattr(instance, attname)
+        if display is not None and value is not None:
+            value = _display_name(instance, name, value, display)
+        elif value is not None:
+            value = convert(value)
+        data[name] = value
+    return data
+
+
+def changed_fields(old_data, new_data):
+    """Return only the fields that changed between old_data and new_data."""
+    if not old_data or not new_data:
+        return old_data or new_data or {}
+
+    changed = {}
+    for key in set(old_data.keys()) | set(new_data.keys()):
+        old_value = old_data.get(key)
+        new_value = new_data.get(key)
+        if old_value != new_value:
+            changed[key] = {
+                'old': old_value,
+                'new': new_value
+            }
+    return changed
+
+
+@lru_cache(maxsize=None)
+def _snapshot_plan(model):
+    """[(name, attname, converter, fk_display)] para los campos que se registran del modelo."""
+    plan = []
+    for field in model._meta.concrete_fields:
+        if not field.editable or field.name in SNAPSHOT_EXCLUDE:
+            continue
+        display = FK_DISPLAY.get(field.name) if field.is_relation else None
+        plan.append((field.name, field.attname, _converter(field), display))
+    return tuple(plan)
+
+
+def _converter(field):
+    """Conversión a tipos JSON con la misma salida que DjangoJSONEncoder."""
+    if isinstance(field, models.DateTimeField):
+        return _datetime
+    if isinstance(field, models.DateField):
+        return lambda value: value.isoformat()
+    if isinstance(field, models.TimeField):
+        return _time
+    if isinstance(field, models.DurationField):
+        return duration_iso_string
+    if isinstance(field, models.FileField):
+        return lambda value: value.name or None
+    if isinstance(field, (models.DecimalField, models.UUIDField, models.GenericIPAddressField)):
+        return str
+    if isinstance(field, models.JSONField):
+        return _json_value
+    return _identity
+
+
+def _identity(value):
+    return value
+
+
+def _datetime(value):
+    result = value.isoformat()
+    if value.microsecond:
+        result = result[:23] + result[26:]
+    if result.endswith('+00:00'):
+        result = result.removesuffix('+00:00') + 'Z'
+    return result
+
+
+def _time(value):
+    result = value.isoformat()
+    if value.microsecond:
+        result = result[:12]
+    return result
+
+
+def _json_value(value):
+    """Valores de JSONField: solo se recorren si contienen tipos que JSON no admite."""
+    if isinstance(value, dict):
+        return {key: _json_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_value(item) for item in value]
+    if isinstance(value, datetime.datetime):
+        return _datetime(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    return value
+
+
+def _display_name(instance, name, pk, display):
+    """Display name of a FK: cached related object, catalog cache, or (last resort) a query."""
+    field = instance._meta.get_field(name)
+    if field.is_cached(instance):
+        related = field.get_cached_value(instance)
+        return display(related) if related is not None else pk
+
+    if catalog_cache.is_catalog(field.related_model):
+        related = catalog_cache.objects(field.related_model).get(pk)
+        if related is not None:
+            return display(related)
+
+    related = getattr(instance, name)
+    return display(related) if related is not None else pk
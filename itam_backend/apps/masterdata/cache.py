@@ -0,0 +1,182 @@
+"""
+Caché en memoria de los catálogos de datos maestros.
+
+Regiones, fincas, departamentos, áreas, tipos, marcas, modelos, proveedores y feriados
+son tablas pequeñas que cambian poco pero se leen en casi todas las peticiones
+(listas desplegables, validación de llaves foráneas en los serializadores,
+nombres en los snapshots de auditoría). Cada proceso guarda una copia completa
+de cada catálogo junto con su número de versión.
+
+El número de versión vive en la caché compartida de Django (settings.CACHES),
+visible para todos los workers. Al escribir un catálogo se llama a bump(): la
+copia local del proceso se descarta de inmediato y la versión compartida se
+incrementa al confirmar la transacción, de modo que los demás workers recargan
+el catálogo en su siguiente lectura. Mientras el hilo tenga cambios sin
+confirmar en un catálogo, sus lecturas van a la base de datos y no se guardan:
+así una escritura revertida (también en un savepoint) nunca queda en caché.
+
+stats() devuelve los aciertos y fallos por catálogo de este proceso.
+"""
+
+import copy
+import threading
+import time
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo, Proveedor, Feriado
+
+# Catálogos en caché (modelo -> select_related usado al cargarlo)
+CATALOGS = {
+    Region: (), Finca: (), Departamento: (), Area: ('departamento',), TipoActivo: (), Marca: (), Proveedor: (),
+    ModeloActivo: ('marca', 'tipo_activo'), Feriado: (),
+}
+
+_local = threading.local()
+_lock = threading.Lock()
+_copies = {}  # modelo -> (versión, {pk: instancia})
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+
+
+def is_catalog(model):
+    return model in CATALOGS
+
+
+def objects(model):
+    """
+    {pk: instance} of every row of a catalog, in the model's default ordering.
+
+    The instances are shared by every caller in the process and must not be
+    modified; use get() for a private copy.
+    """
+    if model in _uncommitted():
+        # Cambios sin confirmar de este hilo: pueden revertirse, no se guardan
+        with _lock:
+            _stats[model]['misses'] += 1
+        return _load(model)
+
+    version = _shared_version(model)
+    with _lock:
+        cached = _copies.get(model)
+        if cached is not None and cached[0] == version:
+            _stats[model]['hits'] += 1
+            return cached[1]
+        _stats[model]['misses'] += 1
+
+    rows = _load(model)
+    with _lock:
+        _copies[model] = (version, rows)
+    return rows
+
+
+def get(model, pk):
+    """Copy of the catalog instance with primary key `pk`, or None."""
+    obj = objects(model).get(pk)
+    return copy.copy(obj) if obj is not None else None
+
+
+def bump(model):
+    """
+    Mark a catalog as changed: the local copy is dropped now and the shared
+    version is incremented when the current transaction commits (once per
+    transaction, however many rows were written).
+    """
+    if not is_catalog(model):
+        return
+    with _lock:
+        _copies.pop(model, None)
+    _uncommitted().add(model)
+    _pending().add(model)
+
+    def increment():
+        # Todos los callbacks de la transacción corren al confirmar; solo el primero incrementa
+        getattr(_local, 'uncommitted', set()).discard(model)
+        if model not in _pending():
+            return
+        _pending().discard(model)
+        with _lock:
+            _copies.pop(model, None)
+        version_key = _version_key(model)
+        try:
+            cache.incr(version_key)
+        except ValueError:
+            # La llave no existe (caché vacía o expirada)
+            cache.add(version_key, _initial_version(), timeout=None) or cache.incr(version_key)
+
+    # Django descarta los callbacks de un savepoint revertido y ejecuta de inmediato los
+    # registrados fuera de una transacción
+    transaction.on_commit(increment, robust=True)
+
+
+def versions(models=None):
+    """{model: shared version} of the given catalogs (all by default), in one cache round trip."""
+    keys = {_version_key(model): model for model in (models or CATALOGS)}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_version(), timeout=None)
+        found.update(cache.get_many(missing))
+    return {model: found.get(key, 0) for key, model in keys.items()}
+
+
+def stats():
+    """Hit/miss counters and version of each catalog for this process."""
+    with _lock:
+        local = {model: (cached[0], len(cached[1])) for model, cached in _copies.items()}
+        counters = {model: dict(_stats[model]) for model in CATALOGS}
+
+    catalogs = {}
+    for model in CATALOGS:
+        version, size = local.get(model, (None, None))
+        catalogs[model._meta.label] = {**counters[model], 'version': version, 'size': size}
+    return {
+        'hits': sum(item['hits'] for item in catalogs.values()),
+        'misses': sum(item['misses'] for item in catalogs.values()),
+        'catalogs': catalogs,
+    }
+
+
+def clear():
+    """Drop every local copy and reset the counters (the shared versions are kept)."""
+    with _lock:
+        _copies.clear()
+        _stats.clear()
+
+
+def _load(model):
+    return {obj.pk: obj for obj in model.objects.select_related(*CATALOGS[model])}
+
+
+def _pending():
+    """Catálogos de este hilo cuyo incremento de versión está programado."""
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        pending = _local.pending = set()
+    return pending
+
+
+def _uncommitted():
+    """Catálogos con cambios sin confirmar en este hilo."""
+    uncommitted = getattr(_local, 'uncommitted', None)
+    if uncommitted is None:
+        uncommitted = _local.uncommitted = set()
+    elif uncommitted and transaction.get_autocommit():
+        # Ya no hay transacción abierta: lo que queda es de una transacción revertida
+        uncommitted.clear()
+    return uncommitted
+
+
+def _version_key(model):
+    return f'masterdata:catalog:{model._meta.label_lower}:version'
+
+
+def _shared_version(model):
+    return versions([model])[model]
+
+
+def _initial_version():
+    # Si la caché compartida se vacía, las versiones no vuelven a empezar en un valor ya usado
+    return time.time_ns()
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.4 on 2026-10-17 14:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterdata', '0016_auditlog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('nombre', models.CharField(max_length=100, verbose_name='Nombre del Feriado')),
+                ('region', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='feriados', to='masterdata.region', verbose_name='Región')),
+            ],
+            options={
+                'verbose_name': 'Feriado',
+                'verbose_name_plural': 'Feriados',
+                'ordering': ['fecha'],
+                'constraints': [models.UniqueConstraint(fields=('fecha', 'region'), name='unique_feriado_region')],
+            },
+        ),
+    ]
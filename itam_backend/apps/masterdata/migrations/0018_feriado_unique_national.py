@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-17 19:10
+
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.functions.comparison
+
+
+def check_duplicate_national_feriados(apps, schema_editor):
+    """El índice no se puede crear si ya hay feriados nacionales repetidos en una fecha."""
+    Feriado = apps.get_model('masterdata', 'Feriado')
+    duplicated = list(
+        Feriado.objects.filter(region__isnull=True).order_by()
+        .values('fecha').annotate(total=Count('id')).filter(total__gt=1)
+        .values_list('fecha', flat=True)[:20]
+    )
+    if duplicated:
+        raise RuntimeError(
+            'Hay feriados nacionales repetidos (fechas: %s). Elimine los sobrantes antes de '
+            'aplicar esta migración.' % ', '.join(fecha.isoformat() for fecha in duplicated)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('masterdata', '0017_feriado'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_national_feriados, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='feriado',
+            name='unique_feriado_region',
+        ),
+        migrations.AddConstraint(
+            model_name='feriado',
+            constraint=models.UniqueConstraint(
+                models.F('fecha'), django.db.models.functions.comparison.Coalesce('region', 0),
+                name='unique_feriado_region',
+                violation_error_message='Ya existe un feriado en esta fecha para esta región.'
+            ),
+        ),
+    ]
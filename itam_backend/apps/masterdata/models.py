@@ -3,10 +3,11 @@ Modelos de datos maestros para el sistema ITAM.
 
 Este archivo contiene todas las entidades de catálogo que sirven como
 base para el resto del sistema: regiones, fincas, departamentos, áreas,
-tipos de activos, marcas, modelos, proveedores y auditoría.
+tipos de activos, marcas, modelos, proveedores, feriados y auditoría.
 """
 
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 from django.forms.models import model_to_dict
@@ -260,6 +261,51 @@ class Proveedor(models.Model):
         return self.nombre_empresa
 
 
+class Feriado(models.Model):
+    """
+    Modelo que representa un día feriado del calendario laboral.
+
+    Un feriado sin región aplica a todas las regiones (feriado nacional); con
+    región solo aplica a los activos de esa región. La programación de
+    mantenimientos (ver assets.scheduling) no cuenta estos días como hábiles.
+    """
+    fecha = models.DateField(verbose_name="Fecha")
+    nombre = models.CharField(max_length=100, verbose_name="Nombre del Feriado")
+    region = models.ForeignKey(
+        Region,
+        on_delete=models.CASCADE,
+        null=True,                  # Sin región: feriado nacional
+        blank=True,
+        related_name='feriados',
+        verbose_name="Región"
+    )
+
+    class Meta:
+        verbose_name = "Feriado"
+        verbose_name_plural = "Feriados"
+        ordering = ['fecha']
+        constraints = [
+            # Un feriado por fecha y región. Índice funcional: con region NULL (feriado nacional)
+            # una restricción sobre (fecha, region) no detecta repetidos, porque los NULL no chocan
+            # entre sí en un índice único; Coalesce los lleva a 0, que no es un id de región.
+            models.UniqueConstraint(
+                models.F('fecha'), Coalesce('region', 0),
+                name='unique_feriado_region',
+                violation_error_message='Ya existe un feriado en esta fecha para esta región.',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.nombre}"
+
+    UNIQUE_CONSTRAINT = 'unique_feriado_region'
+
+    @classmethod
+    def is_duplicate_conflict(cls, error):
+        """True if an IntegrityError comes from the one-feriado-per-fecha-and-region constraint."""
+        return cls.UNIQUE_CONSTRAINT in str(error)
+
+
 
 class AuditLog(models.Model):
     """
@@ -300,6 +346,11 @@ class AuditLog(models.Model):
         verbose_name = "Audit Log"
         verbose_name_plural = "Audit Logs"
         ordering = ['-timestamp']
+        indexes = [
+            # Historial de un objeto (p. ej. la entrada CREATE de cada activo)
+            models.Index(fields=['content_type', 'object_id', 'activity_type'], name='auditlog_object_idx'),
+            models.Index(fields=['timestamp'], name='auditlog_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.activity_type} by {self.user} at {self.timestamp}"
\ No newline at end of file
@@ -0,0 +1,283 @@
+"""
+Paginación por llave (keyset) para los listados grandes del sistema ITAM.
+
+La paginación por número de página ejecuta un COUNT(*) completo y un OFFSET
+que recorre todas las filas anteriores, lo que se vuelve lento en páginas
+profundas de tablas que crecen sin límite (p. ej. AuditLog). Con ?cursor= la
+página siguiente se pide como "filas después de la última fila vista" según
+el ordenamiento del listado (incluido el de OrderingFilter), con desempate por
+id, de modo que el costo de cada página no depende de su profundidad.
+
+Sin ?cursor= los listados se comportan exactamente como antes (?page=).
+"""
+
+import base64
+import binascii
+import datetime
+import decimal
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_ordering(queryset):
+    """
+    Return the queryset ordering as [(field, descending), ...] with the primary
+    key appended as tiebreaker, so that every row has a unique position.
+    """
+    ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+    fields = []
+    for field in ordering:
+        if not isinstance(field, str):
+            raise ValueError('La paginación por llave solo admite ordenamientos por nombre de campo')
+        name = field.lstrip('-')
+        fields.append(('pk' if name in ('pk', queryset.model._meta.pk.name) else name, field.startswith('-')))
+
+    if not any(name == 'pk' for name, _ in fields):
+        fields.append(('pk', fields[-1][1] if fields else False))
+    return fields
+
+
+def nullable_fields(model, ordering):
+    """
+    Ordering fields that may hold NULL: nullable columns, columns reached
+    through a nullable relation, and annotations (unknown, assumed nullable).
+    """
+    nullable = set()
+    for name, _ in ordering:
+        if name == 'pk':
+            continue
+        current = model
+        for part in name.split('__'):
+            try:
+                field = current._meta.get_field(part)
+            except (FieldDoesNotExist, AttributeError):
+                nullable.add(name)
+                break
+            if field.null:
+                nullable.add(name)
+                break
+            current = field.related_model
+    return nullable
+
+
+def keyset_order_by(ordering, nullable=()):
+    """order_by() arguments; NULLs sort first ascending and last descending on every database."""
+    expressions = []
+    for field, descending in ordering:
+        if field not in nullable:
+            expressions.append(f"{'-' if descending else ''}{field}")
+        elif descending:
+            expressions.append(F(field).desc(nulls_last=True))
+        else:
+            expressions.append(F(field).asc(nulls_first=True))
+    return expressions
+
+
+def keyset_filter(ordering, values, nullable=()):
+    """Q matching the rows that come after `values` in `ordering` (see keyset_order_by)."""
+    condition = None
+    for (field, descending), value in reversed(list(zip(ordering, values))):
+        if field not in nullable:
+            after = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+            same = Q(**{field: value})
+        elif value is None:
+            # NULL va al inicio en orden ascendente y al final en descendente
+            after = Q() if descending else Q(**{f'{field}__isnull': False})
+            same = Q(**{f'{field}__isnull': True})
+        else:
+            after = Q(**{f"{field}__{'lt' if descending else 'gt'}": value})
+            if descending:
+                after |= Q(**{f'{field}__isnull': True})
+            same = Q(**{field: value})
+
+        if condition is None:
+            condition = after if after else Q(pk__in=[])
+        elif after:
+            condition = after | (same & condition)
+        else:
+            condition = same & condition
+    return condition
+
+
+def keyset_values(obj, ordering):
+    """Values of the ordering fields for a model instance (follows '__' lookups)."""
+    values = []
+    for field, _ in ordering:
+        value = obj
+        for part in field.split('__'):
+            value = getattr(value, part) if value is not None else None
+        values.append(value)
+    return values
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'d': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        return {'dec': str(value)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return datetime.date.fromisoformat(value['d'])
+        if 'dec' in value:
+            return decimal.Decimal(value['dec'])
+    return value
+
+
+class KeysetPagination(PageNumberPagination):
+    """
+    Paginación por número de página con un modo opcional por llave (?cursor=).
+
+    - ?cursor= (vacío) pide la primera página; las respuestas traen en next y
+      previous las URLs con el cursor siguiente/anterior.
+    - ?count=exact|estimate|skip controla el total en modo cursor. 'estimate'
+      (por defecto) usa las estadísticas de la tabla cuando no hay filtros y,
+      con filtros, un conteo limitado a count_estimate_cap filas.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    default_count_mode = 'estimate'
+    count_estimate_cap = 10000
+    invalid_cursor_message = 'Cursor inválido.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = self.cursor_query_param in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        rows = self.paginate_keyset(queryset, request, self.get_page_size(request))
+        self.count, self.count_type = self.get_count(queryset, request)
+        return rows
+
+    def paginate_keyset(self, queryset, request, page_size, offset=0):
+        """
+        One page of `queryset` after the ?cursor= position (or from the start),
+        setting next_cursor and previous_cursor. Without a cursor the page may
+        start at `offset`, so that a page reached by number still gives cursors.
+        """
+        ordering = keyset_ordering(queryset)
+        nullable = nullable_fields(queryset.model, ordering)
+        reversed_ordering = [(field, not descending) for field, descending in ordering]
+
+        position, backwards = self.decode_cursor(request, ordering)
+        walk = reversed_ordering if backwards else ordering
+        rows = queryset.order_by(*keyset_order_by(walk, nullable))
+        if position is not None:
+            rows = list(rows.filter(keyset_filter(walk, position, nullable))[:page_size + 1])
+        else:
+            rows = list(rows[offset:offset + page_size + 1])
+
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if backwards:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = position is not None or offset > 0, has_more
+
+        self.next_cursor = self.encode_cursor(ordering, keyset_values(rows[-1], ordering), False) if rows and has_next else None
+        self.previous_cursor = self.encode_cursor(ordering, keyset_values(rows[0], ordering), True) if rows and has_previous else None
+        return rows
+
+    def get_paginated_response(self, data):
+        if not getattr(self, 'cursor_mode', False):
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('count_type', self.count_type),
+            ('next', self.get_cursor_link(self.next_cursor)),
+            ('previous', self.get_cursor_link(self.previous_cursor)),
+            ('results', data),
+        ]))
+
+    def get_next_link(self):
+        if getattr(self, 'cursor_mode', False):
+            return self.get_cursor_link(self.next_cursor)
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if getattr(self, 'cursor_mode', False):
+            return self.get_cursor_link(self.previous_cursor)
+        return super().get_previous_link()
+
+    def get_cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def encode_cursor(self, ordering, values, backwards):
+        payload = {
+            'o': [f"{'-' if descending else ''}{field}" for field, descending in ordering],
+            'v': [_encode_value(value) for value in values],
+            'b': backwards,
+        }
+        return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+
+    def decode_cursor(self, request, ordering):
+        """(values, backwards) of the cursor; (None, False) for the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            expected = [f"{'-' if descending else ''}{field}" for field, descending in ordering]
+            if payload['o'] != expected or len(payload['v']) != len(ordering):
+                raise ValueError('El cursor no corresponde al ordenamiento actual')
+            return [_decode_value(value) for value in payload['v']], bool(payload['b'])
+        except (TypeError, ValueError, KeyError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_count(self, queryset, request):
+        """(count, count_type) según ?count=: exact, estimate o skip."""
+        mode = request.query_params.get(self.count_query_param, self.default_count_mode)
+        if mode == 'skip':
+            return None, None
+        if mode == 'exact':
+            return queryset.count(), 'exact'
+
+        if not queryset.query.where:
+            estimate = self.table_estimate(queryset)
+            if estimate is not None:
+                return estimate, 'estimate'
+        capped = queryset.order_by()[:self.count_estimate_cap].count()
+        return capped, 'exact' if capped < self.count_estimate_cap else 'estimate'
+
+    def table_estimate(self, queryset):
+        """Filas de la tabla según las estadísticas del motor (None si no están disponibles)."""
+        connection = connections[queryset.db]
+        table = queryset.model._meta.db_table
+        if connection.vendor == 'mysql':
+            sql = 'SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s'
+        elif connection.vendor == 'postgresql':
+            sql = 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s'
+        else:
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+        return max(int(row[0]), 0) if row and row[0] is not None else None
+
+
+class StandardKeysetPagination(KeysetPagination):
+    """Misma configuración que StandardResultsSetPagination, con modo ?cursor= disponible."""
+    page_size = 5  # Default page size
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,64 @@
+"""
+Utilidades compartidas para los reportes CSV del sistema ITAM.
+
+Los reportes se envían con StreamingHttpResponse y recorren el queryset por
+bloques usando paginación por llave (keyset): cada bloque es una consulta
+WHERE (orden) > (última fila) ... LIMIT n. Así la memoria del worker queda
+acotada al tamaño del bloque sin importar cuántas filas tenga el reporte,
+también en MySQL, donde .iterator() no usa cursores del lado del servidor.
+"""
+
+import csv
+
+from django.http import StreamingHttpResponse
+
+from .pagination import keyset_filter, keyset_order_by, keyset_ordering, keyset_values, nullable_fields
+
+# Filas leídas de la base de datos por consulta
+CSV_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """Pseudo-buffer para csv.writer: devuelve cada línea en lugar de guardarla."""
+
+    def write(self, value):
+        return value
+
+
+def iterate_in_chunks(queryset, chunk_size=CSV_CHUNK_SIZE):
+    """
+    Iterate a queryset in keyset-paginated chunks of `chunk_size` rows.
+
+    Nullable ordering fields sort NULLs first ascending and last descending;
+    select_related() is kept for every chunk.
+    """
+    ordering = keyset_ordering(queryset)
+    nullable = nullable_fields(queryset.model, ordering)
+    queryset = queryset.order_by(*keyset_order_by(ordering, nullable))
+
+    chunk = list(queryset[:chunk_size])
+    while chunk:
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        after = keyset_filter(ordering, keyset_values(chunk[-1], ordering), nullable)
+        chunk = list(queryset.filter(after)[:chunk_size])
+
+
+def streaming_csv_response(filename, header, rows):
+    """
+    CSV download streamed row by row, with UTF-8 BOM for Excel compatibility.
+
+    `rows` is any iterable of lists; it is consumed lazily while the response
+    is sent.
+    """
+    writer = csv.writer(Echo())
+
+    def stream():
+        yield '\ufeff' + writer.writerow(header)
+        for row in rows:
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(stream(), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -7,10 +7,41 @@ campos calculados para mostrar nombres de relaciones y campos de escritura
 para enviar IDs durante operaciones CRUD.
 """
 
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo, Proveedor, AuditLog
+from . import cache as catalog_cache
+from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo, Proveedor, Feriado, AuditLog
 from rest_framework.validators import UniqueTogetherValidator
 
+
+class CatalogPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField que valida el ID contra la caché de catálogos en lugar
+    de hacer una consulta por campo. Con un queryset filtrado o que no sea de un
+    catálogo se comporta igual que PrimaryKeyRelatedField.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        if not catalog_cache.is_catalog(queryset.model) or queryset.query.where:
+            return super().to_internal_value(data)
+
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            pk = queryset.model._meta.pk.get_prep_value(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        obj = catalog_cache.get(queryset.model, pk)
+        if obj is None:
+            self.fail('does_not_exist', pk_value=data)
+        return obj
+
+
 class RegionSerializer(serializers.ModelSerializer):
     class Meta:
         model = Region
@@ -29,7 +60,7 @@ class FincaSerializer(serializers.ModelSerializer):
 
 class FincaCreateUpdateSerializer(serializers.ModelSerializer):
     # Usamos PrimaryKeyRelatedField para poder enviar el ID de la región al crear/actualizar una finca
-    region = serializers.PrimaryKeyRelatedField(
+    region = CatalogPrimaryKeyRelatedField(
         queryset=Region.objects.all(), # Asegúrate de que el queryset esté disponible
         allow_null=True,               # Permite asignar NULL si la finca no tiene región
         required=False                 # El campo no es estrictamente requerido en el payload
@@ -49,7 +80,7 @@ class AreaSerializer(serializers.ModelSerializer):
     departamento_name = serializers.CharField(source='departamento.name', read_only=True)
     
     # Para escritura: Aceptar el ID del departamento
-    departamento = serializers.PrimaryKeyRelatedField(
+    departamento = CatalogPrimaryKeyRelatedField(
         queryset=Departamento.objects.all(), # Permite seleccionar cualquier Departamento existente
         write_only=True,                     # Solo se usa para escribir (enviar el ID)
         required=True                        # Es un campo obligatorio
@@ -79,12 +110,12 @@ class ModeloActivoSerializer(serializers.ModelSerializer):
     asset_type_category = serializers.SerializerMethodField()
 
     # Campos de escritura para recibir los IDs de las claves foráneas
-    marca = serializers.PrimaryKeyRelatedField(
+    marca = CatalogPrimaryKeyRelatedField(
         queryset=Marca.objects.all(),
         write_only=True,
         required=True
     )
-    tipo_activo = serializers.PrimaryKeyRelatedField(
+    tipo_activo = CatalogPrimaryKeyRelatedField(
         queryset=TipoActivo.objects.all(),
         allow_null=True,
         required=False,
@@ -122,6 +153,38 @@ class ProveedorSerializer(serializers.ModelSerializer):
         model = Proveedor
         fields = '__all__'
 
+class FeriadoSerializer(serializers.ModelSerializer):
+    region_name = serializers.CharField(source='region.name', read_only=True, default=None)
+    # Sin región: feriado nacional
+    region = CatalogPrimaryKeyRelatedField(queryset=Region.objects.all(), allow_null=True, default=None)
+
+    class Meta:
+        model = Feriado
+        fields = ['id', 'fecha', 'nombre', 'region', 'region_name']
+
+    # Que no se repita la fecha en la misma región (o como feriado nacional) lo garantiza la
+    # base de datos (Feriado.UNIQUE_CONSTRAINT); ver create() y update()
+    def create(self, validated_data):
+        with self._duplicate_as_error(validated_data.get('region')):
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with self._duplicate_as_error(validated_data.get('region', instance.region)):
+            return super().update(instance, validated_data)
+
+    @contextmanager
+    def _duplicate_as_error(self, region):
+        """Translate a violation of the one-feriado-per-fecha-and-region constraint into a validation error."""
+        try:
+            with transaction.atomic():
+                yield
+        except IntegrityError as error:
+            if not Feriado.is_duplicate_conflict(error):
+                raise
+            message = 'Ya existe un feriado nacional en esta fecha.' if region is None else \
+                f"Ya existe un feriado en esta fecha para la región '{region.name}'."
+            raise serializers.ValidationError({'fecha': [message]})
+
 class AuditLogSerializer(serializers.ModelSerializer):
     user_username = serializers.CharField(source='user.username', read_only=True)
     record_model = serializers.CharField(source='content_type.model', read_only=True)
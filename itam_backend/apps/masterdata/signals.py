@@ -3,7 +3,9 @@ from django.dispatch import receiver
 from django.contrib.auth.signals import user_logged_in
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth import get_user_model
-from .models import AuditLog, Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo
+from . import audit
+from . import cache as catalog_cache
+from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo
 # from ..threadlocals import get_current_user  # Commented out as not used
 
 User = get_user_model()
@@ -57,8 +59,17 @@ MODELS_TO_LOG = [Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloAct
 @receiver(user_logged_in)
 def log_login(sender, request, user, **kwargs):
     description = f"User {user.username} logged in"
-    AuditLog.objects.create(
-        activity_type='LOGIN',
-        description=description,
-        user=user
-    )
\ No newline at end of file
+    audit.record('LOGIN', user=user, description=description)
+
+
+def bump_catalog_version(sender, **kwargs):
+    """
+    Cualquier escritura de un catálogo (API, admin, comandos) invalida su caché.
+    Dentro de una transacción se cuenta una sola vez junto con la de AuditLogMixin.
+    """
+    catalog_cache.bump(sender)
+
+
+for catalog_model in catalog_cache.CATALOGS:
+    post_save.connect(bump_catalog_version, sender=catalog_model, dispatch_uid=f'catalog_cache_save_{catalog_model.__name__}')
+    post_delete.connect(bump_catalog_version, sender=catalog_model, dispatch_uid=f'catalog_cache_delete_{catalog_model.__name__}')
@@ -1,3 +1,380 @@
+import csv
+import io
+import os
+import tracemalloc
+import unittest
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import audit
+from . import cache as catalog_cache
+from .models import AuditLog, Feriado, Finca, Region
+from .reports import iterate_in_chunks
+from .serializers import FincaCreateUpdateSerializer
+
+User = get_user_model()
+
+
+class AuditLogReportTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _create_logs(self, count, timestamp=None):
+        logs = AuditLog.objects.bulk_create(
+            AuditLog(activity_type='UPDATE', description=f'Cambio {i}', user=self.user, new_data={'i': i})
+            for i in range(count)
+        )
+        if timestamp:
+            AuditLog.objects.update(timestamp=timestamp)
+        return logs
+
+    def _download(self):
+        response = self.client.get(reverse('audit_logs_report_csv'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        content = b''.join(response.streaming_content).decode('utf-8')
+        return list(csv.reader(io.StringIO(content.lstrip('\ufeff'))))
+
+    def test_csv_is_streamed_with_header_and_rows(self):
+        self._create_logs(3)
+        rows = self._download()
+        self.assertEqual(rows[0][:3], ['ID', 'Fecha/Hora', 'Tipo Actividad'])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(rows[1][8], '{"i": 2}')
+
+    def test_chunks_cover_every_row_once_with_equal_sort_keys(self):
+        # Mismo timestamp en todas las filas: el desempate por pk evita duplicados y omisiones
+        self._create_logs(10, timestamp=timezone.now())
+        queryset = AuditLog.objects.order_by('-timestamp')
+
+        with self.assertNumQueries(4):
+            ids = [log.id for log in iterate_in_chunks(queryset, chunk_size=3)]
+
+        self.assertEqual(ids, sorted(AuditLog.objects.values_list('id', flat=True), reverse=True))
+
+
+class AuditWriterTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+
+    def test_transaction_entries_are_written_on_commit_in_one_insert(self):
+        region = Region.objects.create(name='Norte')
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for i in range(5):
+                    audit.record('UPDATE', user=self.user, instance=region, new_data={'i': i})
+            self.assertFalse(AuditLog.objects.exists())
+
+        # Entregadas al confirmar; buffered() (como en cada petición) las inserta juntas
+        with self.assertNumQueries(1), audit.buffered():
+            for callback in callbacks:
+                callback()
+        self.assertEqual(AuditLog.objects.filter(object_id=region.pk, activity_type='UPDATE').count(), 5)
+
+    def test_rolled_back_savepoint_discards_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                audit.record('LOGIN', user=self.user, description='antes')
+                try:
+                    with transaction.atomic():
+                        audit.record('LOGIN', user=self.user, description='revertida')
+                        raise ValueError
+                except ValueError:
+                    pass
+                audit.record('LOGIN', user=self.user, description='después')
+
+        self.assertEqual(sorted(AuditLog.objects.values_list('description', flat=True)), ['antes', 'después'])
+
+    def test_view_writes_are_audited(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(reverse('region-list'), {'name': 'Sur'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        entry = AuditLog.objects.get(activity_type='CREATE')
+        self.assertEqual((entry.object_id, entry.user), (response.data['id'], self.user))
+
+    def test_background_writer_applies_backpressure_and_drains_on_stop(self):
+        written = []
+        writer = audit.BackgroundWriter(written.append, maxsize=1, timeout=0.01)
+        writer.submit(['a'])
+        with self.assertLogs('apps.masterdata.audit', 'WARNING'):
+            writer.submit(['b'])  # cola llena: se escribe en el hilo que llama
+        self.assertEqual(written, [['b']])
+
+        writer.start()
+        writer.submit(['c'])
+        writer.stop()
+        self.assertEqual(sorted(item for batch in written for item in batch), ['a', 'b', 'c'])
+
+
+class KeysetPaginationTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        # Mismo timestamp en todas las filas: el orden depende del desempate por id
+        AuditLog.objects.bulk_create(
+            AuditLog(activity_type='UPDATE', description=f'Cambio {i}', user=self.user, object_id=i if i % 3 else None)
+            for i in range(7)
+        )
+        AuditLog.objects.update(timestamp=timezone.now())
+        self.expected = list(AuditLog.objects.order_by('-timestamp', '-id').values_list('id', flat=True))
+
+    def _get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_cursor_pages_cover_every_row_once_in_both_directions(self):
+        data = self._get(reverse('auditlog-list'), cursor='', page_size=3)
+        self.assertIsNone(data['previous'])
+        forward = [[row['id'] for row in data['results']]]
+        while data['next']:
+            data = self._get(data['next'])
+            forward.append([row['id'] for row in data['results']])
+        self.assertEqual(sum(forward, []), self.expected)
+
+        backward = [[row['id'] for row in data['results']]]
+        while data['previous']:
+            data = self._get(data['previous'])
+            backward.insert(0, [row['id'] for row in data['results']])
+        self.assertEqual(backward, forward)
+
+    def test_cursor_follows_ordering_and_skips_count(self):
+        url = reverse('auditlog-list')
+        with self.assertNumQueries(1):
+            data = self._get(url, cursor='', page_size=10, ordering='id', count='skip')
+        self.assertEqual([row['id'] for row in data['results']], sorted(self.expected))
+        self.assertIsNone(data['count'])
+
+    def test_count_modes(self):
+        url = reverse('auditlog-list')
+        self.assertEqual(self._get(url, cursor='', count='exact')['count'], 7)
+        data = self._get(url, cursor='', activity_type='UPDATE')
+        self.assertEqual((data['count'], data['count_type']), (7, 'exact'))
+
+    def test_invalid_or_foreign_cursor_is_rejected(self):
+        url = reverse('auditlog-list')
+        next_link = self._get(url, cursor='', page_size=2)['next']
+        self.assertEqual(self.client.get(url, {'cursor': 'no-es-un-cursor'}).status_code, 404)
+        # Un cursor generado con otro ordenamiento no es válido
+        self.assertEqual(self.client.get(next_link + '&ordering=id').status_code, 404)
+
+    def test_page_number_mode_is_unchanged(self):
+        data = self._get(reverse('auditlog-list'), page=2, page_size=3)
+        self.assertEqual(data['count'], 7)
+        self.assertNotIn('count_type', data)
+        self.assertEqual(len(data['results']), 3)
+
+    def test_chunks_handle_null_sort_keys(self):
+        # NULL va primero en orden ascendente y al final en descendente
+        keys = sorted(k for k in AuditLog.objects.values_list('object_id', flat=True) if k is not None)
+        for ordering, expected in (('object_id', [None, None, None] + keys), ('-object_id', keys[::-1] + [None, None, None])):
+            logs = list(iterate_in_chunks(AuditLog.objects.order_by(ordering), chunk_size=2))
+            self.assertEqual(len({log.id for log in logs}), 7)
+            self.assertEqual([log.object_id for log in logs], expected)
+
+
+class CatalogCacheTests(TestCase):
+
+    def setUp(self):
+        catalog_cache.clear()
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.region = Region.objects.create(name='Norte')
+
+    def test_reads_are_served_from_the_local_copy(self):
+        self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Norte')
+        with self.assertNumQueries(0):
+            self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Norte')
+            self.assertIsNone(catalog_cache.get(Region, 0))
+        stats = catalog_cache.stats()['catalogs']['masterdata.Region']
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (2, 1, 1))
+
+    def test_committed_write_bumps_the_shared_version_once(self):
+        version = catalog_cache.versions([Region])[Region]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('region-detail', args=[self.region.pk]), {'name': 'Sur'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        # El signal post_save y AuditLogMixin cuentan como un solo cambio
+        self.assertEqual(catalog_cache.versions([Region])[Region], version + 1)
+        self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Sur')
+
+    def test_other_workers_reload_after_a_version_change(self):
+        catalog_cache.objects(Region)
+        Region.objects.filter(pk=self.region.pk).update(name='Oriente')  # sin signals: como otro proceso
+        self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Norte')
+
+        cache.incr('masterdata:catalog:masterdata.region:version')
+        self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Oriente')
+
+    def test_rolled_back_write_does_not_stay_cached(self):
+        try:
+            with transaction.atomic():
+                Region.objects.filter(pk=self.region.pk).update(name='Revertida')
+                catalog_cache.bump(Region)
+                self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Revertida')
+                raise ValueError
+        except ValueError:
+            pass
+        self.assertEqual(catalog_cache.get(Region, self.region.pk).name, 'Norte')
+
+    def test_rolled_back_savepoint_does_not_bump_the_version(self):
+        version = catalog_cache.versions([Region])[Region]
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                try:
+                    with transaction.atomic():
+                        Region.objects.create(name='Revertida')
+                        raise ValueError
+                except ValueError:
+                    pass
+                self.assertEqual([region.name for region in catalog_cache.objects(Region).values()], ['Norte'])
+        self.assertEqual(catalog_cache.versions([Region])[Region], version)
+
+    def test_related_field_validates_against_the_cache(self):
+        catalog_cache.objects(Region)
+        with self.assertNumQueries(0):
+            serializer = FincaCreateUpdateSerializer(data={'name': 'Finca', 'region': self.region.pk})
+            serializer.fields['region'].run_validation(self.region.pk)
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data['region'], self.region)
+
+        for value, code in ((999, 'does_not_exist'), ('abc', 'incorrect_type'), (True, 'incorrect_type')):
+            serializer = FincaCreateUpdateSerializer(data={'name': 'Finca', 'region': value})
+            self.assertFalse(serializer.is_valid())
+            self.assertEqual(serializer.errors['region'][0].code, code)
+
+    def test_stats_endpoint_is_admin_only(self):
+        response = self.client.get(reverse('catalog_cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('masterdata.Region', response.data['catalogs'])
+
+        self.client.force_authenticate(User.objects.create_user(username='ana', email='ana@itam.com', password='clave12345'))
+        self.assertEqual(self.client.get(reverse('catalog_cache_stats')).status_code, 403)
+
+
+class MasterdataBootstrapTests(TestCase):
+
+    def setUp(self):
+        catalog_cache.clear()
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.region = Region.objects.create(name='Norte')
+            Finca.objects.create(name='Finca Uno', region=self.region)
+
+    def test_returns_every_catalog_with_an_etag(self):
+        response = self.client.get(reverse('masterdata_bootstrap'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertEqual(response.data['regions'], [{'id': self.region.pk, 'name': 'Norte', 'description': None}])
+        self.assertEqual(response.data['fincas'][0]['region_id'], self.region.pk)
+        self.assertEqual(
+            set(response.data) - {'version'},
+            {'regions', 'fincas', 'departamentos', 'areas', 'tipos_activos', 'marcas', 'modelos_activo', 'proveedores'}
+        )
+
+    def test_if_none_match_gets_304_without_queries(self):
+        etag = self.client.get(reverse('masterdata_bootstrap'))['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('masterdata_bootstrap'), HTTP_IF_NONE_MATCH=f'W/{etag}')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_catalog_change_produces_a_new_etag(self):
+        etag = self.client.get(reverse('masterdata_bootstrap'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('region-detail', args=[self.region.pk]), {'name': 'Sur'}, format='json')
+
+        response = self.client.get(reverse('masterdata_bootstrap'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.data['regions'][0]['name'], 'Sur')
+
+
+class FeriadoUniquenessTests(TestCase):
+    """Una sola fecha por región, también para los feriados nacionales (region NULL)."""
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.region = Region.objects.create(name='Norte')
+        self.fecha = date(2025, 9, 15)
+        Feriado.objects.create(fecha=self.fecha, nombre='Independencia')
+        Feriado.objects.create(fecha=self.fecha, nombre='Feria', region=self.region)
+
+    def test_database_rejects_repeated_national_feriado(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Feriado.objects.create(fecha=self.fecha, nombre='Repetido')
+        # Lo que usa el admin (full_clean) también lo detecta
+        with self.assertRaises(ValidationError):
+            Feriado(fecha=self.fecha, nombre='Repetido').full_clean()
+        Feriado.objects.create(fecha=date(2025, 9, 16), nombre='Otro día')
+
+    def test_api_reports_duplicates_as_validation_errors(self):
+        response = self.client.post(reverse('feriado-list'), {'fecha': '2025-09-15', 'nombre': 'Repetido'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['fecha'], ['Ya existe un feriado nacional en esta fecha.'])
+        response = self.client.post(reverse('feriado-list'), {
+            'fecha': '2025-09-15', 'nombre': 'Repetido', 'region': self.region.pk,
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['fecha'], ["Ya existe un feriado en esta fecha para la región 'Norte'."])
+        self.assertEqual(Feriado.objects.count(), 2)
+
+
+@unittest.skipUnless(os.environ.get('ITAM_BENCHMARK'), 'Benchmark: ejecutar con ITAM_BENCHMARK=1')
+class AuditLogReportMemoryBenchmark(TestCase):
+    """
+    Peak memory of the audit CSV export at increasing table sizes.
+
+    ITAM_BENCHMARK_ROWS sets the sizes (default "10000,100000,1000000"). The
+    peak must stay flat: it depends on the chunk size, not on the row count.
+    """
+
+    def test_peak_memory_is_flat(self):
+        user = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        client = APIClient()
+        client.force_authenticate(user)
+        sizes = [int(size) for size in os.environ.get('ITAM_BENCHMARK_ROWS', '10000,100000,1000000').split(',')]
+
+        peaks = {}
+        created = 0
+        for size in sizes:
+            AuditLog.objects.bulk_create(
+                (AuditLog(activity_type='UPDATE', description=f'Cambio {i}', user=user,
+                          old_data={'estado': 'activo'}, new_data={'estado': 'retirado'})
+                 for i in range(created, size)),
+                batch_size=5000
+            )
+            created = size
+
+            tracemalloc.start()
+            response = client.get(reverse('audit_logs_report_csv'))
+            lines = sum(chunk.count(b'\n') for chunk in response.streaming_content)
+            peaks[size] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            self.assertEqual(lines, size + 1)
+            print(f'\n{size:>9} filas: pico {peaks[size] / 1024 / 1024:.1f} MiB')
 
-# Create your tests here.
+        self.assertLess(peaks[sizes[-1]], peaks[sizes[0]] * 1.5)
@@ -5,6 +5,7 @@ Define todas las rutas API para gestión CRUD de entidades de catálogo:
 - Regiones, fincas, departamentos, áreas (jerarquía organizacional)
 - Tipos de activos, marcas, modelos (clasificación de equipos)
 - Proveedores (información de contactos)
+- Feriados (calendario laboral por región)
 - Logs de auditoría (seguimiento de cambios)
 
 Utiliza DefaultRouter de DRF para generar automáticamente las rutas RESTful
@@ -13,7 +14,7 @@ estándar (GET, POST, PUT, PATCH, DELETE) para cada ViewSet.
 
 from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import RegionViewSet, FincaViewSet, DepartamentoViewSet, AreaViewSet, TipoActivoViewSet, MarcaViewSet, ModeloActivoViewSet, ProveedorViewSet, AuditLogViewSet, audit_logs_report_csv
+from .views import RegionViewSet, FincaViewSet, DepartamentoViewSet, AreaViewSet, TipoActivoViewSet, MarcaViewSet, ModeloActivoViewSet, ProveedorViewSet, FeriadoViewSet, AuditLogViewSet, audit_logs_report_csv, catalog_cache_stats, masterdata_bootstrap
 
 # Configuración del router para rutas REST automáticas
 router = DefaultRouter()
@@ -32,10 +33,15 @@ router.register(r'modelos-activo', ModeloActivoViewSet) # /api/masterdata/modelo
 
 # Proveedores y auditoría
 router.register(r'proveedores', ProveedorViewSet)    # /api/masterdata/proveedores/
+router.register(r'feriados', FeriadoViewSet)         # /api/masterdata/feriados/
 router.register(r'audit-logs', AuditLogViewSet)      # /api/masterdata/audit-logs/
 
 # URLs finales: combina rutas del router con rutas adicionales
 urlpatterns = router.urls + [
     # Ruta adicional para exportación CSV de logs de auditoría
     path('reports/audit-logs/csv/', audit_logs_report_csv, name='audit_logs_report_csv'),
+    # Todos los catálogos en una sola respuesta (con ETag) para los formularios del frontend
+    path('bootstrap/', masterdata_bootstrap, name='masterdata_bootstrap'),
+    # Aciertos y fallos de la caché de catálogos (monitoreo)
+    path('cache/stats/', catalog_cache_stats, name='catalog_cache_stats'),
 ]
\ No newline at end of file
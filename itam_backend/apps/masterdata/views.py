@@ -7,105 +7,61 @@ Proporciona endpoints para CRUD completo de datos maestros.
 """
 
 from rest_framework import viewsets, permissions, status
+from rest_framework import filters as drf_filters
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.decorators import api_view, permission_classes
+from django_filters.rest_framework import DjangoFilterBackend
+from django.db import transaction
+from django.utils.http import parse_etags
 from django.db.models import ProtectedError
 from django.contrib.contenttypes.models import ContentType
-from django.forms.models import model_to_dict
-from django.core.serializers.json import DjangoJSONEncoder
-from django.http import HttpResponse
 from datetime import datetime
+import hashlib
 import json
-import csv
 
-from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo, Proveedor, AuditLog
-from .serializers import RegionSerializer, FincaSerializer, FincaCreateUpdateSerializer, DepartamentoSerializer, AreaSerializer, TipoActivoSerializer, MarcaSerializer, ModeloActivoSerializer, ProveedorSerializer, AuditLogSerializer
+from .reports import iterate_in_chunks, streaming_csv_response
+from .pagination import StandardKeysetPagination
+from . import audit
+from . import cache as catalog_cache
+from .models import Region, Finca, Departamento, Area, TipoActivo, Marca, ModeloActivo, Proveedor, Feriado, AuditLog
+from .serializers import RegionSerializer, FincaSerializer, FincaCreateUpdateSerializer, DepartamentoSerializer, AreaSerializer, TipoActivoSerializer, MarcaSerializer, ModeloActivoSerializer, ProveedorSerializer, FeriadoSerializer, AuditLogSerializer
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 5  # Default page size
     page_size_query_param = 'page_size'
     max_page_size = 200
 
-def serialize_model_data(instance):
-    """Serialize model instance data to JSON-compatible format."""
-    # Exclude fields that contain model instances (ManyToMany, ForeignKey objects)
-    exclude_fields = []
-    if hasattr(instance, 'groups'):
-        exclude_fields.append('groups')
-    if hasattr(instance, 'user_permissions'):
-        exclude_fields.append('user_permissions')
-    if hasattr(instance, 'permissions'):
-        exclude_fields.append('permissions')  # Exclude permissions from Group model
-    if hasattr(instance, 'password'):
-        exclude_fields.append('password')  # Don't log passwords
-
-    data = model_to_dict(instance, exclude=exclude_fields)
-
-    # Replace foreign key IDs with names for better readability in audit logs
-    if hasattr(instance, 'region') and instance.region:
-        data['region'] = instance.region.name
-    if hasattr(instance, 'departamento') and instance.departamento:
-        data['departamento'] = instance.departamento.name
-    if hasattr(instance, 'marca') and instance.marca:
-        data['marca'] = instance.marca.name
-    if hasattr(instance, 'tipo_activo') and instance.tipo_activo:
-        data['tipo_activo'] = instance.tipo_activo.name
-
-    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
-
-def get_changed_fields(old_data, new_data):
-    """Return only the fields that changed between old_data and new_data."""
-    if not old_data or not new_data:
-        return old_data or new_data or {}
-
-    changed = {}
-    all_keys = set(old_data.keys()) | set(new_data.keys())
-
-    for key in all_keys:
-        old_value = old_data.get(key)
-        new_value = new_data.get(key)
-        if old_value != new_value:
-            changed[key] = {
-                'old': old_value,
-                'new': new_value
-            }
-
-    return changed
-
 # ----------------------------------------------------
 # APLICACIÓN DE PERMISOS: Usar permisos específicos del modelo para mayor seguridad.
 # ----------------------------------------------------
 
 class AuditLogMixin:
+    # Cada escritura, su entrada de auditoría y el cambio de versión del catálogo se confirman juntos
     def perform_create(self, serializer):
-        instance = serializer.save()
-        self._log_activity('CREATE', instance, old_data=None, new_data=serialize_model_data(instance))
+        with transaction.atomic():
+            instance = serializer.save()
+            self._log_activity('CREATE', instance, old_data=None, new_data=audit.snapshot(instance))
 
     def perform_update(self, serializer):
-        old_instance = self.get_object()
-        old_data = serialize_model_data(old_instance)
-        instance = serializer.save()
-        new_data = serialize_model_data(instance)
-        changed_fields = get_changed_fields(old_data, new_data)
-        self._log_activity('UPDATE', instance, old_data=old_data, new_data=changed_fields)
+        # Estado previo tomado de la instancia que el serializador va a modificar (sin volver a consultarla)
+        old_data = audit.snapshot(serializer.instance)
+        with transaction.atomic():
+            instance = serializer.save()
+            new_data = audit.snapshot(instance)
+            changed_fields = audit.changed_fields(old_data, new_data)
+            self._log_activity('UPDATE', instance, old_data=old_data, new_data=changed_fields)
 
     def perform_destroy(self, instance):
-        old_data = serialize_model_data(instance)
-        self._log_activity('DELETE', instance, old_data=old_data, new_data=None)
-        super().perform_destroy(instance)
+        old_data = audit.snapshot(instance)
+        with transaction.atomic():
+            self._log_activity('DELETE', instance, old_data=old_data, new_data=None)
+            super().perform_destroy(instance)
 
     def _log_activity(self, activity_type, instance, old_data=None, new_data=None):
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type=activity_type,
-            description=f"{activity_type} {instance.__class__.__name__}: {instance}",
-            user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
-            old_data=old_data,
-            new_data=new_data
-        )
+        audit.record(activity_type, user=self.request.user, instance=instance, old_data=old_data, new_data=new_data)
+        # Los demás workers recargan el catálogo en su siguiente lectura
+        catalog_cache.bump(type(instance))
 
 class RegionViewSet(AuditLogMixin, viewsets.ModelViewSet):
     """
@@ -132,7 +88,7 @@ class RegionViewSet(AuditLogMixin, viewsets.ModelViewSet):
                 {"detail": "No se puede eliminar la región porque tiene fincas asignadas."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        self._log_activity('DELETE', instance, old_data=serialize_model_data(instance), new_data=None)
+        self._log_activity('DELETE', instance, old_data=audit.snapshot(instance), new_data=None)
         return super().destroy(request, *args, **kwargs)
 
 class FincaViewSet(AuditLogMixin, viewsets.ModelViewSet):
@@ -199,14 +155,25 @@ class ProveedorViewSet(AuditLogMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
     search_fields = ['nombre_empresa', 'nit', 'nombre_contacto']
 
+class FeriadoViewSet(AuditLogMixin, viewsets.ModelViewSet):
+    queryset = Feriado.objects.select_related('region').all()
+    serializer_class = FeriadoSerializer
+    pagination_class = StandardResultsSetPagination
+    # Usar permisos del modelo: requiere permisos específicos como masterdata.add_feriado, etc.
+    permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['region', 'fecha']
+
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = AuditLog.objects.select_related('user', 'content_type').order_by('-timestamp')
     serializer_class = AuditLogSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = StandardKeysetPagination
     # permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions]  # Temporarily commented for testing
     permission_classes = [permissions.IsAuthenticated]
+    filter_backends = [drf_filters.SearchFilter, drf_filters.OrderingFilter, DjangoFilterBackend]
     search_fields = ['activity_type', 'description', 'user__username']
     filterset_fields = ['activity_type', 'user']
+    ordering_fields = ['id', 'timestamp', 'activity_type']
 
 
 @api_view(['GET'])
@@ -255,35 +222,79 @@ def audit_logs_report_csv(request):
         except ValueError:
             pass
 
-    # Create CSV response with UTF-8 BOM for Excel compatibility
-    response = HttpResponse(content_type='text/csv; charset=utf-8')
-    response['Content-Disposition'] = 'attachment; filename="reporte_auditoria.csv"'
-    # Add UTF-8 BOM for proper Excel display
-    response.write('\ufeff')
-
-    writer = csv.writer(response)
-    # Write header
-    writer.writerow([
+    # Stream the CSV in keyset-paginated chunks (memoria acotada sin importar el número de filas)
+    def rows():
+        for log in iterate_in_chunks(queryset):
+            # Format old_data and new_data as JSON strings
+            old_data_str = json.dumps(log.old_data, ensure_ascii=False) if log.old_data else ''
+            new_data_str = json.dumps(log.new_data, ensure_ascii=False) if log.new_data else ''
+
+            yield [
+                log.id,
+                log.timestamp.isoformat(),
+                log.activity_type,
+                log.description,
+                log.user.username if log.user else '',
+                log.content_type.name if log.content_type else '',
+                log.object_id,
+                old_data_str,
+                new_data_str
+            ]
+
+    return streaming_csv_response('reporte_auditoria.csv', [
         'ID', 'Fecha/Hora', 'Tipo Actividad', 'Descripción', 'Usuario',
         'Tipo Contenido', 'ID Objeto', 'Datos Anteriores', 'Datos Nuevos'
-    ])
-
-    # Write data
-    for log in queryset:
-        # Format old_data and new_data as JSON strings
-        old_data_str = json.dumps(log.old_data, ensure_ascii=False) if log.old_data else ''
-        new_data_str = json.dumps(log.new_data, ensure_ascii=False) if log.new_data else ''
-
-        writer.writerow([
-            log.id,
-            log.timestamp.isoformat(),
-            log.activity_type,
-            log.description,
-            log.user.username if log.user else '',
-            log.content_type.name if log.content_type else '',
-            log.object_id,
-            old_data_str,
-            new_data_str
-        ])
-
-    return response
\ No newline at end of file
+    ], rows())
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def catalog_cache_stats(request):
+    """Hit/miss counters of the catalog cache in the worker that serves the request"""
+    return Response(catalog_cache.stats())
+
+
+# Catálogos que devuelve /bootstrap/ (llave de la respuesta -> modelo)
+BOOTSTRAP_CATALOGS = {
+    'regions': Region, 'fincas': Finca, 'departamentos': Departamento, 'areas': Area,
+    'tipos_activos': TipoActivo, 'marcas': Marca, 'modelos_activo': ModeloActivo, 'proveedores': Proveedor,
+}
+BOOTSTRAP_EXCLUDE = {'created_at', 'updated_at'}
+# Cambiar si cambia la forma de la respuesta, para invalidar los ETag ya emitidos
+BOOTSTRAP_FORMAT = 1
+
+_bootstrap_payload = (None, None)  # (etag, datos) de la última respuesta construida en este proceso
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def masterdata_bootstrap(request):
+    """
+    All catalogs in one response, for the frontend forms.
+
+    The ETag is derived from the catalog versions; a matching If-None-Match
+    gets a 304 with no database access.
+    """
+    global _bootstrap_payload
+    versions = catalog_cache.versions(BOOTSTRAP_CATALOGS.values())
+    signature = [BOOTSTRAP_FORMAT] + [(model._meta.label, versions[model]) for model in BOOTSTRAP_CATALOGS.values()]
+    etag = '"%s"' % hashlib.sha1(json.dumps(signature).encode()).hexdigest()
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match:
+        tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+        if etag in tags or '*' in tags:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cached_etag, data = _bootstrap_payload
+    if cached_etag != etag:
+        data = {'version': etag.strip('"')}
+        for key, model in BOOTSTRAP_CATALOGS.items():
+            fields = [field.attname for field in model._meta.concrete_fields if field.name not in BOOTSTRAP_EXCLUDE]
+            data[key] = [
+                {name: getattr(obj, name) for name in fields}
+                for obj in catalog_cache.objects(model).values()
+            ]
+        _bootstrap_payload = (etag, data)
+    return Response(data, headers=headers)
@@ -1,7 +1,11 @@
 # C:\Proyectos\ITAM_System\itam_backend\users\admin.py
-from django.contrib import admin
+from collections import Counter
+
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser # Asegúrate de importar CustomUser
+from django.db import transaction
+from django.db.models import Q
+from .models import CustomUser, EmployeeMatch # Asegúrate de importar CustomUser
 
 class CustomUserAdmin(UserAdmin):
     # Esto te permite ver más campos en la lista de usuarios en el admin
@@ -22,4 +26,43 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(CustomUser, CustomUserAdmin)
 
+
+@admin.register(EmployeeMatch)
+class EmployeeMatchAdmin(admin.ModelAdmin):
+    # Coincidencias dudosas del vinculador de empleados (ver linking.py)
+    list_display = ('user', 'employee', 'reason', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('user__username', 'user__first_name', 'user__last_name', 'employee__first_name', 'employee__last_name')
+    actions = ['confirm_match']
+
+    @admin.action(description='Vincular el usuario con el empleado seleccionado')
+    def confirm_match(self, request, queryset):
+        matches = list(queryset.select_related('user', 'employee'))
+        per_user = Counter(match.user_id for match in matches)
+        per_employee = Counter(match.employee_id for match in matches)
+        # Igual que linking.link_users: un empleado nunca queda vinculado a dos usuarios
+        taken = set(
+            CustomUser.objects.filter(employee_id__in=per_employee).values_list('employee_id', flat=True)
+        )
+        errors = []
+        for match in matches:
+            if per_user[match.user_id] > 1:
+                errors.append(f'Seleccione una sola coincidencia para el usuario {match.user}.')
+            elif per_employee[match.employee_id] > 1:
+                errors.append(f'El empleado {match.employee} está seleccionado para varios usuarios.')
+            elif match.employee_id in taken:
+                errors.append(f'El empleado {match.employee} ya está vinculado a otro usuario.')
+        if errors:
+            for error in dict.fromkeys(errors):
+                messages.error(request, error)
+            return
+
+        with transaction.atomic():
+            for match in matches:
+                match.user.employee_id = match.employee_id
+                match.user.save(update_fields=['employee'])
+                # Las coincidencias de otros usuarios con este empleado ya no son posibles
+                EmployeeMatch.objects.filter(Q(user=match.user) | Q(employee_id=match.employee_id)).delete()
+        messages.success(request, f'{len(matches)} usuario(s) vinculado(s) con su empleado.')
+
 # Si ya tenías tu CustomUser registrado de otra forma, asegúrate de que esté usando CustomUserAdmin
\ No newline at end of file
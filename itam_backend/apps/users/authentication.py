@@ -0,0 +1,152 @@
+"""
+Autenticación JWT con caché de identidad y permisos por usuario.
+
+JWTAuthentication consulta el CustomUser en cada petición, y luego
+DjangoModelPermissions / CanViewReports cargan todos los permisos de sus
+grupos porque cada petición trae un objeto de usuario nuevo. Esta clase
+guarda en memoria de cada proceso el usuario ya resuelto y su conjunto de
+permisos, de modo que en estado estable una petición autenticada no hace
+ninguna consulta de autenticación.
+
+Cada entrada se valida contra dos versiones guardadas en la caché compartida
+de Django (visibles para todos los workers):
+
+- la versión del usuario, que se incrementa al guardar o eliminar el usuario
+  y al cambiar sus grupos o permisos directos (UserSerializer.update,
+  groups.set, ...);
+- la versión de roles, que se incrementa al cambiar los permisos de un grupo o
+  eliminarlo (RoleSerializer.update), ya que afecta a todos sus miembros.
+
+Los incrementos se hacen al confirmar la transacción (ver signals.py).
+
+Además, cada entrada vence a los settings.AUTH_USER_CACHE_TTL segundos (60 por
+defecto): si un cambio no llega a la caché compartida (un worker que no la
+comparte, un UPDATE directo en la base de datos), un usuario desactivado o
+un rol revocado deja de valer a más tardar en ese plazo.
+"""
+
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+ROLES_VERSION_KEY = 'users:auth:roles:version'
+
+_lock = threading.Lock()
+_entries = {}  # user_id -> (versiones, usuario, (permisos totales, del usuario, de grupos), vencimiento)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that serves the user and its permissions from the per-process cache."""
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        versions = _versions(user_id)
+        now = time.monotonic()
+        with _lock:
+            entry = _entries.get(user_id)
+        if entry is None or entry[0] != versions or entry[3] <= now:
+            user = super().get_user(validated_token)
+            # Se leen las versiones antes que el usuario: un cambio confirmado entre ambas
+            # lecturas solo provoca una recarga en la siguiente petición
+            entry = (versions, user, _permissions(user), now + getattr(settings, 'AUTH_USER_CACHE_TTL', 60))
+            with _lock:
+                _entries[user_id] = entry
+        else:
+            self.check_user(entry[1], validated_token)
+        return _request_user(entry[1], entry[2])
+
+    def check_user(self, user, validated_token):
+        """Same checks JWTAuthentication.get_user applies to a freshly loaded user."""
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+
+
+def bump_user(user_id):
+    """Invalidate the cached identity of a user when the current transaction commits."""
+    _bump(_user_version_key(user_id), user_id)
+
+
+def bump_roles():
+    """Invalidate the cached permissions of every user when the current transaction commits."""
+    _bump(ROLES_VERSION_KEY, None)
+
+
+def clear():
+    """Drop every cached identity of this process."""
+    with _lock:
+        _entries.clear()
+
+
+def _bump(key, user_id):
+    with _lock:
+        if user_id is None:
+            _entries.clear()
+        else:
+            _entries.pop(user_id, None)
+
+    def increment():
+        try:
+            cache.incr(key)
+        except ValueError:
+            # La llave no existe (caché vacía o expirada)
+            cache.add(key, _initial_version(), timeout=None) or cache.incr(key)
+
+    transaction.on_commit(increment)
+
+
+def _versions(user_id):
+    """(user version, roles version), in one round trip to the shared cache."""
+    keys = [_user_version_key(user_id), ROLES_VERSION_KEY]
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        for key in missing:
+            cache.add(key, _initial_version(), timeout=None)
+        found.update(cache.get_many(missing))
+    return tuple(found.get(key, 0) for key in keys)
+
+
+def _user_version_key(user_id):
+    return f'users:auth:user:{user_id}:version'
+
+
+def _initial_version():
+    # Si la caché compartida se vacía, las versiones no vuelven a empezar en un valor ya usado
+    return time.time_ns()
+
+
+def _permissions(user):
+    """Permission sets resolved by the auth backends (the queries has_perm would run)."""
+    return (
+        frozenset(user.get_all_permissions()),
+        frozenset(user.get_user_permissions()),
+        frozenset(user.get_group_permissions()),
+    )
+
+
+def _request_user(user, permissions):
+    """
+    Private copy of the cached user for one request, with the permission caches
+    of ModelBackend already filled so has_perm() does not query.
+    """
+    request_user = copy.copy(user)
+    request_user._perm_cache, request_user._user_perm_cache, request_user._group_perm_cache = (
+        set(perms) for perms in permissions
+    )
+    return request_user
@@ -0,0 +1,145 @@
+"""
+Vinculación automática de usuarios con empleados por nombre.
+
+Los nombres se comparan por su llave normalizada (sin acentos ni mayúsculas y
+con los tokens ordenados, ver employees.models.normalize_name), que se guarda
+indexada en name_key (y la de los apellidos en last_name_key) tanto en Employee
+como en CustomUser. Para cada usuario sin empleado:
+
+- un único empleado libre con la misma llave: se asigna CustomUser.employee;
+- varios empleados con la misma llave, o un empleado pedido por varios
+  usuarios: los candidatos quedan en EmployeeMatch como 'ambiguous';
+- ninguno, pero sí empleados con los mismos apellidos y algún nombre en común:
+  quedan en EmployeeMatch como 'partial'.
+
+Los empleados ya vinculados a otro usuario no se proponen. link_users() corre
+en lote desde el comando link_employees y, para los registros afectados, al
+guardar un usuario o un empleado (ver signals.py).
+"""
+
+from collections import Counter, defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+
+from apps.employees.models import Employee, normalize_name
+from .models import EmployeeMatch
+
+User = get_user_model()
+
+# Tokens más cortos no cuentan como nombre en común (iniciales, "de", ...)
+MIN_TOKEN_LENGTH = 3
+
+
+class EmployeeIndex:
+    """Free employees indexed by full name key and by last name key."""
+
+    def __init__(self, rows, taken=()):
+        self.by_key = defaultdict(list)
+        self.by_last_name = defaultdict(list)
+        for pk, key, first_name, last_name in rows:
+            if pk in taken or not key:
+                continue
+            self.by_key[key].append(pk)
+            self.by_last_name[normalize_name(last_name)].append((pk, set(normalize_name(first_name).split())))
+
+    def match(self, first_name, last_name):
+        """(employee id or None, review candidates, review reason) for a user's name."""
+        key = normalize_name(first_name, last_name)
+        if not key:
+            return None, [], None
+
+        exact = self.by_key.get(key, [])
+        if len(exact) == 1:
+            return exact[0], [], None
+        if exact:
+            return None, exact, 'ambiguous'
+
+        tokens = {token for token in normalize_name(first_name).split() if len(token) >= MIN_TOKEN_LENGTH}
+        partial = [pk for pk, first_tokens in self.by_last_name.get(normalize_name(last_name), []) if tokens & first_tokens]
+        return None, partial, 'partial' if partial else None
+
+
+def link_users(users=None, employees=None, dry_run=False):
+    """
+    Link the users without employee in `users` (all by default) against
+    `employees` (all by default). Returns {'linked', 'review', 'unmatched'} counts.
+    """
+    users = list((users if users is not None else User.objects.all()).filter(employee__isnull=True))
+    summary = {'linked': 0, 'review': 0, 'unmatched': 0}
+    if not users:
+        return summary
+
+    taken = User.objects.filter(employee__isnull=False)
+    if employees is not None:
+        taken = taken.filter(employee__in=employees)
+    taken = set(taken.values_list('employee_id', flat=True))
+    rows = (employees if employees is not None else Employee.objects.all()).values_list(
+        'pk', 'name_key', 'first_name', 'last_name'
+    )
+    index = EmployeeIndex(rows, taken)
+    results = {user.pk: index.match(user.first_name, user.last_name) for user in users}
+
+    # Un empleado que coincide con varios usuarios no es una coincidencia confiable
+    wanted = Counter(employee_id for employee_id, _, _ in results.values() if employee_id)
+    for user_id, (employee_id, candidates, reason) in results.items():
+        if employee_id and wanted[employee_id] > 1:
+            results[user_id] = (None, [employee_id], 'ambiguous')
+
+    with transaction.atomic():
+        for user in users:
+            employee_id, candidates, reason = results[user.pk]
+            if employee_id:
+                summary['linked'] += 1
+            elif candidates:
+                summary['review'] += 1
+            else:
+                summary['unmatched'] += 1
+            if dry_run:
+                continue
+
+            EmployeeMatch.objects.filter(user=user).exclude(employee_id__in=candidates).delete()
+            if employee_id:
+                user.employee_id = employee_id
+                user.save(update_fields=['employee'])
+            elif candidates:
+                existing = set(EmployeeMatch.objects.filter(user=user).values_list('employee_id', flat=True))
+                EmployeeMatch.objects.bulk_create([
+                    EmployeeMatch(user=user, employee_id=pk, reason=reason) for pk in candidates if pk not in existing
+                ])
+    return summary
+
+
+def _same_name(name_key, last_name_key):
+    """Q for the users or employees with the same full name key or last name key."""
+    condition = Q()
+    if name_key:
+        condition |= Q(name_key=name_key)
+    if last_name_key:
+        condition |= Q(last_name_key=last_name_key)
+    return condition
+
+
+def link_user(user):
+    """Link one user, looking only at the employees that can match its name."""
+    condition = _same_name(user.name_key, user.last_name_key)
+    if not condition:
+        return {'linked': 0, 'review': 0, 'unmatched': 0}
+    return link_users(User.objects.filter(pk=user.pk), Employee.objects.filter(condition))
+
+
+def link_employee(employee):
+    """
+    Link the users without employee whose name can match `employee`, against
+    the employees that can match those users (not the whole table).
+    """
+    condition = _same_name(employee.name_key, employee.last_name_key)
+    if not condition:
+        return {'linked': 0, 'review': 0, 'unmatched': 0}
+    users = User.objects.filter(condition, employee__isnull=True)
+    employees = Employee.objects.filter(
+        Q(name_key__in=users.exclude(name_key='').values('name_key'))
+        | Q(last_name_key__in=users.exclude(last_name_key='').values('last_name_key'))
+    )
+    return link_users(users, employees)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from apps.users.linking import link_users
+
+
+class Command(BaseCommand):
+    help = 'Link users without an employee to the employee with the same normalized name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Show the results without writing them')
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        summary = link_users(dry_run=dry_run)
+
+        verb = 'would link' if dry_run else 'linked'
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {summary['linked']} users, {summary['review']} sent to review, {summary['unmatched']} without match"
+        ))
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.4 on 2026-10-17 15:20
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0003_employee_name_key'),
+        ('users', '0005_customuser_employee'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmployeeMatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('ambiguous', 'Varios empleados con el mismo nombre'), ('partial', 'Coincidencia parcial del nombre')], max_length=20, verbose_name='Motivo')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='user_matches', to='employees.employee', verbose_name='Empleado')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='employee_matches', to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+            ],
+            options={
+                'verbose_name': 'Coincidencia de Empleado',
+                'verbose_name_plural': 'Coincidencias de Empleados',
+                'ordering': ['user', 'employee'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'employee'), name='unique_employee_match')],
+            },
+        ),
+    ]
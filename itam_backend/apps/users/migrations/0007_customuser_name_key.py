@@ -0,0 +1,38 @@
+# Generated by Django 5.2.4 on 2026-10-17 18:40
+
+from django.db import migrations, models
+
+from apps.employees.models import normalize_name
+
+BATCH_SIZE = 1000
+
+
+def fill_name_keys(apps, schema_editor):
+    CustomUser = apps.get_model('users', 'CustomUser')
+    users = []
+    for user in CustomUser.objects.only('first_name', 'last_name').iterator(chunk_size=BATCH_SIZE):
+        user.name_key = normalize_name(user.first_name, user.last_name)[:255]
+        user.last_name_key = normalize_name(user.last_name)[:150]
+        users.append(user)
+    CustomUser.objects.bulk_update(users, ['name_key', 'last_name_key'], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_employeematch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255, verbose_name='Llave de Nombre'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='last_name_key',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=150, verbose_name='Llave de Apellidos'),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+    ]
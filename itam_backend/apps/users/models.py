@@ -9,7 +9,7 @@ región, puesto y relación con empleados.
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 from apps.masterdata.models import Region, Departamento  # Importaciones de datos maestros
-from apps.employees.models import Employee
+from apps.employees.models import Employee, normalize_name
 
 class CustomUser(AbstractUser):
     """
@@ -65,6 +65,10 @@ class CustomUser(AbstractUser):
         related_name='user_account',
         verbose_name="Empleado Asociado"
     )
+    # Nombre completo y apellidos normalizados (ver employees.models.normalize_name), para buscar
+    # en SQL los usuarios que pueden vincularse con un empleado (ver linking.py)
+    name_key = models.CharField(max_length=255, blank=True, db_index=True, editable=False, verbose_name="Llave de Nombre")
+    last_name_key = models.CharField(max_length=150, blank=True, db_index=True, editable=False, verbose_name="Llave de Apellidos")
 
     def save(self, *args, **kwargs):
         """
@@ -75,6 +79,11 @@ class CustomUser(AbstractUser):
         """
         # Sincroniza el campo is_active de Django con nuestro campo status personalizado
         self.is_active = self.status == 'Activo'
+        self.name_key = normalize_name(self.first_name, self.last_name)[:255]
+        self.last_name_key = normalize_name(self.last_name)[:150]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'first_name', 'last_name'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'name_key', 'last_name_key'}
         super().save(*args, **kwargs)
 
     groups = models.ManyToManyField(
@@ -95,4 +104,37 @@ class CustomUser(AbstractUser):
     )
 
     def __str__(self):
-        return self.username
\ No newline at end of file
+        return self.username
+
+class EmployeeMatch(models.Model):
+    """
+    Empleado candidato para un usuario sin empleado asociado, pendiente de revisión.
+
+    El vinculador (apps/users/linking.py) asigna directamente CustomUser.employee
+    cuando la coincidencia es confiable; los casos dudosos quedan aquí para que
+    un administrador los confirme.
+    """
+    REASON_CHOICES = [
+        ('ambiguous', 'Varios empleados con el mismo nombre'),
+        ('partial', 'Coincidencia parcial del nombre'),
+    ]
+
+    user = models.ForeignKey(
+        CustomUser, on_delete=models.CASCADE, related_name='employee_matches', verbose_name="Usuario"
+    )
+    employee = models.ForeignKey(
+        Employee, on_delete=models.CASCADE, related_name='user_matches', verbose_name="Empleado"
+    )
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES, verbose_name="Motivo")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Coincidencia de Empleado"
+        verbose_name_plural = "Coincidencias de Empleados"
+        ordering = ['user', 'employee']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'employee'], name='unique_employee_match'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.employee} ({self.get_reason_display()})"
@@ -107,36 +107,9 @@ class UserSerializer(serializers.ModelSerializer):
         return str(obj.employee) if obj.employee else 'N/A'
 
     def get_employee_data(self, obj):
+        # Los usuarios sin empleado se vinculan por nombre fuera de la serialización (ver linking.py)
         if obj.employee:
-            serializer = EmployeeSerializer(obj.employee)
-            return serializer.data
-        # Fallback: try to find employee by matching name
-        try:
-            from apps.employees.models import Employee
-            # Try exact name match first
-            employee = Employee.objects.filter(
-                first_name__iexact=obj.first_name,
-                last_name__iexact=obj.last_name
-            ).first()
-
-            # If no exact match, try partial name match
-            if not employee:
-                # Split user first_name and try to match with employee first_name
-                user_first_names = obj.first_name.split()
-                for first_name_part in user_first_names:
-                    if len(first_name_part) > 2:  # Avoid matching very short names
-                        employee = Employee.objects.filter(
-                            first_name__icontains=first_name_part,
-                            last_name__iexact=obj.last_name
-                        ).first()
-                        if employee:
-                            break
-
-            if employee:
-                serializer = EmployeeSerializer(employee)
-                return serializer.data
-        except Exception:
-            pass
+            return EmployeeSerializer(obj.employee).data
         return None
 
 
@@ -181,6 +154,74 @@ class UserSerializer(serializers.ModelSerializer):
 
         return instance
 
+class UserListSerializer(serializers.ModelSerializer):
+    """
+    Representación ligera de usuario para el listado (GET /api/users/).
+
+    No hace consultas por usuario: los conteos llegan anotados y los roles y
+    permisos precargados por UserListCreateAPIView.get_queryset(). A diferencia
+    de UserSerializer no incluye la lista de permisos ni los datos completos
+    del empleado; el perfil completo sigue disponible en /api/users/<id>/ y
+    /api/users/me/.
+    """
+
+    role_ids = serializers.SerializerMethodField()
+    role_names = serializers.SerializerMethodField()
+    role_name = serializers.SerializerMethodField()
+    permissions_count = serializers.SerializerMethodField()
+    departamento_name = serializers.CharField(source='departamento.name', read_only=True)
+    region_name = serializers.CharField(source='region.name', read_only=True)
+    employee_name = serializers.SerializerMethodField()
+    audit_logs_count = serializers.IntegerField(read_only=True)
+    assets_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = (
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'puesto', 'departamento', 'departamento_name', 'region', 'region_name', 'employee', 'employee_name',
+            'status', 'is_staff', 'is_superuser', 'is_active', 'last_login', 'date_joined',
+            'role_ids', 'role_names', 'role_name', 'permissions_count', 'audit_logs_count', 'assets_count'
+        )
+        read_only_fields = fields
+
+    def get_role_ids(self, obj):
+        return [group.id for group in obj.groups.all()]
+
+    def get_role_names(self, obj):
+        return [group.name for group in obj.groups.all()]
+
+    def get_role_name(self, obj):
+        roles = obj.groups.all()
+        return roles[0].name if roles else None
+
+    def get_permissions_count(self, obj):
+        # Mismo resultado que len(obj.get_all_permissions()) con ModelBackend, a partir de lo precargado
+        if not obj.is_active:
+            return 0
+        if obj.is_superuser:
+            return self._all_permissions_count()
+        perms = {_permission_name(perm) for perm in obj.user_permissions.all()}
+        for group in obj.groups.all():
+            perms.update(_permission_name(perm) for perm in group.permissions.all())
+        return len(perms)
+
+    def get_employee_name(self, obj):
+        return str(obj.employee) if obj.employee else 'N/A'
+
+    def _all_permissions_count(self):
+        # Un superusuario activo tiene todos los permisos; se cuenta una sola vez por respuesta
+        if not hasattr(self, '_permissions_total'):
+            self._permissions_total = len(set(
+                Permission.objects.values_list('content_type__app_label', 'codename')
+            ))
+        return self._permissions_total
+
+
+def _permission_name(permission):
+    return f'{permission.content_type.app_label}.{permission.codename}'
+
+
 class UserRegistrationSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     assigned_role_ids = serializers.PrimaryKeyRelatedField(
@@ -0,0 +1,70 @@
+"""
+Señales de la aplicación de usuarios.
+
+- Invalidación de la caché de autenticación (ver authentication.py): cualquier
+  cambio en un usuario, en sus grupos o permisos directos, o en los permisos de
+  un grupo incrementa la versión correspondiente al confirmar la transacción,
+  sin importar si viene de la API, del admin o de un comando.
+- Vinculación automática con empleados (ver linking.py): al guardar un usuario
+  sin empleado o un empleado, se buscan coincidencias al confirmar la transacción.
+"""
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from apps.employees.models import Employee
+from . import authentication, linking
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User, dispatch_uid='auth_cache_user_save')
+@receiver(post_delete, sender=User, dispatch_uid='auth_cache_user_delete')
+def user_changed(sender, instance, **kwargs):
+    authentication.bump_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid='auth_cache_user_groups')
+@receiver(m2m_changed, sender=User.user_permissions.through, dispatch_uid='auth_cache_user_permissions')
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """user.groups.set(...) / group.custom_user_set.add(...) and the same for direct permissions."""
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        authentication.bump_user(instance.pk)
+    elif action == 'post_clear':
+        # Desde el lado del grupo o del permiso, clear() no informa qué usuarios tenía
+        authentication.bump_roles()
+    else:
+        for user_id in pk_set or ():
+            authentication.bump_user(user_id)
+
+
+@receiver(m2m_changed, sender=Group.permissions.through, dispatch_uid='auth_cache_role_permissions')
+def role_permissions_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        authentication.bump_roles()
+
+
+@receiver(post_delete, sender=Group, dispatch_uid='auth_cache_role_delete')
+def role_deleted(sender, **kwargs):
+    authentication.bump_roles()
+
+
+@receiver(post_save, sender=User, dispatch_uid='employee_link_user_save')
+def link_saved_user(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance.employee_id is not None:
+        return
+    if update_fields is not None and not {'first_name', 'last_name', 'employee'} & set(update_fields):
+        return
+    transaction.on_commit(lambda: linking.link_user(instance))
+
+
+@receiver(post_save, sender=Employee, dispatch_uid='employee_link_employee_save')
+def link_saved_employee(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'name_key' not in update_fields):
+        return
+    transaction.on_commit(lambda: linking.link_employee(instance))
@@ -1,3 +1,270 @@
+from datetime import date
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.employees.models import Employee, normalize_name
+from . import authentication
+from .authentication import CachedJWTAuthentication
+from . import linking
+from .linking import link_users
+from .models import EmployeeMatch
+from .serializers import UserSerializer
+
+User = get_user_model()
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        authentication.clear()
+        self.auth = CachedJWTAuthentication()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role = Group.objects.create(name='Editores')
+            self.role.permissions.set(Permission.objects.filter(codename__in=['add_region', 'add_marca']))
+            self.user = User.objects.create_user(username='ana', email='ana@itam.com', password='clave12345')
+            self.user.groups.set([self.role])
+        self.token = AccessToken.for_user(self.user)
+
+    def test_steady_state_requests_do_no_auth_queries(self):
+        self.auth.get_user(self.token)
+        with self.assertNumQueries(0):
+            user = self.auth.get_user(self.token)
+            self.assertTrue(user.has_perm('masterdata.add_region'))
+            self.assertFalse(user.has_perm('masterdata.delete_region'))
+
+        # Cada petición recibe su propia copia del usuario
+        user.first_name = 'Cambiado'
+        self.assertEqual(self.auth.get_user(self.token).first_name, '')
+
+    def test_role_permission_change_is_seen_on_next_request(self):
+        self.assertTrue(self.auth.get_user(self.token).has_perm('masterdata.add_region'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role.permissions.set([])
+        self.assertFalse(self.auth.get_user(self.token).has_perm('masterdata.add_region'))
+
+    def test_group_membership_change_is_seen_on_next_request(self):
+        self.auth.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.groups.set([])
+        self.assertFalse(self.auth.get_user(self.token).has_perm('masterdata.add_region'))
+
+    def test_deactivated_user_is_rejected(self):
+        self.auth.get_user(self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.status = 'Inactivo'
+            self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.auth.get_user(self.token)
+
+    def test_entries_expire_without_version_bump(self):
+        self.auth.get_user(self.token)
+        # Cambio que no incrementa la versión (p. ej. hecho desde otro host sin caché compartida)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.auth.get_user(self.token)
+
+        later = authentication.time.monotonic() + 61
+        with mock.patch.object(authentication.time, 'monotonic', return_value=later):
+            with self.assertRaises(AuthenticationFailed):
+                self.auth.get_user(self.token)
+
+    def test_api_requests_use_the_cached_permissions(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        response = client.post(reverse('marca-list'), {'name': 'Dell'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            admin = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        admin_client = APIClient()
+        admin_client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = admin_client.put(
+                reverse('role-detail', args=[self.role.pk]), {'name': 'Editores', 'permission_ids': []}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        response = client.post(reverse('marca-list'), {'name': 'HP'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class UserListTests(TestCase):
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.role = Group.objects.create(name='Editores')
+        self.role.permissions.set(Permission.objects.filter(codename__in=['add_region', 'change_region']))
+        direct = Permission.objects.get(codename='add_marca')
+        for i in range(3):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@itam.com', password='clave12345')
+            user.groups.set([self.role])
+            user.user_permissions.set([direct])
+
+    def list_users(self):
+        response = self.client.get(reverse('user-list-create'), {'page_size': 200})
+        self.assertEqual(response.status_code, 200)
+        return response.data['results']
+
+    def test_query_count_does_not_grow_with_users(self):
+        with CaptureQueriesContext(connection) as baseline:
+            self.list_users()
+        for i in range(3, 10):
+            user = User.objects.create_user(username=f'user{i}', email=f'user{i}@itam.com', password='clave12345')
+            user.groups.set([self.role])
+        with self.assertNumQueries(len(baseline)):
+            self.assertEqual(len(self.list_users()), 11)
+
+    def test_list_matches_full_serializer(self):
+        rows = self.list_users()
+        self.assertNotIn('employee_data', rows[0])
+        self.assertNotIn('user_permissions', rows[0])
+        for row in rows:
+            full = UserSerializer(User.objects.get(pk=row['id'])).data
+            for field, value in row.items():
+                self.assertEqual(value, full[field], f'{row["username"]}.{field}')
+
+        user0 = next(row for row in rows if row['username'] == 'user0')
+        self.assertEqual(user0['role_names'], ['Editores'])
+        self.assertEqual(user0['permissions_count'], 3)
+
+
+class EmployeeLinkingTests(TestCase):
+
+    def employee(self, number, first_name, last_name):
+        return Employee.objects.create(
+            employee_number=number, first_name=first_name, last_name=last_name, start_date=date(2024, 1, 1)
+        )
+
+    def user(self, username, first_name, last_name):
+        return User.objects.create_user(
+            username=username, email=f'{username}@itam.com', password='clave12345',
+            first_name=first_name, last_name=last_name
+        )
+
+    def test_name_key_ignores_accents_casing_and_token_order(self):
+        self.assertEqual(normalize_name('José  PÉREZ'), normalize_name('Perez', 'jose'))
+        self.assertEqual(self.employee('E1', 'María José', 'López').name_key, 'jose lopez maria')
+
+    def test_batch_links_confident_matches_and_records_the_rest(self):
+        jose = self.employee('E1', 'José', 'Pérez')
+        self.employee('E2', 'Ana', 'García')
+        self.employee('E3', 'Ana', 'Garcia')
+        carlos = self.employee('E4', 'Carlos Andrés', 'Ruiz')
+        linked = self.user('jperez', 'jose', 'PEREZ')
+        ambiguous = self.user('agarcia', 'Ana', 'García')
+        partial = self.user('cruiz', 'Carlos', 'Ruiz')
+        self.user('nadie', 'Sin', 'Empleado')
+
+        self.assertEqual(link_users(dry_run=True), {'linked': 1, 'review': 2, 'unmatched': 1})
+        self.assertFalse(EmployeeMatch.objects.exists())
+
+        self.assertEqual(link_users(), {'linked': 1, 'review': 2, 'unmatched': 1})
+        linked.refresh_from_db()
+        self.assertEqual(linked.employee, jose)
+        self.assertEqual(
+            set(EmployeeMatch.objects.values_list('user__username', 'reason')),
+            {('agarcia', 'ambiguous'), ('cruiz', 'partial')}
+        )
+        self.assertEqual(EmployeeMatch.objects.filter(user=ambiguous).count(), 2)
+        self.assertEqual(EmployeeMatch.objects.get(user=partial).employee, carlos)
+
+        # Un segundo usuario con el mismo nombre no recibe el empleado ya vinculado
+        self.user('jperez2', 'José', 'Pérez')
+        self.assertEqual(link_users()['linked'], 0)
+
+    def test_employee_save_only_loads_users_that_can_match(self):
+        user = self.user('jperez', 'JOSÉ', 'Pérez')
+        self.assertEqual((user.name_key, user.last_name_key), ('jose perez', 'perez'))
+        for i in range(10):
+            self.user(f'otro{i}', 'Otro', f'Usuario {i}')
+
+        employee = self.employee('E1', 'Jose', 'Perez')
+        with CaptureQueriesContext(connection) as queries:
+            linking.link_employee(employee)
+        self.assertIn('name_key', queries[0]['sql'])
+        user.refresh_from_db()
+        self.assertEqual(user.employee, employee)
+
+    def test_employee_save_only_indexes_employees_that_can_match(self):
+        mora = self.employee('E1', 'Luis', 'Mora')
+        self.user('lmora', 'Luis', 'Mora')
+        for i in range(5):
+            other = self.employee(f'O{i}', 'Otro', f'Empleado {i}')
+            User.objects.filter(pk=self.user(f'otro{i}', 'Otro', f'Usuario {i}').pk).update(employee=other)
+
+        with mock.patch.object(linking, 'EmployeeIndex', wraps=linking.EmployeeIndex) as index:
+            self.assertEqual(linking.link_employee(self.employee('E2', 'Luisa', 'Mora')), {'linked': 1, 'review': 0, 'unmatched': 0})
+        rows, taken = index.call_args.args
+        self.assertEqual({row[0] for row in rows}, {mora.pk, Employee.objects.get(employee_number='E2').pk})
+        self.assertEqual(taken, set())
+
+    def test_admin_confirm_match_keeps_one_user_per_employee(self):
+        luis = self.employee('E1', 'Luis', 'Mora')
+        luis2 = self.employee('E2', 'Luis', 'Mora')
+        lmora = self.user('lmora', 'Luis', 'Mora')
+        lmora2 = self.user('lmora2', 'Luis', 'Mora')
+        link_users()
+        admin = User.objects.create_superuser(username='admin', email='admin@itam.com', password='admin12345')
+        self.client.force_login(admin)
+
+        def confirm(*matches):
+            return self.client.post(reverse('admin:users_employeematch_changelist'), {
+                'action': 'confirm_match', '_selected_action': [match.pk for match in matches],
+            }, follow=True)
+
+        # Dos coincidencias del mismo usuario, o un empleado para dos usuarios: no se vincula nada
+        for matches in ([(lmora, luis), (lmora, luis2)], [(lmora, luis), (lmora2, luis)]):
+            response = confirm(*(EmployeeMatch.objects.get(user=user, employee=employee) for user, employee in matches))
+            self.assertEqual([m.level_tag for m in response.context['messages']], ['error'])
+        self.assertFalse(User.objects.filter(employee__isnull=False).exists())
+
+        confirm(EmployeeMatch.objects.get(user=lmora, employee=luis))
+        lmora.refresh_from_db()
+        self.assertEqual(lmora.employee, luis)
+        # lmora2 solo conserva la coincidencia con el empleado que sigue libre
+        self.assertEqual(list(EmployeeMatch.objects.values_list('user', 'employee')), [(lmora2.pk, luis2.pk)])
+
+        User.objects.filter(pk=lmora.pk).update(employee=luis2)
+        response = confirm(EmployeeMatch.objects.get(user=lmora2, employee=luis2))
+        self.assertEqual([m.level_tag for m in response.context['messages']], ['error'])
+        lmora2.refresh_from_db()
+        self.assertIsNone(lmora2.employee)
+
+    def test_same_employee_for_two_users_goes_to_review(self):
+        self.employee('E1', 'Luis', 'Mora')
+        self.user('lmora', 'Luis', 'Mora')
+        self.user('lmora2', 'Luis', 'Mora')
+        self.assertEqual(link_users(), {'linked': 0, 'review': 2, 'unmatched': 0})
+
+    def test_saving_a_user_or_an_employee_links_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            employee = self.employee('E1', 'Rosa', 'Díaz')
+        with self.captureOnCommitCallbacks(execute=True):
+            user = self.user('rdiaz', 'Rosa', 'Diaz')
+        user.refresh_from_db()
+        self.assertEqual(user.employee, employee)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other = self.user('pvega', 'Pedro', 'Vega')
+        with self.captureOnCommitCallbacks(execute=True):
+            employee = self.employee('E2', 'Pedro', 'Vega')
+        other.refresh_from_db()
+        self.assertEqual(other.employee, employee)
 
-# Create your tests here.
+    def test_profile_serialization_does_not_search_employees(self):
+        self.employee('E1', 'Marta', 'Soto')
+        user = self.user('msoto', 'Marta', 'Soto')
+        with CaptureQueriesContext(connection) as queries:
+            data = UserSerializer(user).data
+        self.assertIsNone(data['employee_data'])
+        self.assertFalse([query for query in queries if 'employees_employee' in query['sql']])
@@ -16,13 +16,11 @@ from rest_framework.pagination import PageNumberPagination
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group, Permission
-from django.contrib.contenttypes.models import ContentType
-from django.forms.models import model_to_dict
-from django.core.serializers.json import DjangoJSONEncoder
-import json
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
 from .permissions import IsActiveUser
 from rest_framework.permissions import IsAuthenticated
-from apps.masterdata.models import AuditLog
+from apps.masterdata import audit
 
 # Obtiene el modelo de usuario personalizado
 User = get_user_model()
@@ -32,75 +30,64 @@ class StandardResultsSetPagination(PageNumberPagination):
     page_size_query_param = 'page_size'
     max_page_size = 200
 
-def serialize_model_data(instance):
-    """Serialize model instance data to JSON-compatible format."""
-    # Exclude fields that contain model instances (ManyToMany, ForeignKey objects)
-    exclude_fields = []
-    if hasattr(instance, 'groups'):
-        exclude_fields.append('groups')
-    if hasattr(instance, 'user_permissions'):
-        exclude_fields.append('user_permissions')
-    if hasattr(instance, 'permissions'):
-        exclude_fields.append('permissions')  # Exclude permissions from Group model
-    if hasattr(instance, 'password'):
-        exclude_fields.append('password')  # Don't log passwords
-
-    data = model_to_dict(instance, exclude=exclude_fields)
-
-    # Replace foreign key IDs with names for better readability in audit logs
-    if hasattr(instance, 'employee') and instance.employee:
-        data['employee'] = str(instance.employee)
-
-    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
-
-def get_changed_fields(old_data, new_data):
-    """Return only the fields that changed between old_data and new_data."""
-    if not old_data or not new_data:
-        return old_data or new_data or {}
-
-    changed = {}
-    all_keys = set(old_data.keys()) | set(new_data.keys())
-
-    for key in all_keys:
-        old_value = old_data.get(key)
-        new_value = new_data.get(key)
-        if old_value != new_value:
-            changed[key] = {
-                'old': old_value,
-                'new': new_value
-            }
-
-    return changed
-
 # Importa tus serializadores
 from .serializers import (
-    UserSerializer, UserRegistrationSerializer, ChangePasswordSerializer,
+    UserSerializer, UserListSerializer, UserRegistrationSerializer, ChangePasswordSerializer,
     PermissionSerializer, RoleSerializer
 )
 
+
+def _count_subquery(queryset, field):
+    """Número de filas de `queryset` cuyo `field` apunta al usuario de la fila externa."""
+    counts = queryset.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(counts.values('total'), output_field=IntegerField()), 0)
+
+
 # Vistas para CRUD completo de usuarios con auditoría automática
 class UserListCreateAPIView(generics.ListCreateAPIView):
     """
     Vista para listar y crear usuarios.
 
     Incluye auditoría automática de creación de usuarios y paginación.
+    El listado usa UserListSerializer con los conteos anotados y los roles y
+    permisos precargados: el número de consultas no depende del tamaño de la página.
     """
     queryset = User.objects.all().order_by('username')
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions, IsActiveUser]
     pagination_class = StandardResultsSetPagination
 
+    def get_serializer_class(self):
+        if self.request.method == 'GET':
+            return UserListSerializer
+        return UserSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+
+        from apps.assets.models import Activo
+        from apps.masterdata.models import AuditLog
+        permissions_qs = Permission.objects.select_related('content_type')
+        return queryset.select_related('departamento', 'region', 'employee').prefetch_related(
+            Prefetch('groups', queryset=Group.objects.order_by('id')),
+            Prefetch('groups__permissions', queryset=permissions_qs),
+            Prefetch('user_permissions', queryset=permissions_qs),
+        ).annotate(
+            audit_logs_count=_count_subquery(AuditLog.objects.all(), 'user'),
+            assets_count=_count_subquery(Activo.objects.filter(estado='activo'), 'assigned_to'),
+        )
+
     def perform_create(self, serializer):
         instance = serializer.save()
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='CREATE',
-            description=f"CREATE User: {instance}",
+        audit.record(
+            'CREATE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"CREATE User: {instance}",
             old_data=None,
-            new_data=serialize_model_data(instance)
+            new_data=audit.snapshot(instance)
         )
 
 class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -109,31 +96,27 @@ class UserRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions, IsActiveUser]
 
     def perform_update(self, serializer):
-        old_instance = self.get_object()
-        old_data = serialize_model_data(old_instance)
+        # Estado previo tomado de la instancia que el serializador va a modificar (sin volver a consultarla)
+        old_data = audit.snapshot(serializer.instance)
         instance = serializer.save()
-        new_data = serialize_model_data(instance)
-        changed_fields = get_changed_fields(old_data, new_data)
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='UPDATE',
-            description=f"UPDATE User: {instance}",
+        new_data = audit.snapshot(instance)
+        changed_fields = audit.changed_fields(old_data, new_data)
+        audit.record(
+            'UPDATE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"UPDATE User: {instance}",
             old_data=old_data,
             new_data=changed_fields  # Store only changed fields
         )
 
     def perform_destroy(self, instance):
-        old_data = serialize_model_data(instance)
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='DELETE',
-            description=f"DELETE User: {instance}",
+        old_data = audit.snapshot(instance)
+        audit.record(
+            'DELETE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"DELETE User: {instance}",
             old_data=old_data,
             new_data=None
         )
@@ -157,15 +140,13 @@ class RoleListCreateAPIView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         instance = serializer.save()
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='CREATE',
-            description=f"CREATE Role: {instance}",
+        audit.record(
+            'CREATE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"CREATE Role: {instance}",
             old_data=None,
-            new_data=serialize_model_data(instance)
+            new_data=audit.snapshot(instance)
         )
 
 class RoleRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
@@ -174,31 +155,27 @@ class RoleRetrieveUpdateDestroyAPIView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, permissions.DjangoModelPermissions, IsActiveUser]
 
     def perform_update(self, serializer):
-        old_instance = self.get_object()
-        old_data = serialize_model_data(old_instance)
+        # Estado previo tomado de la instancia que el serializador va a modificar (sin volver a consultarla)
+        old_data = audit.snapshot(serializer.instance)
         instance = serializer.save()
-        new_data = serialize_model_data(instance)
-        changed_fields = get_changed_fields(old_data, new_data)
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='UPDATE',
-            description=f"UPDATE Role: {instance}",
+        new_data = audit.snapshot(instance)
+        changed_fields = audit.changed_fields(old_data, new_data)
+        audit.record(
+            'UPDATE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"UPDATE Role: {instance}",
             old_data=old_data,
             new_data=changed_fields  # Store only changed fields
         )
 
     def perform_destroy(self, instance):
-        old_data = serialize_model_data(instance)
-        content_type = ContentType.objects.get_for_model(instance)
-        AuditLog.objects.create(
-            activity_type='DELETE',
-            description=f"DELETE Role: {instance}",
+        old_data = audit.snapshot(instance)
+        audit.record(
+            'DELETE',
             user=self.request.user,
-            content_type=content_type,
-            object_id=instance.pk,
+            instance=instance,
+            description=f"DELETE Role: {instance}",
             old_data=old_data,
             new_data=None
         )
@@ -233,19 +210,17 @@ class ChangeUserPasswordView(APIView):
         user_to_change.save()
 
         # Log the password change
-        old_data = serialize_model_data(user_to_change)
+        old_data = audit.snapshot(user_to_change)
         user_to_change.set_password(new_password)
         user_to_change.save()
-        new_data = serialize_model_data(user_to_change)
+        new_data = audit.snapshot(user_to_change)
         # For password changes, only show that password was changed
         changed_fields = {'password': {'old': '[HIDDEN]', 'new': '[CHANGED]'}}
-        content_type = ContentType.objects.get_for_model(user_to_change)
-        AuditLog.objects.create(
-            activity_type='UPDATE',
-            description=f"UPDATE User Password: {user_to_change}",
+        audit.record(
+            'UPDATE',
             user=request.user,
-            content_type=content_type,
-            object_id=user_to_change.pk,
+            instance=user_to_change,
+            description=f"UPDATE User Password: {user_to_change}",
             old_data=old_data,
             new_data=changed_fields
         )
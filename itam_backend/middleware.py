@@ -1,12 +1,16 @@
 """
 Middleware personalizado para el sistema ITAM.
 
-Este middleware intercepta todas las peticiones HTTP y almacena el usuario actual
+CurrentUserMiddleware intercepta todas las peticiones HTTP y almacena el usuario actual
 en el almacenamiento thread-local, permitiendo acceder al usuario desde cualquier
 parte del código durante el procesamiento de la misma petición.
+
+AuditBufferMiddleware agrupa las entradas de auditoría de cada petición en una sola
+inserción al final de la misma.
 """
 
 from threadlocals import set_current_user
+from apps.masterdata import audit
 
 class CurrentUserMiddleware:
     """
@@ -27,4 +31,18 @@ class CurrentUserMiddleware:
 
         # Continúa con el procesamiento normal de la petición
         response = self.get_response(request)
-        return response
\ No newline at end of file
+        return response
+
+
+class AuditBufferMiddleware:
+    """
+    Middleware que acumula las entradas de auditoría registradas durante la
+    petición y las escribe con un solo bulk_create al terminarla.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with audit.buffered():
+            return self.get_response(request)
@@ -20,6 +20,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os 
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from decouple import config 
@@ -73,6 +74,7 @@ MIDDLEWARE = [
     'django.middleware.csrf.CsrfViewMiddleware',               # Protección CSRF
     'django.contrib.auth.middleware.AuthenticationMiddleware',  # Autenticación de usuarios
     'middleware.CurrentUserMiddleware',                        # Middleware personalizado para usuario actual
+    'middleware.AuditBufferMiddleware',                        # Escritura agrupada de auditoría por petición
     'django.contrib.messages.middleware.MessageMiddleware',    # Sistema de mensajes
     'django.middleware.clickjacking.XFrameOptionsMiddleware',  # Protección contra clickjacking
 ]
@@ -167,7 +169,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # Autenticación JWT para todas las APIs
+        # JWT con caché por usuario de la identidad y los permisos (ver apps/users/authentication.py)
+        'apps.users.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         #'rest_framework.permissions.IsAuthenticated',  # Requeriría autenticación para todas las APIs
@@ -210,6 +213,34 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
 }
 
+# Configuración de auditoría
+# 'sync': las entradas se insertan en la petición (agrupadas con bulk_create)
+# 'thread': las inserta un hilo de fondo con cola acotada
+AUDIT_LOG_WRITER = config('AUDIT_LOG_WRITER', default='sync')
+AUDIT_LOG_QUEUE_SIZE = config('AUDIT_LOG_QUEUE_SIZE', default=1000, cast=int)      # Lotes máximos en cola
+AUDIT_LOG_QUEUE_TIMEOUT = config('AUDIT_LOG_QUEUE_TIMEOUT', default=1.0, cast=float)  # Segundos de espera antes de escribir en la petición
+
+# Caché compartida entre los workers: versiones de los catálogos (apps/masterdata/cache.py),
+# de los usuarios autenticados (apps/users/authentication.py) y de los conteos del dashboard.
+# Debe ser la MISMA para todos los procesos de todos los servidores: Redis o Memcached, o
+# FileBasedCache solo si todos los workers corren en un mismo host. Nunca LocMemCache.
+# Fuera de DEBUG, CACHE_BACKEND y CACHE_LOCATION son obligatorios (no hay valor por defecto).
+if DEBUG:
+    CACHE_BACKEND = config('CACHE_BACKEND', default='django.core.cache.backends.filebased.FileBasedCache')
+    CACHE_LOCATION = config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'itam_cache'))
+else:
+    CACHE_BACKEND = config('CACHE_BACKEND')
+    CACHE_LOCATION = config('CACHE_LOCATION')
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': CACHE_LOCATION,
+    }
+}
+# Segundos que un worker reutiliza un usuario autenticado y sus permisos aunque no vea
+# cambios en la caché compartida (respaldo si un cambio no llega a invalidarlo)
+AUTH_USER_CACHE_TTL = config('AUTH_USER_CACHE_TTL', default=60, cast=int)
+
 # Configuración de CORS (Cross-Origin Resource Sharing)
 # Permite que el frontend React se comunique con el backend Django
 # Lista de orígenes permitidos para hacer peticiones al API
@@ -270,8 +270,11 @@ export const getDashboardData = () => api.get('assets/dashboard/');
 export const getDashboardModelsData = () => api.get('assets/dashboard-models/');
 export const getDashboardWarrantyData = () => api.get('assets/dashboard-warranty/');
 export const getDashboardSummary = () => api.get('assets/dashboard-summary/');
-export const getDashboardDetailData = (category, ordering = 'serie', page = 1, pageSize = 10) =>
-  api.get(`assets/dashboard-detail/?category=${category}&ordering=${ordering}&page=${page}&page_size=${pageSize}`);
+// cursor: next_cursor/previous_cursor de la respuesta anterior (páginas vecinas sin OFFSET)
+export const getDashboardDetailData = (category, ordering = 'serie', page = 1, pageSize = 10, cursor = null) =>
+  api.get('assets/dashboard-detail/', {
+    params: { category, ordering, page, page_size: pageSize, ...(cursor ? { cursor } : {}) }
+  });
 export const getMaintenanceOverview = (params = {}) => api.get('assets/maintenance-overview/', { params });
 
 /**
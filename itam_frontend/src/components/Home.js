@@ -206,11 +206,11 @@ function Home() {
     }
   };
 
-  const handlePageChange = async (newPage) => {
+  const handlePageChange = async (newPage, cursor = null) => {
     setModalPage(newPage);
     setModalLoading(true);
     try {
-      const response = await getDashboardDetailData(modalCategory, modalSort, newPage);
+      const response = await getDashboardDetailData(modalCategory, modalSort, newPage, 10, cursor);
       setModalData(response.data);
     } catch (err) {
       console.error('Error changing page:', err);
@@ -1349,36 +1349,11 @@ function Home() {
                     >
                       Hostname {modalSort === 'hostname' && '↑'} {modalSort === '-hostname' && '↓'}
                     </th>
-                    <th
-                      className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
-                      onClick={() => handleSort('tipo_activo__name')}
-                    >
-                      Tipo {modalSort === 'tipo_activo__name' && '↑'} {modalSort === '-tipo_activo__name' && '↓'}
-                    </th>
-                    <th
-                      className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
-                      onClick={() => handleSort('marca__name')}
-                    >
-                      Marca {modalSort === 'marca__name' && '↑'} {modalSort === '-marca__name' && '↓'}
-                    </th>
-                    <th
-                      className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
-                      onClick={() => handleSort('modelo__name')}
-                    >
-                      Modelo {modalSort === 'modelo__name' && '↑'} {modalSort === '-modelo__name' && '↓'}
-                    </th>
-                    <th
-                      className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
-                      onClick={() => handleSort('region__name')}
-                    >
-                      Región {modalSort === 'region__name' && '↑'} {modalSort === '-region__name' && '↓'}
-                    </th>
-                    <th
-                      className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
-                      onClick={() => handleSort('fecha_registro')}
-                    >
-                      Fecha Registro {modalSort === 'fecha_registro' && '↑'} {modalSort === '-fecha_registro' && '↓'}
-                    </th>
+                    <th className="border border-gray-300 px-2 py-2 text-left">Tipo</th>
+                    <th className="border border-gray-300 px-2 py-2 text-left">Marca</th>
+                    <th className="border border-gray-300 px-2 py-2 text-left">Modelo</th>
+                    <th className="border border-gray-300 px-2 py-2 text-left">Región</th>
+                    <th className="border border-gray-300 px-2 py-2 text-left">Fecha Registro</th>
                     <th
                       className="border border-gray-300 px-2 py-2 text-left cursor-pointer hover:bg-gray-200 select-none"
                       onClick={() => handleSort('fecha_fin_garantia')}
@@ -1442,7 +1417,7 @@ function Home() {
                 </div>
                 <div className="flex space-x-2">
                   <button
-                    onClick={() => handlePageChange(modalData.pagination.page - 1)}
+                    onClick={() => handlePageChange(modalData.pagination.page - 1, modalData.pagination.previous_cursor)}
                     disabled={modalData.pagination.page <= 1}
                     className="px-3 py-1 text-sm bg-gray-200 hover:bg-gray-300 disabled:bg-gray-100 disabled:cursor-not-allowed rounded"
                   >
@@ -1470,7 +1445,7 @@ function Home() {
                   })}
 
                   <button
-                    onClick={() => handlePageChange(modalData.pagination.page + 1)}
+                    onClick={() => handlePageChange(modalData.pagination.page + 1, modalData.pagination.next_cursor)}
                     disabled={modalData.pagination.page >= modalData.pagination.total_pages}
                     className="px-3 py-1 text-sm bg-gray-200 hover:bg-gray-300 disabled:bg-gray-100 disabled:cursor-not-allowed rounded"
                   >